@@ -0,0 +1,18 @@
+import streamlit as st
+
+from mra.assets import logo
+
+# One app, one process for both calculators: page config and logo are set
+# here once, and every client, cache and rendered asset the pages use is
+# shared between them (see mra/resources.py)
+st.set_page_config(page_title="MRA Restaurant Valuation", layout="wide")
+
+page = st.navigation([
+    st.Page("ebitda_calculator.py", title="EBITDA Calculator", url_path="ebitda", default=True),
+    st.Page("sde_calculator.py", title="SDE Calculator", url_path="sde"),
+])
+
+# Logo, pre-resized to the display width
+logo(500)
+
+page.run()
@@ -0,0 +1,84 @@
+"""Logo bytes per page load and per-rerun cost, before and after the asset pipeline.
+
+Builds the assets into a temporary directory and compares the original
+logo, and what ``st.image`` made of it on every rerun, with each pre-built
+variant. It then times reruns of a minimal page that shows the logo the
+old way (``st.image`` on the original file) and the new way
+(``mra.assets.logo``).
+
+    python benchmarks/bench_assets.py --reruns 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra import assets
+
+
+def old_page():
+    import streamlit as st
+
+    st.image("images/MRA logo 9.2015-colorLG.jpg", width=500)
+
+
+def new_page():
+    from mra.assets import logo
+
+    logo(500)
+
+
+def _streamlit_resized(data, width):
+    from streamlit.elements.lib.image_utils import _ensure_image_size_and_format
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+
+    return _ensure_image_size_and_format(data, LayoutConfig(width=width), "JPEG")
+
+
+def time_reruns(script, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    at = AppTest.from_function(script)
+    at.run()
+    start = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    assert not at.exception
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=200)
+    args = parser.parse_args()
+
+    original = os.path.getsize(assets.LOGO)
+    with open(assets.LOGO, "rb") as f:
+        data = f.read()
+    sent = {}
+    for width in assets.LOGO_WIDTHS:
+        # What st.image re-derived from the original on every rerun
+        sent[str(width)] = len(_streamlit_resized(data, width))
+        print(f"st.image sent at {width}px: {sent[str(width)] / 1024:,.1f} KiB")
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        manifest = assets.build(out_dir=tmp)
+        print(f"built in {time.perf_counter() - start:.2f}s; original logo {original / 1024:,.0f} KiB")
+        for width, variants in manifest["logo"].items():
+            for ext, variant in variants.items():
+                sizes = ", ".join(f"{density}x {os.path.getsize(os.path.join(tmp, name)) / 1024:5.1f} KiB"
+                                  for density, name in sorted(variant["files"].items()))
+                one_x = os.path.getsize(os.path.join(tmp, variant["files"]["1"]))
+                print(f"  {width}px {ext:<4}: {sizes} ({sent[width] / one_x:3.1f}x smaller than st.image at 1x)")
+
+    old = time_reruns(old_page, args.reruns)
+    new = time_reruns(new_page, args.reruns)
+    print(f"rerun with st.image(original): {1000 * old:.2f} ms; with assets.logo: {1000 * new:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
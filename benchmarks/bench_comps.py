@@ -0,0 +1,83 @@
+"""Comparable-sales lookups: index build, query latency and reloads.
+
+Writes a synthetic comps file of ``--rows`` transactions, builds the
+index, then times nearest-comp queries for random restaurants. Also
+checks that the index is rebuilt only when the file changes.
+
+    python benchmarks/bench_comps.py --rows 200000
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra.comps import ComparableStore
+
+REGIONS = ("Northeast", "Southeast", "Midwest", "Southwest", "West")
+CONCEPTS = ("Quick Service", "Fast Casual", "Casual Dining", "Fine Dining", "Bar & Grill")
+
+
+def write_comps(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["method", "region", "concept", "revenue", "margin", "multiple"])
+        for i in range(rows):
+            out.writerow([
+                "ebitda" if i % 2 else "sde",
+                REGIONS[rng.integers(len(REGIONS))],
+                CONCEPTS[rng.integers(len(CONCEPTS))],
+                round(float(np.exp(rng.uniform(12.5, 16))), -3),
+                round(float(rng.normal(15, 5)), 1),
+                round(float(rng.normal(1.8, 0.3)), 2),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "comps.csv")
+        write_comps(path, args.rows)
+        store = ComparableStore(path)
+
+        start = time.perf_counter()
+        store.regions("ebitda")
+        print(f"{args.rows:,} comps indexed in {time.perf_counter() - start:.2f}s")
+
+        rng = np.random.default_rng(1)
+        revenue = np.exp(rng.uniform(12.5, 16, args.queries))
+        margin = rng.normal(15, 5, args.queries)
+        regions = [REGIONS[i] for i in rng.integers(len(REGIONS), size=args.queries)]
+        timings = []
+        for r, m, region in zip(revenue, margin, regions):
+            start = time.perf_counter()
+            store.comparables("ebitda", r, m, region=region)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"nearest 25 comps + quantiles: p50 {1e6 * timings[len(timings) // 2]:.0f} us, "
+              f"p99 {1e6 * timings[int(0.99 * len(timings))]:.0f} us")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            store.quantiles("sde", "West", "Fast Casual")
+        print(f"precomputed segment quantiles: {1e3 * (time.perf_counter() - start):.1f} us per lookup")
+
+        loads = store.loads
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        store.regions("ebitda")
+        store.regions("ebitda")
+        print(f"reloads after touching the file once: {store.loads - loads}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Per-interaction server CPU: full-page rerun vs. fragment rerun.
+
+Before the pages were split into fragments, every keystroke in an owner
+add-back reran the whole script. Now it reruns only the valuation
+fragment. This drives both pages with Streamlit's app-testing harness, types
+into an add-back, and compares the CPU of a full rerun with the CPU the
+fragment body recorded for itself (which needs metrics on, see
+``mra.metrics``).
+
+    python benchmarks/bench_fragments.py
+"""
+
+import time
+
+from harness import PAGES, open_page, text_input
+
+from mra import metrics
+
+
+def measure(page, keystrokes="85000"):
+    labels = PAGES[page]
+    at = open_page(page)
+    text_input(at, labels["sales"]).input("1250000").run()
+
+    full, fragment = [], []
+    for i in range(1, len(keystrokes) + 1):
+        start = time.process_time()
+        text_input(at, labels["add_back"]).input(keystrokes[:i]).run()
+        full.append(time.process_time() - start)
+        fragment.append(at.session_state["cpu_seconds"]["valuation_section"])
+    return full, fragment
+
+
+def main():
+    metrics.ENABLED = True
+    for page in PAGES:
+        full, fragment = measure(page)
+        full_ms = 1000 * sum(full) / len(full)
+        fragment_ms = 1000 * sum(fragment) / len(fragment)
+        print(f"{page}: full rerun {full_ms:.1f} ms CPU, valuation fragment {fragment_ms:.1f} ms CPU "
+              f"per add-back keystroke ({full_ms / fragment_ms:.1f}x less work)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cold-start import budget for the calculator pages.
+
+Runs a fresh interpreter with ``-X importtime`` that imports Streamlit and
+then exactly the modules each page imports at the top. It fails (exit
+status 1) if those page imports take longer than the budget on top of
+Streamlit itself, or if any heavy dependency that should be deferred
+(matplotlib, reportlab, sendgrid, the Google API client, pandas) is
+pulled in at import time.
+
+It also opens each page in a fresh interpreter and enters a sales figure
+straight after the first paint, while the background prewarm is still
+importing, and fails if that rerun raised (the first fast user on a cold
+worker).
+
+    python benchmarks/bench_importtime.py --budget-ms 150
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("ebitda_calculator.py", "sde_calculator.py")
+DEFERRED = ("matplotlib", "reportlab", "sendgrid", "googleapiclient", "google.oauth2", "pandas")
+
+
+def page_imports(page):
+    """Return the top-level import statements of a page as source lines."""
+    with open(os.path.join(ROOT, page)) as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_profile(statements):
+    """Import streamlit, then ``statements``; return [(name, cumulative_us)] after streamlit."""
+    code = "import streamlit\n" + "\n".join(statements)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    entries, after_streamlit = [], False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if after_streamlit:
+            entries.append((name, int(cumulative), line.split("|")[2].startswith("  ")))
+        elif name == "streamlit":
+            after_streamlit = True
+    return entries
+
+
+FIRST_INPUT = """
+import sys
+from harness import PAGES, open_page, text_input
+at = open_page(sys.argv[1])
+text_input(at, PAGES[sys.argv[1]]["sales"]).input("1250000").run()
+print("\\n".join(str(e.message) for e in at.exception))
+"""
+
+
+def first_input_errors(page):
+    """Exceptions raised by the first input on a freshly started page, as text."""
+    result = subprocess.run([sys.executable, "-c", FIRST_INPUT, page], cwd=os.path.join(ROOT, "benchmarks"),
+                            capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--repeat", type=int, default=3, help="take the best of this many runs")
+    args = parser.parse_args()
+
+    failed = False
+    for page in PAGES:
+        statements = page_imports(page)
+        best = None
+        for _ in range(args.repeat):
+            entries = import_profile(statements)
+            total_ms = sum(cumulative for _, cumulative, nested in entries if not nested) / 1000
+            best = total_ms if best is None else min(best, total_ms)
+        heavy = sorted({name for name, _, _ in entries
+                        if any(name == d or name.startswith(d + ".") for d in DEFERRED)})
+        status = "ok"
+        if best > args.budget_ms or heavy:
+            status, failed = "FAIL", True
+        print(f"{page}: page imports {best:.1f} ms on top of streamlit (budget {args.budget_ms:.0f} ms) "
+              f"[{status}]")
+        if heavy:
+            print(f"  eagerly imported: {', '.join(heavy)}")
+
+        errors = first_input_errors(page)
+        if errors:
+            failed = True
+        print(f"{page}: first input during prewarm [{'FAIL' if errors else 'ok'}]")
+        if errors:
+            print(f"  {errors}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Cost of the per-stage timing spans, and what they report.
+
+Times an empty ``span`` with instrumentation off and on, then fills in
+both pages with instrumentation on and prints the per-rerun JSON log lines
+and the Prometheus histograms the process would expose.
+
+    python benchmarks/bench_metrics.py
+"""
+
+import time
+
+from harness import PAGES, open_page, text_input, type_into
+
+from mra import metrics
+
+
+def span_overhead(n=200_000):
+    """Nanoseconds per empty ``with span(...)`` block."""
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.span("bench"):
+            pass
+    return 1e9 * (time.perf_counter() - start) / n
+
+
+def fill_in(page):
+    labels = PAGES[page]
+    at = open_page(page)
+    for _ in type_into(at, labels["sales"], "1250000"):
+        pass
+    for label, value in zip(labels["costs"], ("375000", "400000", "180000")):
+        text_input(at, label).input(value).run()
+    text_input(at, labels["add_back"]).input("85000").run()
+
+
+def main():
+    metrics.ENABLED = False
+    print(f"span overhead, disabled: {span_overhead():.0f} ns")
+    metrics.ENABLED = True
+    print(f"span overhead, enabled:  {span_overhead():.0f} ns")
+    metrics.reset()
+
+    metrics.LOG_RERUNS = True
+    for page in PAGES:
+        fill_in(page)
+    print()
+    print(metrics.render_prometheus(), end="")
+
+
+if __name__ == "__main__":
+    main()
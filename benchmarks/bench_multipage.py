@@ -0,0 +1,91 @@
+"""Memory of the two calculators as separate apps versus one multipage app.
+
+Each scenario runs in a fresh interpreter. It drives the pages headlessly
+through one valuation each (P&L figures and an owner add-back, so the donut
+chart renders and the background prewarm loads the report and import
+libraries), waits for the prewarm to finish, then reports the resident set
+size. "separate" is the sum of an EBITDA-only and an SDE-only process, as
+two deployed apps; "multipage" is one process serving both pages through
+``app.py``.
+
+    python benchmarks/bench_multipage.py
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+
+from harness import PAGES, ROOT, SECRETS, text_input
+
+SCENARIOS = {
+    "ebitda": ("ebitda_calculator.py",),
+    "sde": ("sde_calculator.py",),
+    "multipage": ("app.py", "ebitda_calculator.py", "sde_calculator.py"),
+}
+FIGURES = ("1250000", "375000", "400000", "180000")
+
+
+def _rss_kib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _wait_for_prewarm():
+    for thread in threading.enumerate():
+        if thread.name == "mra-prewarm":
+            thread.join()
+
+
+def _value(at, page):
+    labels = PAGES[page]
+    for label, value in zip((labels["sales"],) + labels["costs"], FIGURES):
+        text_input(at, label).input(value).run()
+    text_input(at, labels["add_back"]).input("85000").run()
+    assert not at.exception, at.exception
+
+
+def child(scenario):
+    from streamlit.testing.v1 import AppTest
+
+    script, *pages = SCENARIOS[scenario]
+    os.chdir(ROOT)
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=60)
+    at.secrets.update(SECRETS)
+    at.run()
+    for page in pages or (script,):
+        if pages:
+            at.switch_page(page).run()
+        _value(at, page)
+        _wait_for_prewarm()
+    print(_rss_kib())
+
+
+def measure(scenario):
+    output = subprocess.run([sys.executable, __file__, "--child", scenario],
+                            check=True, capture_output=True, text=True).stdout
+    return int(output.split()[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    rss = {scenario: measure(scenario) for scenario in SCENARIOS}
+    separate = rss["ebitda"] + rss["sde"]
+    print(f"EBITDA app:           {rss['ebitda']:7.1f} MiB")
+    print(f"SDE app:              {rss['sde']:7.1f} MiB")
+    print(f"separate apps, total: {separate:7.1f} MiB")
+    print(f"multipage app:        {rss['multipage']:7.1f} MiB ({rss['multipage'] / separate:.0%} of separate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure outbox throughput and tail latency against a local fake SendGrid.
+
+    python benchmarks/bench_outbox.py --messages 2000 --workers 8 --latency 0.05
+    python benchmarks/bench_outbox.py --rate 140 --failure-rate 0.1
+
+With ``--rate`` below the pool's capacity the latencies show retry
+backoff rather than the backlog of a burst.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mra.outbox import FakeTransport, Outbox  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake send latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--attachment-kb", type=int, default=4)
+    parser.add_argument("--base-delay", type=float, default=1.0, help="first retry backoff in seconds")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="messages sent per second (default: all at once)")
+    args = parser.parse_args()
+
+    pdf = os.urandom(args.attachment_kb * 1024)
+    transport = FakeTransport(latency=args.latency, failure_rate=args.failure_rate, seed=0)
+
+    with tempfile.TemporaryDirectory() as spool:
+        outbox = Outbox(transport, spool, workers=args.workers, base_delay=args.base_delay)
+        enqueue = []
+        start = time.perf_counter()
+        for i in range(args.messages):
+            t = time.perf_counter()
+            outbox.send(f"member{i}@example.com", "Report", "Attached.", attachment=pdf)
+            enqueue.append(time.perf_counter() - t)
+            if args.rate:
+                time.sleep(max(0.0, start + (i + 1) / args.rate - time.perf_counter()))
+        outbox.close()
+        elapsed = time.perf_counter() - start
+
+    enqueue.sort()
+    stats = outbox.stats()
+    print(f"enqueue: p50 {1e3 * enqueue[len(enqueue) // 2]:.3f} ms, "
+          f"p99 {1e3 * enqueue[int(0.99 * (len(enqueue) - 1))]:.3f} ms")
+    print(f"delivered {stats['delivered']} in {elapsed:.2f}s "
+          f"({stats['delivered'] / elapsed:.0f} msg/s), retries {stats['retries']}, failed {stats['failed']}")
+    print(f"queue-to-delivery: p50 {stats['p50_seconds']:.3f}s, p99 {stats['p99_seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""P&L import throughput and memory on a large multi-location export.
+
+Writes a QuickBooks-style CSV (title rows, sections, subtotals, amounts
+formatted as "$1,234.56", "(500)" and "12.5k") with one column per
+location, then imports it at a few chunk sizes and reports the time and
+peak traced memory of each run. It also checks that the vectorized
+``parse_amounts`` reads every amount cell of the export, plus a list of
+edge cases, exactly as ``parse_amount`` does, and fails (exit status 1)
+if any cell differs.
+
+    python benchmarks/bench_pnl.py --locations 200 --accounts 5000
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra.pnl import import_pnl, parse_amount, parse_amounts, read_rows
+
+SECTIONS = (
+    ("Income", "Sales"),
+    ("Cost of Goods Sold", "Food Purchases"),
+    ("Expenses", "Operating Expense"),
+)
+FORMATS = ("${:,.2f}", "{:,.0f}", "({:,.2f})", "{:.1f}k")
+# Cells a user or an export might produce that the formats above don't
+EDGE_CASES = ("(1.2k)", "(-5)", "$-4", "--5", " ( 3 ) ", "(3", "3)", "-(3)", "1e5", "inf", "nan", "5$",
+              ".5", "1,2,3", "12.5K", "5 b", "k", "abc", "-$-5", "", None, True,
+              1234.5, -7.0, 0, 1e-13, 1e20, np.int64(7), float("nan"), float("inf"))
+
+
+def write_export(path, locations, accounts, seed=0):
+    rng = np.random.default_rng(seed)
+    per_section = accounts // len(SECTIONS)
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerows([["Bench Restaurant Group"], ["Profit and Loss"], ["January - December 2025"], []])
+        out.writerow([""] + [f"Location {i + 1}" for i in range(locations)] + ["Total"])
+        for section, account in SECTIONS:
+            out.writerow([section] + [""] * (locations + 1))
+            for i in range(per_section):
+                amounts = rng.uniform(100, 50_000, locations)
+                cells = []
+                for j, amount in enumerate(amounts):
+                    fmt = FORMATS[(i + j) % len(FORMATS)]
+                    cells.append(fmt.format(amount / 1000 if fmt.endswith("k") else amount))
+                out.writerow([f"   {account} {i + 1}"] + cells + [f"{amounts.sum():,.2f}"])
+            out.writerow([f"Total {section}"] + [""] * (locations + 1))
+        out.writerow(["Net Income"] + [""] * (locations + 1))
+
+
+def parser_mismatches(path):
+    """Cells where ``parse_amounts`` and ``parse_amount`` disagree, as ``(cell, scalar, vector)``."""
+    cells = [cell for row in read_rows(path) for cell in row[1:]] + list(EDGE_CASES)
+    vector = parse_amounts(cells)
+    scalar = np.array([np.nan if v is None else v for v in map(parse_amount, cells)], dtype=np.float64)
+    differ = ~((vector == scalar) | (np.isnan(vector) & np.isnan(scalar)))
+    return [(cells[i], scalar[i], vector[i]) for i in np.flatnonzero(differ)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pnl.csv")
+        write_export(path, args.locations, args.accounts)
+        cells = args.accounts * (args.locations + 1)
+        print(f"{args.accounts:,} accounts x {args.locations + 1} columns "
+              f"({os.path.getsize(path) / 2**20:,.1f} MiB)")
+
+        for chunk_size in (500, 2_000, 10_000):
+            start = time.perf_counter()
+            totals, accounts = import_pnl(path, "ebitda", chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            # Traced separately: tracemalloc slows the import several times over
+            tracemalloc.start()
+            import_pnl(path, "ebitda", chunk_size=chunk_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"chunk {chunk_size:>6,}: {elapsed:.2f}s ({cells / elapsed:,.0f} cells/s), "
+                  f"peak {peak / 2**20:,.1f} MiB, {len(totals)} locations, {len(accounts)} accounts")
+
+        mismatches = parser_mismatches(path)
+        print(f"parse_amounts vs parse_amount: {len(mismatches)} differing cells "
+              f"[{'FAIL' if mismatches else 'ok'}]")
+        for cell, scalar, vector in mismatches[:10]:
+            print(f"  {cell!r}: parse_amount {scalar}, parse_amounts {vector}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
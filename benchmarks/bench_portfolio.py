@@ -0,0 +1,51 @@
+"""Check that portfolio PDF memory stays flat as the portfolio grows.
+
+Streams synthetic valuations into a portfolio report and records the peak
+Python allocation with tracemalloc for each portfolio size.
+
+    python benchmarks/bench_portfolio.py --sizes 10 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mra.portfolio import PortfolioWriter  # noqa: E402
+
+
+def run(size, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with PortfolioWriter(path, "ebitda") as writer:
+        for i in range(size):
+            sales = 800_000 + 137 * i
+            ebitda = 0.18 * sales
+            values = {"total_expenses": sales - ebitda, "ebitda": ebitda, "margin": 18.0,
+                      "owner_benefit": 40_000.0, "valuation_base": ebitda + 40_000}
+            writer.add(f"Restaurant {i}", f"owner{i}@example.com", values,
+                       [values["valuation_base"] * m for m in (1.25, 1.5, 2.0)])
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            elapsed, peak, size_bytes = run(size, os.path.join(tmp, f"portfolio-{size}.pdf"))
+            print(f"{size:>6} locations: {elapsed:6.2f}s, peak traced memory {peak / 1024:8.1f} KiB, "
+                  f"file {size_bytes / 1024:,.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
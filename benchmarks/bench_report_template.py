@@ -0,0 +1,111 @@
+"""Per-report render time and size: templated branded reports vs the old text-only ones.
+
+"text-only" is the previous renderer, kept here as the baseline: a reportlab
+canvas with one ``setFont``/``drawString`` per line and no logo or chart.
+"template" is ``mra.reports`` as it stands: logo, section frames and the
+vector margin donut, from a per-process template. Each build uses different
+figures, so every call misses the report cache and renders for real. The
+one-off template build is timed separately.
+
+    python benchmarks/bench_report_template.py --reports 500
+"""
+
+import argparse
+import statistics
+import time
+from io import BytesIO
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra import reports
+
+
+def _draw_ebitda(pdf, rows):
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(100, 742, "MRA EBITDA Valuation Report")
+    y = 702
+    for metric, value in rows:
+        if "Name" in metric or "Owner" in metric or "Valuation Base" in metric:
+            pdf.setFont("Helvetica-Bold", 12)
+        else:
+            pdf.setFont("Helvetica", 12)
+        pdf.drawString(80, y, f"{metric}: {value}")
+        y -= 20
+        if "Margin" in metric or "Total Owner Benefit" in metric or "High Multiple" in metric:
+            y -= 10
+
+
+def _draw_sde(pdf, lines):
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(100, 750, "MRA SDE Valuation Report")
+    y = 720
+    pdf.setFont("Helvetica", 12)
+    for line in lines:
+        pdf.drawString(80, y, line)
+        y -= 20
+
+
+def text_only(draw, rows):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    draw(pdf, rows)
+    pdf.save()
+    return buffer.getvalue()
+
+
+def inputs(kind, i):
+    total_expenses, earnings, margin = 900_000 + i, 350_000 + 7 * i, 28
+    if kind == "ebitda":
+        rows = reports.ebitda_report_rows(
+            "Bench Restaurant", "bench@example.com", total_expenses, earnings, margin, 60_000,
+            earnings + 60_000, (512_500 + i, 615_000 + i, 820_000 + i))
+    else:
+        rows = reports.sde_report_lines(
+            "Bench Restaurant", "bench@example.com", total_expenses, earnings, margin, 60_000,
+            earnings, earnings + 60_000, (615_000 + i, 820_000 + i, 1_025_000 + i),
+            [("Other", 1_000), ("Other (Additional)", 0), ("Other (Extra)", 0)])
+    return rows, reports.report_chart(total_expenses, earnings, margin)
+
+
+def run(build, count):
+    times, sizes = [], []
+    for i in range(count):
+        start = time.perf_counter()
+        pdf = build(i)
+        times.append(time.perf_counter() - start)
+        sizes.append(len(pdf))
+    return times, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=500, help="reports per layout and renderer")
+    args = parser.parse_args()
+
+    builders = {
+        "ebitda": (_draw_ebitda, reports.ebitda_report_pdf),
+        "sde": (_draw_sde, reports.sde_report_pdf),
+    }
+    for kind, (draw, build) in builders.items():
+        reports.cache_clear()
+        text_only(draw, inputs(kind, -1)[0])  # pays the reportlab import
+        start = time.perf_counter()
+        build(*inputs(kind, -1))
+        first = time.perf_counter() - start
+
+        old_times, old_sizes = run(lambda i: text_only(draw, inputs(kind, i)[0]), args.reports)
+        new_times, new_sizes = run(lambda i: build(*inputs(kind, i)), args.reports)
+        old, new = statistics.median(old_times), statistics.median(new_times)
+        print(f"{kind.upper()} ({args.reports} reports each)")
+        print(f"  text-only, reportlab canvas:     {1000 * old:6.3f} ms median, "
+              f"{statistics.mean(old_sizes) / 1024:5.1f} KiB")
+        print(f"  template, logo + vector donut:   {1000 * new:6.3f} ms median, "
+              f"{statistics.mean(new_sizes) / 1024:5.1f} KiB  ({old / new:.1f}x faster)")
+        print(f"  first report (builds template):  {1000 * first:6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
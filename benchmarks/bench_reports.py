@@ -0,0 +1,53 @@
+"""Show that page reruns no longer pay for PDF generation.
+
+Types a sales figure into the EBITDA page one character at a time with
+Streamlit's app-testing harness, then times the report builder on its own.
+Run from the repository root:
+
+    python benchmarks/bench_reports.py
+"""
+
+import time
+
+from harness import PAGES, open_page, type_into
+
+from mra import reports
+
+
+def time_reruns(keystrokes="1250000"):
+    at = open_page("ebitda_calculator.py")
+    timings = []
+    start = time.perf_counter()
+    for _ in type_into(at, PAGES["ebitda_calculator.py"]["sales"], keystrokes):
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+    return timings
+
+
+def time_pdf(repeat=50):
+    rows = tuple((f"Metric {i}", f"${i * 1000:,}") for i in range(10))
+    reports.cache_clear()
+    start = time.perf_counter()
+    reports.ebitda_report_pdf(rows)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        reports.ebitda_report_pdf(rows)
+    warm = (time.perf_counter() - start) / repeat
+    return cold, warm
+
+
+def main():
+    reports.cache_clear()
+    reruns = time_reruns()
+    built = reports.ebitda_report_pdf.cache_info().misses
+    cold, warm = time_pdf()
+
+    print(f"reruns: {len(reruns)}, mean {1000 * sum(reruns) / len(reruns):.1f} ms, "
+          f"max {1000 * max(reruns):.1f} ms")
+    print(f"PDFs built during reruns: {built}")
+    print(f"PDF build: cold {1000 * cold:.2f} ms, cached {1e6 * warm:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Submission store: concurrent write latency, analytics queries and export.
+
+Saves ``--rows`` submissions from ``--sessions`` threads, each waiting a
+random interval between saves so that together they offer ``--rate`` saves
+per second, and reports the per-save latency. It then backdates them
+across a year and times the monthly summary and per-email lookups.
+Finally it exports everything to a fake Sheets backend with simulated
+latency.
+
+    python benchmarks/bench_submissions.py --rows 50000 --sessions 32 --rate 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra.engine import EBITDA_ADD_BACKS, EBITDA_COLUMNS, ebitda_valuation
+from mra.sheets import FakeSheetsBackend, SheetsExporter
+from mra.submissions import SubmissionStore
+
+YEAR = 365 * 24 * 3600
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=2000, help="total saves per second offered")
+    parser.add_argument("--people", type=int, default=5_000)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake Sheets API latency in seconds")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rng_wait = np.random.default_rng(1)
+    inputs = rng.uniform(100_000, 3_000_000, (args.rows, 1)) * [1.0, 0.3, 0.3, 0.15]
+    add_backs = rng.uniform(0, 50_000, (args.rows, len(EBITDA_ADD_BACKS)))
+    results = ebitda_valuation(*inputs.T, owner_benefit=add_backs, multiples=(1.25, 1.6, 2.0))
+
+    def save(i):
+        time.sleep(rng_wait.exponential(args.sessions / args.rate))
+        result = {key: value[i] if np.ndim(value) else value for key, value in results.items()}
+        start = time.perf_counter()
+        store.record("ebitda", f"Member {i}", f"member{i % args.people}@example.com", inputs[i, 0],
+                     dict(zip(EBITDA_COLUMNS, inputs[i].tolist())),
+                     dict(zip(EBITDA_ADD_BACKS, add_backs[i].tolist())),
+                     result, (1.25, 1.6, 2.0))
+        return time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubmissionStore(os.path.join(tmp, "submissions.db"))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.sessions) as pool:
+            latencies = sorted(pool.map(save, range(args.rows)))
+        elapsed = time.perf_counter() - start
+        print(f"{args.rows:,} saves from {args.sessions} threads in {elapsed:.2f}s "
+              f"({args.rows / elapsed:,.0f}/s): p50 {1e6 * _percentile(latencies, 0.5):.0f} us, "
+              f"p99 {1e6 * _percentile(latencies, 0.99):.0f} us, max {1e3 * latencies[-1]:.1f} ms")
+
+        # Spread the rows over the past year for the analytics queries
+        now = time.time()
+        with store._lock:
+            store._db.execute("UPDATE submissions SET created = ? - (id * ?) % ?",
+                              (now, 7919.0, float(YEAR)))
+
+        start = time.perf_counter()
+        months = store.summary(now - YEAR, now, period="month")
+        print(f"monthly summary over a year: {1e3 * (time.perf_counter() - start):.1f} ms, "
+              f"{len(months)} rows")
+        start = time.perf_counter()
+        for i in range(1000):
+            store.by_email(f"member{i}@example.com", limit=20)
+        print(f"latest submissions for one email: {1e3 * (time.perf_counter() - start) / 1000:.2f} ms")
+
+        backend = FakeSheetsBackend(latency=args.latency)
+        exporter = SheetsExporter(store, lambda: backend, "bench-sheet", interval=3600)
+        start = time.perf_counter()
+        exporter.export()
+        print(f"exported {len(backend.rows):,} rows in {time.perf_counter() - start:.2f}s "
+              f"over {backend.calls} API calls; a second export sends {exporter.export()}")
+        exporter.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
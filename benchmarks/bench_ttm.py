@@ -0,0 +1,121 @@
+"""Rolling TTM valuations: full build, one appended month and one correction.
+
+Generates ``--locations`` locations with ``--years`` of monthly EBITDA
+inputs and an owner add-back, then times:
+- building every TTM window with ``mra.ttm.RollingTTM``, against a pandas
+  ``groupby().rolling(12).sum()`` followed by ``value_frame``
+- appending each of the next ``--append`` months for every location,
+  incrementally, against rebuilding from scratch
+- correcting one month of one location
+Each incremental result is checked against a fresh build and the pandas
+result.
+
+    python benchmarks/bench_ttm.py --locations 200 --years 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from harness import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from mra.engine import EBITDA_COLUMNS, value_frame
+from mra.ttm import WINDOW, RollingTTM
+
+ADD_BACK = "Owner's Compensation"
+
+
+def history(locations, months, start=pd.Period("2015-01", "M").ordinal, seed=0):
+    rng = np.random.default_rng(seed)
+    n = locations * months
+    frame = pd.DataFrame({
+        "location": np.repeat([f"Location {i:03d}" for i in range(locations)], months),
+        "month": np.tile(np.arange(start, start + months), locations),
+    })
+    sales = rng.uniform(60_000, 250_000, n)
+    for column, share in zip(EBITDA_COLUMNS, (1.0, 0.3, 0.32, 0.2)):
+        frame[column] = sales * share * rng.uniform(0.9, 1.1, n)
+    frame[ADD_BACK] = rng.uniform(2_000, 8_000, n)
+    return frame
+
+
+def pandas_ttm(frame):
+    columns = list(EBITDA_COLUMNS) + [ADD_BACK]
+    sums = frame.sort_values(["location", "month"]).groupby("location")[columns] \
+        .rolling(WINDOW, min_periods=WINDOW).sum().reset_index(level=0)
+    return pd.concat([sums[["location"]], value_frame(sums, "ebitda")], axis=1)
+
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def _diff(ttm, reference):
+    mine = ttm.frame(ttm.locations).sort_values(["location", "month"])
+    theirs = reference.frame(reference.locations).sort_values(["location", "month"])
+    columns = [c for c in mine.columns if c not in ("location", "month", "complete")]
+    return np.nanmax(np.abs(mine[columns].to_numpy(float) - theirs[columns].to_numpy(float)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=200)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--append", type=int, default=12, help="months appended one at a time")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    months = 12 * args.years
+    frame = history(args.locations, months + args.append)
+    cutoff = frame["month"].min() + months
+    past = frame[frame["month"] < cutoff]
+    print(f"{args.locations} locations x {months} months = {len(past):,} rows")
+
+    def build(rows):
+        ttm = RollingTTM("ebitda")
+        ttm.update(rows)
+        return ttm
+
+    seconds, ttm = best(lambda: build(past), args.repeat)
+    print(f"full build, RollingTTM:                 {1000 * seconds:8.2f} ms")
+    seconds, reference = best(lambda: pandas_ttm(past), args.repeat)
+    print(f"full build, pandas rolling + engine:    {1000 * seconds:8.2f} ms")
+    ebitda = ttm.frame(ttm.locations).sort_values(["location", "month"])["ebitda"].to_numpy()
+    print(f"  max |difference| in TTM EBITDA vs pandas: {np.nanmax(np.abs(ebitda - reference['ebitda'])):.2e}")
+
+    # Append the following months one at a time, as a monthly close would
+    appends = []
+    for month in range(cutoff, cutoff + args.append):
+        start = time.perf_counter()
+        ttm.update(frame[frame["month"] == month])
+        appends.append(time.perf_counter() - start)
+    print(f"append one month, incremental:          {1000 * np.mean(appends):8.2f} ms mean, "
+          f"{1000 * max(appends):.2f} ms max over {args.append} "
+          f"({ttm.revalued:,} of {ttm.windows:,} windows valued each)")
+    seconds, rebuilt = best(lambda: build(frame), args.repeat)
+    print(f"append one month, full rebuild:         {1000 * seconds:8.2f} ms")
+    seconds, _ = best(lambda: pandas_ttm(frame), args.repeat)
+    print(f"append one month, pandas from scratch:  {1000 * seconds:8.2f} ms")
+    print(f"  max |difference| incremental vs rebuild: {_diff(ttm, rebuilt):.2e}")
+
+    correction = frame.iloc[[len(frame) // 2]].copy()
+    correction["cogs"] += 5_000
+    start = time.perf_counter()
+    ttm.update(correction)
+    seconds = time.perf_counter() - start
+    corrected = frame.copy()
+    corrected.loc[correction.index, "cogs"] = correction["cogs"]
+    print(f"correct one month of one location:      {1000 * seconds:8.2f} ms "
+          f"({ttm.revalued} windows valued)")
+    print(f"  max |difference| vs rebuild: {_diff(ttm, build(corrected)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Shared helpers for driving the calculator pages headlessly.
+
+Pages run under Streamlit's app-testing harness with the SendGrid and
+Google Sheets secrets stubbed, so no network access is needed.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SECRETS = {
+    "SENDGRID_API_KEY": "test",
+    "SENDGRID_SENDER": "test@example.com",
+    "GCP_SHEET_ID": "test",
+    "gcp_service_account": {},
+}
+
+# Input labels per page, as shown on screen.
+PAGES = {
+    "ebitda_calculator.py": {
+        "sales": "Net Sales ($)",
+        "costs": ("COGS ($)", "Employee Cost ($)", "Other Operating Cost ($)"),
+        "add_back": "Owner's Compensation ($)",
+    },
+    "sde_calculator.py": {
+        "sales": "Food & Beverage Income ($)",
+        "costs": ("F&B Purchases ($)", "Salaries, Wages, Taxes & Benefits ($)", "Operating Expenses ($)"),
+        "add_back": "Owner's Compensation ($)",
+    },
+}
+
+
+def open_page(page, timeout=30):
+    """Return an AppTest for ``page`` that has completed its first run."""
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+    at.secrets.update(SECRETS)
+    return at.run()
+
+
+def text_input(at, label):
+    return next(w for w in at.text_input if w.label == label)
+
+
+def type_into(at, label, text):
+    """Type ``text`` one character at a time, rerunning after each; yields after each rerun."""
+    for i in range(1, len(text) + 1):
+        text_input(at, label).input(text[:i]).run()
+        yield text[:i]
@@ -0,0 +1,188 @@
+"""Load test for the JSON valuation API at increasing concurrency.
+
+Starts ``python -m mra serve`` on a free local port (or targets
+``--url``), then runs each concurrency level for ``--seconds``. Each
+virtual client keeps one HTTP/1.1 keep-alive connection open and sends
+requests back to back. Prints requests/s, p50 and p99 latency and error
+counts per level. Before the first level it checks that malformed
+requests (unknown keys, the other method's inputs, non-finite amounts)
+get a 400, and exits with status 1 if any does not.
+
+    python benchmarks/loadtest_api.py
+    python benchmarks/loadtest_api.py --concurrency 1 8 32 128 --batch 50 --workers 4
+    python benchmarks/loadtest_api.py --pdf
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from harness import ROOT
+
+ITEM = {
+    "net_sales": "$1,250,000",
+    "cogs": 375000,
+    "employee_cost": 400000,
+    "other_operating_cost": 180000,
+    "add_backs": {"Owner's Compensation": "85k", "Depreciation and Amortization": 25000},
+    "region": "West",
+    "name": "Load Test",
+    "email": "load@example.com",
+}
+
+
+# Requests the API must reject with 400, as (method, body)
+REJECTED = (
+    ("sde", {"net_sales": 1_250_000}),
+    ("ebitda", {"income": 1_250_000}),
+    ("ebitda", {"net_sales": 1_250_000, "netsales": 5}),
+    ("ebitda", {"items": [{"net_sales": 1_250_000}, {"net_sales": 1, "cogss": 2}]}),
+    ("ebitda", {"net_sales": "1e400"}),
+    ("ebitda", {"net_sales": 1_250_000, "region": ["West"]}),
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workers):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "mra", "serve", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+async def _request(reader, writer, head, body):
+    writer.write(head + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, head, body, stop, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            status = await _request(reader, writer, head, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def _head(host, port, path, body):
+    return (f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n").encode()
+
+
+async def rejection_failures(host, port):
+    """The ``REJECTED`` requests that did not get a 400, as ``(method, body, status)``."""
+    reader, writer = await asyncio.open_connection(host, port)
+    failures = []
+    try:
+        for method, payload in REJECTED:
+            body = json.dumps(payload).encode()
+            status = await _request(reader, writer, _head(host, port, f"/v1/valuations/{method}", body), body)
+            if status != 400:
+                failures.append((method, payload, status))
+    finally:
+        writer.close()
+    return failures
+
+
+async def run_level(host, port, path, payload, concurrency, seconds):
+    body = json.dumps(payload).encode()
+    head = _head(host, port, path, body)
+    latencies, errors = [], []
+    stop = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, head, body, stop, latencies, errors)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p99_ms": 1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="existing server to target, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--workers", type=int, default=1, help="server processes when starting one")
+    parser.add_argument("--method", choices=("ebitda", "sde"), default="ebitda")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each level")
+    parser.add_argument("--batch", type=int, default=1, help="valuations per request")
+    parser.add_argument("--pdf", action="store_true", help="ask for the PDF report")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", _free_port()
+        server = start_server(port, args.workers)
+
+    item = dict(ITEM)
+    if args.method == "sde":
+        item = {"income": item.pop("net_sales"), "purchases": item.pop("cogs"),
+                "labor": item.pop("employee_cost"), "operating_expenses": item.pop("other_operating_cost"),
+                **item}
+    payload = item if args.batch == 1 else {"items": [item] * args.batch}
+    path = f"/v1/valuations/{args.method}" + ("?format=pdf" if args.pdf else "")
+
+    try:
+        failures = asyncio.run(rejection_failures(host, port))
+        print(f"{len(REJECTED)} malformed requests rejected with 400 [{'FAIL' if failures else 'ok'}]")
+        for method, payload, status in failures:
+            print(f"  {method} {json.dumps(payload)}: got {status}")
+        if failures:
+            return 1
+        print(f"{path}, batch {args.batch}, {args.workers} worker(s), {args.seconds:g}s per level")
+        for concurrency in args.concurrency:
+            r = asyncio.run(run_level(host, port, path, payload, concurrency, args.seconds))
+            print(f"concurrency {concurrency:>4}: {r['rps']:>8,.0f} req/s "
+                  f"({r['rps'] * args.batch:>9,.0f} valuations/s), p50 {r['p50_ms']:6.1f} ms, "
+                  f"p99 {r['p99_ms']:6.1f} ms, {r['errors']} errors")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Load test for a calculator page served by ``python -m mra deploy``.
+
+For each worker count, starts the deployment on a free local port with
+stub secrets, then runs ``--sessions`` simulated users for ``--seconds``.
+Each user acts like a browser filling in the form:
+- loads the page, which pins it to a worker
+- opens the Streamlit websocket
+- enters name, email, the P&L figures and an owner add-back one field at a
+  time, waiting for each rerun to finish
+- fetches the donut chart whenever a rerun shows it
+Then it starts over as a new user. Figures are drawn from ``--profiles``
+sets, so some charts repeat across users, as they would in practice.
+
+Reports reruns/s, completed users/s, rerun p50/p99 latency, errors and how
+users were spread over the workers, per worker count.
+
+    python benchmarks/loadtest_pages.py --page sde_calculator.py --workers 1 2 4 --sessions 32
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+from harness import PAGES, ROOT, SECRETS
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+WIDGETS = ("text_input", "selectbox", "button")
+
+
+def _free_port(span):
+    # A port with ``span`` free ports after it, for the workers
+    while True:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        if port + span < 65535:
+            return port
+
+
+def _secrets_file(directory):
+    path = os.path.join(directory, "secrets.toml")
+    with open(path, "w") as f:
+        for key, value in SECRETS.items():
+            if not isinstance(value, dict):
+                f.write(f'{key} = "{value}"\n')
+        f.write("[gcp_service_account]\n")
+    return path
+
+
+async def _get(host, port, path, cookie=None):
+    """A bare HTTP/1.1 GET; returns (status, headers text)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    headers = f"Cookie: {cookie}\r\n" if cookie else ""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{headers}Connection: close\r\n\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    head = response.split(b"\r\n\r\n", 1)[0].decode("latin-1")
+    return int(head.split()[1]), head
+
+
+def start_deployment(page, workers, port, secrets_path):
+    env = dict(os.environ, STREAMLIT_SECRETS_FILES=secrets_path)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "mra", "deploy", page, "--workers", str(workers), "--port", str(port),
+         "--cache-dir", os.path.join(os.path.dirname(secrets_path), "cache")],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    async def ready():
+        deadline = time.monotonic() + 60
+        for worker_port in range(port + 1, port + 1 + workers):
+            while True:
+                try:
+                    if (await _get("127.0.0.1", worker_port, "/_stcore/health"))[0] == 200:
+                        break
+                except OSError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("deployment did not start")
+                await asyncio.sleep(0.2)
+
+    try:
+        asyncio.run(ready())
+    except BaseException:
+        server.kill()
+        raise
+    return server
+
+
+async def _rerun(ws, states, widgets, fragment_id=""):
+    """Send one rerun and read until it finishes; returns the image URLs shown."""
+    message = BackMsg()
+    message.rerun_script.page_script_hash = ""
+    if fragment_id:
+        message.rerun_script.fragment_id = fragment_id
+    for widget_id, value in states.items():
+        state = message.rerun_script.widget_states.widgets.add()
+        state.id = widget_id
+        state.string_value = value
+    await ws.send(message.SerializeToString())
+
+    images = []
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await ws.recv())
+        kind = forward.WhichOneof("type")
+        if kind == "script_finished":
+            return images
+        if kind != "delta" or forward.delta.WhichOneof("type") != "new_element":
+            continue
+        element = forward.delta.new_element
+        element_type = element.WhichOneof("type")
+        if element_type in WIDGETS:
+            widget = getattr(element, element_type)
+            widgets[widget.label] = (widget.id, forward.delta.fragment_id)
+        elif element_type == "imgs":
+            images.extend(image.url for image in element.imgs.imgs)
+
+
+async def _user(host, port, steps, stats):
+    status, head = await _get(host, port, "/")
+    match = re.search(r"(?im)^set-cookie: (mra_worker=\d+)", head)
+    if status != 200 or not match:
+        stats["errors"] += 1
+        return
+    cookie = match.group(1)
+    stats["workers"][cookie] = stats["workers"].get(cookie, 0) + 1
+
+    async with websockets.connect(f"ws://{host}:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                  additional_headers={"Cookie": cookie}, max_size=None) as ws:
+        widgets, states = {}, {}
+        await _rerun(ws, states, widgets)
+        for label, value in steps:
+            widget_id, fragment_id = widgets[label]
+            states[widget_id] = value
+            start = time.perf_counter()
+            images = await _rerun(ws, states, widgets, fragment_id)
+            stats["latencies"].append(time.perf_counter() - start)
+            for url in images:
+                if (await _get(host, port, url, cookie))[0] != 200:
+                    stats["errors"] += 1
+    stats["users"] += 1
+
+
+def _steps(page, profile):
+    labels = PAGES[page]
+    rng = random.Random(profile)
+    sales = rng.randrange(400_000, 3_000_000, 10_000)
+    costs = [round(sales * share, -3) for share in (0.3, 0.3, 0.15)]
+    return [
+        ("Name", f"Member {profile}"),
+        ("Email", f"member{profile}@example.com"),
+        (labels["sales"], f"{sales:,}"),
+        *zip(labels["costs"], (f"{c:,.0f}" for c in costs)),
+        (labels["add_back"], f"{rng.randrange(20_000, 120_000, 5_000):,}"),
+    ]
+
+
+async def run_level(host, port, page, sessions, seconds, profiles):
+    stats = {"latencies": [], "users": 0, "errors": 0, "workers": {}}
+    stop = time.monotonic() + seconds
+    rng = random.Random(0)
+
+    async def client():
+        while time.monotonic() < stop:
+            try:
+                await _user(host, port, _steps(page, rng.randrange(profiles)), stats)
+            except (OSError, KeyError, websockets.WebSocketException):
+                stats["errors"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(sessions)))
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", choices=sorted(PAGES), default="sde_calculator.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent simulated users")
+    parser.add_argument("--seconds", type=float, default=30.0, help="duration per worker count")
+    parser.add_argument("--profiles", type=int, default=50, help="distinct sets of figures")
+    args = parser.parse_args()
+
+    print(f"{args.page}: {args.sessions} concurrent users, {args.seconds:g}s per worker count, "
+          f"{os.cpu_count()} CPUs")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            port = _free_port(workers)
+            server = start_deployment(args.page, workers, port, _secrets_file(tmp))
+            try:
+                stats = asyncio.run(run_level("127.0.0.1", port, args.page, args.sessions,
+                                              args.seconds, args.profiles))
+            finally:
+                server.terminate()
+                server.wait()
+        latencies = sorted(stats["latencies"]) or [0.0]
+        spread = ", ".join(str(n) for _, n in sorted(stats["workers"].items()))
+        print(f"{workers} worker(s): {len(stats['latencies']) / stats['seconds']:6.1f} reruns/s, "
+              f"{stats['users'] / stats['seconds']:5.2f} users/s, "
+              f"p50 {1000 * latencies[len(latencies) // 2]:6.0f} ms, "
+              f"p99 {1000 * latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]:6.0f} ms, "
+              f"{stats['errors']} errors, users per worker: {spread}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""Benchmark suite for rerun latency, chart rendering, PDF builds and memory.
+
+Drives both calculator pages headlessly with scripted input sequences and
+writes every measurement to one JSON file, so runs can be diffed. With
+``--compare`` it also checks the new results against an earlier file and
+exits with status 1 if any timing or memory figure regressed by more than
+``--tolerance``. A run fails (status 1) without writing results if any
+scripted rerun raised, since its timings would be for an error page.
+
+    python benchmarks/suite.py --out bench.json
+    python benchmarks/suite.py --out new.json --compare bench.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from harness import PAGES, open_page, text_input, type_into
+
+from mra import charts, reports
+
+SALES = "1250000"
+ADD_BACK = "85000"
+COSTS = ("375000", "400000", "180000")
+
+
+def _summary(seconds):
+    ordered = sorted(seconds)
+    return {
+        "n": len(ordered),
+        "mean_ms": 1000 * statistics.fmean(ordered),
+        "p50_ms": 1000 * ordered[len(ordered) // 2],
+        "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max_ms": 1000 * ordered[-1],
+    }
+
+
+class RerunError(Exception):
+    """A scripted rerun raised instead of rendering the page."""
+
+
+def _check(at, step):
+    if at.exception:
+        messages = "; ".join(str(e.message) for e in at.exception)
+        raise RerunError(f"{step}: {messages}")
+
+
+def _timed_typing(at, label, text):
+    timings = []
+    start = time.perf_counter()
+    for typed in type_into(at, label, text):
+        timings.append(time.perf_counter() - start)
+        _check(at, f"typing {typed!r} into {label!r}")
+        start = time.perf_counter()
+    return timings
+
+
+def page_scenarios(page):
+    """Rerun latency for each scripted input sequence on ``page``."""
+    labels = PAGES[page]
+    results = {}
+
+    start = time.perf_counter()
+    at = open_page(page)
+    results["first_run"] = _summary([time.perf_counter() - start])
+    _check(at, "first run")
+
+    results["type_sales"] = _summary(_timed_typing(at, labels["sales"], SALES))
+
+    fill = []
+    for label, value in zip(labels["costs"], COSTS):
+        fill.extend(_timed_typing(at, label, value))
+    results["type_costs"] = _summary(fill)
+
+    results["type_add_back"] = _summary(_timed_typing(at, labels["add_back"], ADD_BACK))
+    return results
+
+
+def page_peak_memory(page):
+    """Peak traced allocation (KiB) while filling in the page from scratch."""
+    labels = PAGES[page]
+    tracemalloc.start()
+    at = open_page(page)
+    for typed in type_into(at, labels["sales"], SALES):
+        _check(at, f"typing {typed!r} into {labels['sales']!r}")
+    for label, value in zip(labels["costs"], COSTS):
+        _check(text_input(at, label).input(value).run(), f"entering {value!r} in {label!r}")
+    _check(text_input(at, labels["add_back"]).input(ADD_BACK).run(), f"entering {ADD_BACK!r} in the add-back")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def chart_render(samples=20):
+    """Donut render time, cold (cache miss) and warm (cache hit)."""
+    results = {}
+    for kind in ("ebitda", "sde"):
+        charts.cache_clear()
+        charts.donut_png(kind, 1, 1, 50)  # first draw pays the matplotlib import
+        cold, warm = [], []
+        for i in range(samples):
+            args = (kind, 800_000 + 1_000 * i, 250_000 + 500 * i, 24)
+            start = time.perf_counter()
+            charts.donut_png(*args)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            charts.donut_png(*args)
+            warm.append(time.perf_counter() - start)
+        results[kind] = {"cold": _summary(cold), "warm": _summary(warm)}
+    return results
+
+
+def pdf_build(samples=50):
+    """Report build time, cold and cached, for both report layouts."""
+    results = {}
+    builders = {
+        "ebitda": lambda i: reports.ebitda_report_pdf(reports.ebitda_report_rows(
+            "Bench", "bench@example.com", 900_000 + i, 350_000, 28, 60_000, 410_000,
+            (512_500, 615_000, 820_000)), reports.report_chart(900_000 + i, 350_000, 28)),
+        "sde": lambda i: reports.sde_report_pdf(reports.sde_report_lines(
+            "Bench", "bench@example.com", 900_000 + i, 350_000, 28, 60_000, 350_000, 410_000,
+            (615_000, 820_000, 1_025_000), [("Other", 0)]), reports.report_chart(900_000 + i, 350_000, 28)),
+    }
+    for kind, build in builders.items():
+        reports.cache_clear()
+        build(-1)  # first build pays the imports and builds the template
+        cold, warm = [], []
+        for i in range(samples):
+            start = time.perf_counter()
+            build(i)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            build(i)
+            warm.append(time.perf_counter() - start)
+        results[kind] = {"cold": _summary(cold), "warm": _summary(warm)}
+    return results
+
+
+def run_suite():
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "charts": chart_render(),
+        "pdf": pdf_build(),
+        "pages": {},
+    }
+    for page in PAGES:
+        try:
+            results["pages"][page] = {
+                "reruns": page_scenarios(page),
+                "peak_memory_kib": page_peak_memory(page),
+            }
+        except RerunError as e:
+            raise RerunError(f"{page}, {e}") from None
+    return results
+
+
+def _flatten(tree, prefix=""):
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{path}.")
+        elif isinstance(value, (int, float)):
+            yield path, value
+
+
+def compare(old, new, tolerance, floor_ms=1.0):
+    """Return ``(metric, old, new)`` for every timing or memory figure that regressed.
+
+    Only means, medians and memory are compared; tails over a handful of
+    samples are too noisy to gate on, as are timings under ``floor_ms``.
+    """
+    old_values = dict(_flatten({k: v for k, v in old.items() if k != "meta"}))
+    regressions = []
+    for path, value in _flatten({k: v for k, v in new.items() if k != "meta"}):
+        if not path.endswith(("mean_ms", "p50_ms", "_kib")) or path not in old_values:
+            continue
+        before = old_values[path]
+        if path.endswith("_ms") and max(before, value) < floor_ms:
+            continue
+        if before > 0 and value > before * (1 + tolerance):
+            regressions.append((path, before, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="bench.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    try:
+        results = run_suite()
+    except RerunError as e:
+        print(f"FAILED {e}")
+        return 1
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    for page, page_results in results["pages"].items():
+        reruns = page_results["reruns"]
+        print(f"{page}: typing sales p50 {reruns['type_sales']['p50_ms']:.1f} ms, "
+              f"add-back p50 {reruns['type_add_back']['p50_ms']:.1f} ms, "
+              f"peak memory {page_results['peak_memory_kib']:,.0f} KiB")
+    for kind in ("ebitda", "sde"):
+        print(f"{kind}: donut cold p50 {results['charts'][kind]['cold']['p50_ms']:.1f} ms, "
+              f"PDF cold p50 {results['pdf'][kind]['cold']['p50_ms']:.2f} ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for path, before, after in regressions:
+            print(f"REGRESSION {path}: {before:.2f} -> {after:.2f}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
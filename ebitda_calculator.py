@@ -1,36 +1,32 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-
-# Set page layout
-st.set_page_config(layout="wide")
-
-# Custom CSS for input fields
-st.markdown("""
-<style>
-input[type=text], input[type=number] {
-    text-align: right;
-    border: 2px solid #d3d3d3 !important;
-    border-radius: 6px !important;
-    padding: 10px !important;
-    font-size: 16px !important;
-    color: #000000 !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Logo
-st.markdown('<div class="centered-image">', unsafe_allow_html=True)
-st.image("images/MRA logo 9.2015-colorLG.jpg", width=500)
-st.markdown('</div>', unsafe_allow_html=True)
+from functools import partial
+
+from mra.addbacks import add_back_inputs, widget_keys
+from mra.assets import stylesheet
+from mra.charts import donut_png
+from mra.comps import describe, multiple_band, segment_inputs
+from mra.engine import EBITDA_COLUMNS, ebitda_valuation, multiple_label
+from mra.metrics import begin_rerun, cpu_timed, end_rerun, rerun_timed, span
+from mra.montecarlo import monte_carlo_section
+from mra.pnl import import_section, parse_amount
+from mra.prewarm import CHART_MODULES, IMPORT_MODULES, REPORT_MODULES, prewarm
+from mra.reports import ebitda_report_pdf, ebitda_report_rows, report_chart
+from mra.resources import submission_store
+from mra.sensitivity import sensitivity_section
+from mra.ttm import ttm_section
+
+# Page config and logo are set once for both pages, in app.py
+begin_rerun("ebitda")
+
+# Custom CSS for input fields (assets/ebitda.css, served as a cached static file)
+stylesheet("ebitda.css")
 
 # Title and inputs
 st.title("MRA EBITDA Valuation Calculator")
 st.markdown("### Your Info")
+st.markdown("""
+*The financial information you provide in this modeling tool is only saved, together with your results, when you download the report with your name and email filled in, and is not shared.*
+""")
 col1, col2 = st.columns([1, 1])
 with col1:
     st.markdown('<p style="font-size: 16px; font-weight: bold;">Name</p>', unsafe_allow_html=True)
@@ -39,48 +35,56 @@ with col2:
     st.markdown('<p style="font-size: 16px; font-weight: bold;">Email</p>', unsafe_allow_html=True)
     email = st.text_input("Email", label_visibility="collapsed")
 
-# Helper for comma input parsing
+# Helper for currency input parsing: "$1,200", "(500)" and "1.2M" all work
 def parse_input(input_str):
-    try:
-        return float(input_str.replace(",", ""))
-    except:
+    value = parse_amount(input_str)
+    if value is None:
+        st.warning(f"⚠️ Couldn't read \"{input_str}\" as an amount; counting it as $0.")
         return 0.0
+    return value
 
-# Helper function for autopct formatting
-def make_autopct(values):
-    def autopct(pct):
-        total = sum(values)
-        val = int(round(pct * total / 100.0))
-        return f"${val:,}"
-    return autopct
+# Saves the valuation to the local submission store when the PDF is downloaded,
+# only if both name and email were given
+def save_submission(name, email, sales, inputs, add_backs, result, multiples, region, concept):
+    if not (name and email):
+        return
+    try:
+        submission_store().record("ebitda", name, email, sales, inputs, add_backs, result, multiples,
+                                  region=region, concept=concept)
+    except Exception as e:
+        st.error(f"❌: {e}")
 
 # Financial inputs
 st.markdown("---")
 st.subheader("Financial Information")
+import_section("ebitda", EBITDA_COLUMNS, widget_keys("ebitda_add_back"), key="ebitda_import")
 col1, col2 = st.columns([1, 1])
 with col1:
     st.markdown('<p style="font-size: 16px; font-weight: bold;">Net Sales ($)</p>', unsafe_allow_html=True)
-    net_sales_str = st.text_input("Net Sales ($)", value="", label_visibility="collapsed")
+    net_sales_str = st.text_input("Net Sales ($)", key="net_sales", label_visibility="collapsed")
     st.markdown('<p style="font-size: 16px; font-weight: bold;">COGS ($)</p>', unsafe_allow_html=True)
-    cogs_str = st.text_input("COGS ($)", value="", label_visibility="collapsed")
+    cogs_str = st.text_input("COGS ($)", key="cogs", label_visibility="collapsed")
 with col2:
     st.markdown('<p style="font-size: 16px; font-weight: bold;">Employee Cost ($)</p>', unsafe_allow_html=True)
-    employee_cost_str = st.text_input("Employee Cost ($)", value="", label_visibility="collapsed")
+    employee_cost_str = st.text_input("Employee Cost ($)", key="employee_cost", label_visibility="collapsed")
     st.markdown('<p style="font-size: 16px; font-weight: bold;">Other Operating Cost ($)</p>', unsafe_allow_html=True)
-    other_operating_cost_str = st.text_input("Other Operating Cost ($)", value="", label_visibility="collapsed")
+    other_operating_cost_str = st.text_input("Other Operating Cost ($)", key="other_operating_cost", label_visibility="collapsed")
+
+with span("parse_inputs"):
+    net_sales = parse_input(net_sales_str)
+    cogs = parse_input(cogs_str)
+    employee_cost = parse_input(employee_cost_str)
+    other_operating_cost = parse_input(other_operating_cost_str)
 
-net_sales = parse_input(net_sales_str)
-cogs = parse_input(cogs_str)
-employee_cost = parse_input(employee_cost_str)
-other_operating_cost = parse_input(other_operating_cost_str)
+# Region and concept pick the comparable sales the multiples come from
+region, concept = segment_inputs("ebitda", key="ebitda_comps")
 
 # EBITDA Calculation
-if net_sales > 0:
-    total_expenses = cogs + employee_cost + other_operating_cost
-    ebitda = net_sales - total_expenses
-    ebitda_margin = (ebitda / net_sales) * 100
-else:
-    total_expenses, ebitda, ebitda_margin = 0, 0, 0
+with span("valuation"):
+    pnl = ebitda_valuation(net_sales, cogs, employee_cost, other_operating_cost)
+total_expenses = float(pnl["total_expenses"])
+ebitda = float(pnl["ebitda"])
+ebitda_margin = float(pnl["margin"])
 
 st.write(f"### Total Operating Expenses: **${total_expenses:,.0f}**")
 st.write(f"### EBITDA: **${ebitda:,.0f}**")
@@ -94,50 +98,8 @@ elif ebitda < 0:
 else:
     st.subheader("EBITDA Margin Breakdown")
 
-    values = [total_expenses, ebitda]
-    labels = ["Total Operating Expense", "EBITDA"]
-    colors = ['#2E86AB', '#F5B041']
-
-    # Smaller donut chart size
-    fig, ax = plt.subplots(figsize=(2.8, 2.8))  # ⬅️ Reduced size
-
-    wedges, texts, autotexts = ax.pie(
-        values,
-        labels=labels,
-        colors=colors,
-        autopct=make_autopct(values),
-        startangle=90,
-        wedgeprops=dict(width=0.35, edgecolor='white'),  # Thinner ring
-        textprops=dict(color="black", fontsize=8)
-    )
-
-    # Center EBITDA % text
-    ax.text(
-        0, 0, f"{ebitda_margin:.0f}%",
-        ha='center', va='center',
-        fontsize=12,
-        fontweight='bold',
-        color='black'
-    )
-
-    # Title
-    ax.set_title("EBITDA Margin", fontsize=12, fontweight='bold', pad=10)
-
-    # Compact legend
-    legend_labels = [f"{labels[i]}: ${values[i]:,}" for i in range(len(labels))]
-    patches = [mpatches.Patch(color=colors[i], label=legend_labels[i]) for i in range(len(labels))]
-    ax.legend(
-        handles=patches,
-        loc='lower center',
-        bbox_to_anchor=(0.5, -0.35),
-        ncol=1,
-        frameon=False,
-        fontsize=9
-    )
-
-    ax.axis('equal')
-    plt.tight_layout()
-    st.pyplot(fig)
+    # Rendered once per distinct set of numbers, then served from cache
+    st.image(donut_png("ebitda", total_expenses, ebitda, ebitda_margin), width="stretch")
 
 # Owner Benefit inputs
 st.subheader("Owner Benefit Calculation")
@@ -149,121 +111,110 @@ Please do not double-count them here.
 </div>
 """, unsafe_allow_html=True)
 
-owner_inputs = {
-    "Owner's Compensation": "",
-    "Health Insurance": "",
-    "Auto Expense": "",
-    "Cellphone Expense": "",
-    "Other Personal Expense": "",
-    "Extraordinary Nonrecurring Expense": "",
-    "Receipts for Owner Purchases": "",
-    "Depreciation and Amortization": "",
-    "Interest on Loan Payments": "",
-    "Travel and Entertainment": "",
-    "Donations": "",
-    "Other 1": "",
-    "Other 2": "",
-    "Other 3": ""
-}
-
-cols = st.columns(2)
-categories = {}
-for i, (label, default) in enumerate(owner_inputs.items()):
-    with cols[i % 2]:
-        st.markdown(f'<p style="font-size: 16px; font-weight: bold;">{label} ($)</p>', unsafe_allow_html=True)
-        categories[label] = st.text_input(f"{label} ($)", value=default, label_visibility="collapsed")
-
-total_owner_benefit = sum(parse_input(val) for val in categories.values())
-st.write(f"### Total Owner Benefit: **${total_owner_benefit:,.0f}**")
-
-# Valuation Base: EBITDA + Owner Benefit
-valuation_base = ebitda + total_owner_benefit
-st.write(f"### Valuation Base (EBITDA + Owner Benefit): **${valuation_base:,.0f}**")
-
-# Multiples Section
-st.subheader("Determining the Multiple")
-st.markdown("""
-### How Multiples Work  
-Multiples help determine the estimated business valuation. Most common multiples in the restaurant industry range from **1.25x to 2.0x** of the EBITDA + Owner Benefit.
-""")
-
-low_multiple = valuation_base * 1.25
-median_multiple = valuation_base * 1.5
-high_multiple = valuation_base * 2.0
-
-if valuation_base > 0:
-    st.write(f"#### Low Multiple (1.25x): **${low_multiple:,.0f}**")
-    st.write(f"#### Median Multiple (1.5x): **${median_multiple:,.0f}**")
-    st.write(f"#### High Multiple (2.0x): **${high_multiple:,.0f}**")
-else:
-    st.warning("\u26a0\ufe0f **Enter values above to calculate multiple valuations.**")
-
-# PDF Export
-st.subheader("Export Results")
-
-# Define data dictionary for PDF generation
-data = {
-    "Metric": [
-        "Name",
-        "Email",
-        "Total Operating Expenses",
-        "EBITDA",
-        "EBITDA Margin",
-        "Total Owner Benefit",
-        "Valuation Base (EBITDA + Owner Benefit)",
-        "Low Multiple (1.25x)",
-        "Median Multiple (1.5x)",
-        "High Multiple (2.0x)"
-    ],
-    "Value": [
-        name,
-        email,
-        f"${total_expenses:,.0f}",
-        f"${ebitda:,.0f}",
-        f"{ebitda_margin:.0f}%",
-        f"${total_owner_benefit:,.0f}",
-        f"${valuation_base:,.0f}",
-        f"${low_multiple:,.0f}",
-        f"${median_multiple:,.0f}",
-        f"${high_multiple:,.0f}"
-    ]
-}
-
-def generate_pdf(data):
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    # Title
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(100, height - 50, "MRA EBITDA Valuation Report")
-
-    y_position = height - 90
-
-    # Draw each line
-    for metric, value in zip(data["Metric"], data["Value"]):
-        # Section headers in bold
-        if "Name" in metric or "Owner" in metric or "Valuation Base" in metric:
-            pdf.setFont("Helvetica-Bold", 12)
-        else:
-            pdf.setFont("Helvetica", 12)
+# Everything below depends only on the P&L figures above plus the add-back
+# inputs, so it runs as a fragment: editing an add-back reruns this section
+# (owner benefit, multiples, export) without redrawing the P&L and chart.
+# The analysis expanders only run while open, as nested fragments driven by
+# their own sliders.
+@st.fragment
+@cpu_timed(lambda: st.session_state.setdefault("cpu_seconds", {}), "valuation_section")
+@rerun_timed("ebitda_valuation_section")
+def valuation_section(net_sales, cogs, employee_cost, other_operating_cost,
+                      total_expenses, ebitda, ebitda_margin, region, concept, name, email):
+    # One input per add-back in mra.addbacks; custom ones can be renamed
+    add_backs, names = add_back_inputs("ebitda_add_back")
+    with span("valuation"):
+        multiples, comps = multiple_band("ebitda", net_sales, ebitda_margin, region, concept)
+        result = ebitda_valuation(
+            net_sales, cogs, employee_cost, other_operating_cost,
+            owner_benefit=sum(add_backs.values()), multiples=multiples,
+        )
+    total_owner_benefit = float(result["owner_benefit"])
+    st.write(f"### Total Owner Benefit: **${total_owner_benefit:,.0f}**")
+
+    # Valuation Base: EBITDA + Owner Benefit
+    valuation_base = float(result["valuation_base"])
+    st.write(f"### Valuation Base (EBITDA + Owner Benefit): **${valuation_base:,.0f}**")
+
+    # Multiples Section
+    st.subheader("Determining the Multiple")
+    st.markdown("""
+    ### How Multiples Work  
+    Multiples help determine the estimated business valuation. Most common multiples in the restaurant industry range from **1.25x to 2.0x** of the EBITDA + Owner Benefit.
+    """)
+
+    low_multiple, median_multiple, high_multiple = (float(v) for v in result["valuations"])
+    low_label, median_label, high_label = (multiple_label(m) for m in multiples)
+
+    if valuation_base > 0:
+        st.write(f"#### Low Multiple ({low_label}): **${low_multiple:,.0f}**")
+        st.write(f"#### Median Multiple ({median_label}): **${median_multiple:,.0f}**")
+        st.write(f"#### High Multiple ({high_label}): **${high_multiple:,.0f}**")
+        if comps is not None:
+            st.caption(describe(comps))
+    else:
+        st.warning("\u26a0\ufe0f **Enter values above to calculate multiple valuations.**")
+
+    # Sensitivity Analysis
+    if net_sales > 0 and valuation_base > 0:
+        sensitivity = st.expander(
+            "Sensitivity Analysis: valuation across multiples and cost ratios",
+            key="ebitda_sensitivity_open", on_change="rerun"
+        )
+        if sensitivity.open:
+            with sensitivity:
+                st.fragment(sensitivity_section)(
+                    net_sales, ebitda, total_owner_benefit,
+                    (multiples[0], multiples[-1]),
+                    {"COGS": cogs, "Employee Cost": employee_cost, "Other Operating Cost": other_operating_cost},
+                    key="ebitda_sensitivity"
+                )
+        monte_carlo = st.expander(
+            "Monte Carlo: valuation range with probabilities",
+            key="ebitda_monte_carlo_open", on_change="rerun"
+        )
+        if monte_carlo.open:
+            with monte_carlo:
+                st.fragment(monte_carlo_section)(
+                    "ebitda",
+                    (net_sales, cogs, employee_cost, other_operating_cost),
+                    tuple(add_backs.values()),
+                    multiples,
+                    key="ebitda_monte_carlo"
+                )
+
+    # PDF Export
+    st.subheader("Export Results")
+
+    # Rows and donut inputs for PDF generation; the PDF is only built when the
+    # button is clicked, and cached per set of rows
+    report_rows = ebitda_report_rows(
+        name, email, total_expenses, ebitda, ebitda_margin, total_owner_benefit,
+        valuation_base, (low_multiple, median_multiple, high_multiple), multiples=multiples
+    )
+    chart = report_chart(total_expenses, ebitda, ebitda_margin)
+    st.download_button(
+        label="Download Results as PDF",
+        data=partial(ebitda_report_pdf, report_rows, chart),
+        file_name="ebitda_results.pdf",
+        mime="application/pdf",
+        on_click=save_submission,
+        args=(name, email, net_sales,
+              dict(zip(EBITDA_COLUMNS, (net_sales, cogs, employee_cost, other_operating_cost))),
+              {names[label]: value for label, value in add_backs.items()}, result, multiples, region, concept)
+    )
 
-        pdf.drawString(80, y_position, f"{metric}: {value}")
-        y_position -= 20
 
-        # Add extra spacing after major sections
-        if "Margin" in metric or "Total Owner Benefit" in metric or "High Multiple" in metric:
-            y_position -= 10
+valuation_section(net_sales, cogs, employee_cost, other_operating_cost,
+                  total_expenses, ebitda, ebitda_margin, region, concept, name, email)
 
-    pdf.save()
-    buffer.seek(0)
-    return buffer
+# Monthly history is a separate input, so the TTM trend has its own fragment
+ttm = st.expander("Trailing twelve months: valuation trend from monthly history",
+                  key="ebitda_ttm_open", on_change="rerun")
+if ttm.open:
+    with ttm:
+        st.fragment(ttm_section)("ebitda", key="ebitda_ttm")
+end_rerun()
 
-# Generate PDF and provide download button
-pdf_buffer = generate_pdf(data)
-st.download_button(
-    label="Download Results as PDF",
-    data=pdf_buffer,
-    file_name="ebitda_results.pdf",
-    mime="application/pdf"
-)
+# The page has painted; load the libraries the chart and buttons need in the background
+prewarm(CHART_MODULES + REPORT_MODULES + IMPORT_MODULES)
@@ -0,0 +1,21 @@
+"""Shared valuation code for the MRA EBITDA and SDE calculators."""
+
+from mra.engine import (
+    EBITDA_ADD_BACKS,
+    EBITDA_MULTIPLES,
+    SDE_ADD_BACKS,
+    SDE_MULTIPLES,
+    ebitda_valuation,
+    sde_valuation,
+    value_frame,
+)
+
+__all__ = [
+    "EBITDA_ADD_BACKS",
+    "EBITDA_MULTIPLES",
+    "SDE_ADD_BACKS",
+    "SDE_MULTIPLES",
+    "ebitda_valuation",
+    "sde_valuation",
+    "value_frame",
+]
@@ -0,0 +1,100 @@
+"""Command-line entry point: ``python -m mra <command> ...``."""
+
+import argparse
+import os
+import sys
+
+
+def _check_input(check_columns, args):
+    # A wrong or mistyped CSV ends the command with one line, not a traceback
+    try:
+        check_columns(args.input, args.method)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+
+
+def _batch(args):
+    from mra.batch import check_columns, run_batch
+
+    _check_input(check_columns, args)
+    stats = run_batch(args.input, args.method, args.out, workers=args.workers,
+                      chunk_size=args.chunk_size)
+    print(f"{stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s): "
+          f"{stats['rendered']} rendered, {stats['skipped']} already present, "
+          f"{stats['invalid']} with unreadable amounts")
+
+
+def _portfolio(args):
+    from mra.batch import check_columns
+    from mra.portfolio import write_portfolio
+
+    _check_input(check_columns, args)
+    count = write_portfolio(args.input, args.out, args.method, chunk_size=args.chunk_size)
+    print(f"Wrote {count} valuations to {args.out}")
+
+
+def _serve(args):
+    from mra.api import serve
+
+    serve(host=args.host, port=args.port, workers=args.workers)
+
+
+def _deploy(args):
+    from mra.deploy import nginx_config, run
+
+    if args.nginx:
+        ports = [args.port + 1 + i for i in range(args.workers or os.cpu_count() or 1)]
+        static_dir = os.path.join(os.path.dirname(os.path.abspath(args.page)), "static")
+        print(nginx_config(ports, args.port, static_dir))
+    run(args.page, workers=args.workers, host=args.host, port=args.port,
+        cache_dir=args.cache_dir, proxy=not args.nginx)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m mra", description="MRA valuation tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="value a membership CSV and write one PDF per row")
+    batch.add_argument("input", help="CSV with name, email, P&L inputs and owner add-backs")
+    batch.add_argument("--method", choices=("ebitda", "sde"), default="sde")
+    batch.add_argument("--out", default="reports", help="output directory (default: reports)")
+    batch.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    batch.add_argument("--chunk-size", type=int, default=1000, help="CSV rows read per chunk")
+    batch.set_defaults(func=_batch)
+
+    portfolio = commands.add_parser("portfolio", help="value a membership CSV into one multi-page PDF")
+    portfolio.add_argument("input", help="CSV with name, email, P&L inputs and owner add-backs")
+    portfolio.add_argument("--method", choices=("ebitda", "sde"), default="sde")
+    portfolio.add_argument("--out", default="portfolio.pdf", help="output PDF (default: portfolio.pdf)")
+    portfolio.add_argument("--chunk-size", type=int, default=1000, help="CSV rows read per chunk")
+    portfolio.set_defaults(func=_portfolio)
+
+    serve = commands.add_parser("serve", help="run the JSON valuation API")
+    serve.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    serve.add_argument("--workers", type=int, default=1, help="server processes (default: 1)")
+    serve.set_defaults(func=_serve)
+
+    deploy = commands.add_parser("deploy", help="serve a page from several Streamlit workers behind one port")
+    deploy.add_argument("page", help="Streamlit script, e.g. app.py")
+    deploy.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    deploy.add_argument("--host", default="127.0.0.1", help="address the proxy binds (default: 127.0.0.1)")
+    deploy.add_argument("--port", type=int, default=8501,
+                        help="proxy port; workers use the ports after it (default: 8501)")
+    deploy.add_argument("--cache-dir", default=os.path.join(".data", "cache"),
+                        help="cache shared by the workers (default: .data/cache)")
+    deploy.add_argument("--nginx", action="store_true",
+                        help="print an nginx config and start only the workers")
+    deploy.set_defaults(func=_deploy)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
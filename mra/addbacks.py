@@ -0,0 +1,107 @@
+"""Owner add-backs, declared once for both calculators.
+
+Each entry in ``ADD_BACKS`` is one adjustment to earnings:
+
+``label``
+    The name shown on the pages, in reports and in uploaded files.
+``aliases``
+    Labels earlier versions of the pages used. Uploaded files and API
+    requests may still use them.
+``custom``
+    A placeholder the user may rename on the page; the report shows the
+    user's label.
+``accounts``
+    A regular expression for P&L accounts that are this add-back by
+    definition (see ``mra.pnl``). Discretionary ones (auto, phone, travel)
+    are partly business use, so they are left to the user.
+
+The engine, both pages, the P&L import, batch files, TTM history and the
+API all take their add-backs from here, so the EBITDA and SDE calculators
+can no longer drift apart.
+"""
+
+ADD_BACKS = (
+    {"label": "Owner's Compensation",
+     "accounts": r"(?:owner|officer|shareholder)s?'?s?\b.*(?:comp|salar|wage|pay|draw)|guaranteed payment"},
+    {"label": "Health Insurance", "accounts": r"(?:owner|officer)s?'?s?\b.*(?:health|medical)"},
+    {"label": "Auto Expense"},
+    {"label": "Cell Phone Expense", "aliases": ("Cellphone Expense",)},
+    {"label": "Other Personal Expense"},
+    {"label": "Extraordinary Nonrecurring Expense"},
+    {"label": "Receipts for Owner Purchases"},
+    {"label": "Depreciation and Amortization", "accounts": r"depreciation|amortization"},
+    {"label": "Interest on Loan Payments", "accounts": r"interest expense|loan interest|^interest$"},
+    {"label": "Travel and Entertainment"},
+    {"label": "Donations", "accounts": r"donation|charit|contribution"},
+    {"label": "Family Salaries"},
+    {"label": "Occupancy Cost Adjustments"},
+    {"label": "Other", "custom": True, "aliases": ("Other 1",)},
+    {"label": "Other (Additional)", "custom": True, "aliases": ("Other 2",)},
+    {"label": "Other (Extra)", "custom": True, "aliases": ("Other 3",)},
+)
+
+LABELS = tuple(add_back["label"] for add_back in ADD_BACKS)
+CUSTOM_LABELS = tuple(add_back["label"] for add_back in ADD_BACKS if add_back.get("custom"))
+ACCOUNTS = tuple((add_back["label"], add_back["accounts"]) for add_back in ADD_BACKS if "accounts" in add_back)
+
+_CANONICAL = {
+    name.lower(): add_back["label"]
+    for add_back in ADD_BACKS
+    for name in (add_back["label"],) + add_back.get("aliases", ())
+}
+
+
+def canonical(label):
+    """The current label for ``label`` or one of its aliases (any case), or None."""
+    return _CANONICAL.get(str(label).strip().lower())
+
+
+def renames(columns):
+    """Map the columns that name an add-back other than by its label to that label."""
+    out = {}
+    for column in columns:
+        label = canonical(column)
+        if label is not None and label != column and label not in columns:
+            out[column] = label
+    return out
+
+
+def widget_keys(key):
+    """Widget key of each add-back's amount input, for prefilling them."""
+    return {label: f"{key}_{label}" for label in LABELS}
+
+
+# --- UI ---
+
+def add_back_inputs(key):
+    """Render an amount input per add-back, in two columns.
+
+    Returns ``(amounts, names)``: both are keyed by label, in ``LABELS``
+    order. ``names`` holds the label to show for each one, which for
+    custom add-backs is whatever the user typed.
+    """
+    import streamlit as st
+
+    from mra.metrics import span
+    from mra.pnl import parse_amount
+
+    keys = widget_keys(key)
+    amounts, names = {}, {}
+    cols = st.columns(2)
+    for i, add_back in enumerate(ADD_BACKS):
+        label = add_back["label"]
+        with cols[i % 2]:
+            name = label
+            if add_back.get("custom"):
+                number = CUSTOM_LABELS.index(label) + 1
+                name = st.text_input(f"Custom add-back {number} label", value=label,
+                                     key=f"{keys[label]}_label").strip() or label
+            text = st.text_input(f"{name} ($)", key=keys[label], placeholder="Enter value")
+            with span("parse_inputs"):
+                value = parse_amount(text)
+            if value is None:
+                st.warning(f"⚠️ Couldn't read \"{text}\" as an amount; counting it as $0.")
+                value = 0.0
+        amounts[label] = value
+        names[label] = name
+    return amounts, names
@@ -0,0 +1,258 @@
+"""JSON valuation API for partners, alongside the Streamlit pages.
+
+An ASGI app (Starlette, served by uvicorn) with the same calculations, owner
+add-back categories and multiple bands as the calculator pages:
+
+``POST /v1/valuations/ebitda`` and ``POST /v1/valuations/sde``
+    The body is one valuation request, or ``{"items": [...]}`` with many.
+    A request carries the method's inputs (``net_sales``, ``cogs``,
+    ``employee_cost``, ``other_operating_cost`` for EBITDA; ``income``,
+    ``purchases``, ``labor``, ``operating_expenses`` for SDE), optional
+    ``add_backs`` keyed by the page labels, optional ``region`` and
+    ``concept`` for the comparable-sales band, and optional ``name`` and
+    ``email`` for the report. Amounts may be numbers or strings such as
+    "$1,200" or "1.2M", finite and at most ``MAX_AMOUNT`` in size; region
+    and concept must be strings. Any other key, including the other
+    method's inputs, is rejected with a 400.
+``?format=pdf``
+    Return the PDF report instead: the raw PDF for a single request, or a
+    base64 ``pdf`` field on every result of a batch.
+``GET /v1/schema``
+    The inputs, add-back labels and fixed multiples of each method.
+``GET /healthz``
+
+A batch is valued in one vectorized engine call. PDF rendering runs in the
+thread pool so it never blocks the event loop. Run it with
+``python -m mra serve``.
+"""
+
+import base64
+import math
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from mra.addbacks import CUSTOM_LABELS, canonical
+from mra.comps import multiple_band
+from mra.engine import (
+    EBITDA_ADD_BACKS, EBITDA_COLUMNS, EBITDA_MULTIPLES, SDE_ADD_BACKS, SDE_COLUMNS, SDE_MULTIPLES,
+    ebitda_valuation, sde_valuation,
+)
+from mra.metrics import span
+from mra.pnl import parse_amount
+from mra.reports import ebitda_report_pdf, ebitda_report_rows, report_chart, sde_report_lines, sde_report_pdf
+
+MAX_BATCH = 1000
+MAX_AMOUNT = 1e15
+# Keys an item may carry besides the method's inputs
+ITEM_FIELDS = ("add_backs", "region", "concept", "name", "email")
+BANDS = ("low", "median", "high")
+
+METHODS = {
+    "ebitda": {
+        "columns": EBITDA_COLUMNS,
+        "add_backs": EBITDA_ADD_BACKS,
+        "multiples": EBITDA_MULTIPLES,
+        "compute": ebitda_valuation,
+        "earnings": "ebitda",
+    },
+    "sde": {
+        "columns": SDE_COLUMNS,
+        "add_backs": SDE_ADD_BACKS,
+        "multiples": SDE_MULTIPLES,
+        "compute": sde_valuation,
+        "earnings": "sde",
+    },
+}
+
+
+class RequestError(ValueError):
+    """A request the API rejects with 400 and the message."""
+
+
+def _amount(value, field, index):
+    parsed = None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            parsed = float(value)
+        except OverflowError:
+            pass
+    elif isinstance(value, str):
+        parsed = parse_amount(value)
+    # NaN and infinity (JSON's 1e400, or a string of 400 digits) are not amounts
+    if parsed is None or not math.isfinite(parsed):
+        raise RequestError(f"items[{index}].{field}: {value!r} is not an amount")
+    # Far beyond any restaurant, and small enough that sums and valuations stay finite
+    if abs(parsed) > MAX_AMOUNT:
+        raise RequestError(f"items[{index}].{field}: {value!r} is out of range")
+    return parsed
+
+
+def _check_text(item, field, index):
+    value = item.get(field)
+    if value is not None and not isinstance(value, str):
+        raise RequestError(f"items[{index}].{field} must be a string")
+
+
+def _check_keys(item, method, index):
+    allowed = METHODS[method]["columns"] + ITEM_FIELDS
+    for key in item:
+        if key in allowed:
+            continue
+        other = next((m for m, spec in METHODS.items() if key in spec["columns"]), None)
+        if other is not None:
+            raise RequestError(f"items[{index}].{key} is an {other.upper()} input; "
+                               f"post it to /v1/valuations/{other}")
+        raise RequestError(f"items[{index}].{key}: unknown field; expected some of {list(allowed)}")
+
+
+def _parse_items(body, method):
+    if isinstance(body, dict) and "items" in body:
+        items, batched = body["items"], True
+    else:
+        items, batched = [body], False
+    if not isinstance(items, list) or not items:
+        raise RequestError("items must be a non-empty list")
+    if len(items) > MAX_BATCH:
+        raise RequestError(f"at most {MAX_BATCH} items per request")
+
+    spec = METHODS[method]
+    labels = spec["add_backs"]
+    inputs = np.zeros((len(items), len(spec["columns"])))
+    add_backs = np.zeros((len(items), len(labels)))
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise RequestError(f"items[{i}] must be an object")
+        _check_keys(item, method, i)
+        for j, column in enumerate(spec["columns"]):
+            inputs[i, j] = _amount(item.get(column, 0), column, i)
+        extra = item.get("add_backs") or {}
+        if not isinstance(extra, dict):
+            raise RequestError(f"items[{i}].add_backs must be an object")
+        unknown = [name for name in extra if canonical(name) not in labels]
+        if unknown:
+            raise RequestError(f"items[{i}].add_backs: unknown categories {sorted(unknown)}; "
+                               f"expected some of {list(labels)}")
+        for name, value in extra.items():
+            add_backs[i, labels.index(canonical(name))] += _amount(value, f"add_backs[{name!r}]", i)
+        _check_text(item, "region", i)
+        _check_text(item, "concept", i)
+    return items, batched, inputs, add_backs
+
+
+def value_items(method, items, inputs, add_backs):
+    """Value parsed items in one engine call; returns one result dict per item."""
+    spec = METHODS[method]
+    result = spec["compute"](*inputs.T, owner_benefit=add_backs, multiples=())
+    bands = np.empty((len(items), len(BANDS)))
+    comps = []
+    for i, item in enumerate(items):
+        band, found = multiple_band(method, inputs[i, 0], result["margin"][i],
+                                    item.get("region"), item.get("concept"))
+        bands[i] = band
+        comps.append(found)
+    valuations = result["valuation_base"][:, np.newaxis] * bands
+
+    out = []
+    for i in range(len(items)):
+        out.append({
+            "total_expenses": float(result["total_expenses"][i]),
+            spec["earnings"]: float(result[spec["earnings"]][i]),
+            "margin": float(result["margin"][i]),
+            "owner_benefit": float(result["owner_benefit"][i]),
+            "valuation_base": float(result["valuation_base"][i]),
+            "multiples": dict(zip(BANDS, bands[i].tolist())),
+            "valuations": dict(zip(BANDS, valuations[i].tolist())),
+            "comparables": None if comps[i] is None else {
+                "count": len(comps[i]["multiple"]),
+                "region": comps[i]["segment"][0],
+                "concept": comps[i]["segment"][1],
+            },
+        })
+    return out
+
+
+def report_pdf(method, item, add_backs, entry):
+    """Build the calculator's PDF report for one valued item."""
+    name, email = str(item.get("name", "")), str(item.get("email", ""))
+    multiples = tuple(entry["multiples"].values())
+    valuations = tuple(entry["valuations"].values())
+    chart = report_chart(entry["total_expenses"], entry[method], entry["margin"])
+    if method == "ebitda":
+        return ebitda_report_pdf(ebitda_report_rows(
+            name, email, entry["total_expenses"], entry["ebitda"], entry["margin"],
+            entry["owner_benefit"], entry["valuation_base"], valuations, multiples=multiples
+        ), chart)
+    custom = [(label, float(add_backs[SDE_ADD_BACKS.index(label)])) for label in CUSTOM_LABELS]
+    return sde_report_pdf(sde_report_lines(
+        name, email, entry["total_expenses"], entry["sde"], entry["margin"],
+        entry["owner_benefit"], entry["sde"], entry["valuation_base"], valuations,
+        custom_add_backs=custom, multiples=multiples
+    ), chart)
+
+
+def _error(message, status=400):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def valuations(request):
+    method = request.path_params["method"]
+    if method not in METHODS:
+        return _error(f"unknown method {method!r}; use ebitda or sde", 404)
+    try:
+        body = await request.json()
+    except ValueError:
+        return _error("body must be JSON")
+
+    try:
+        with span("api_parse"):
+            items, batched, inputs, add_backs = _parse_items(body, method)
+    except RequestError as e:
+        return _error(str(e))
+    with span("api_valuation"):
+        results = value_items(method, items, inputs, add_backs)
+
+    if request.query_params.get("format") == "pdf":
+        if not batched:
+            pdf = await run_in_threadpool(report_pdf, method, items[0], add_backs[0], results[0])
+            return Response(pdf, media_type="application/pdf",
+                            headers={"Content-Disposition": f'attachment; filename="{method}_results.pdf"'})
+        pdfs = await run_in_threadpool(
+            lambda: [report_pdf(method, *args) for args in zip(items, add_backs, results)]
+        )
+        for entry, pdf in zip(results, pdfs):
+            entry["pdf"] = base64.b64encode(pdf).decode("ascii")
+
+    return JSONResponse({"method": method, "results": results} if batched else {"method": method, **results[0]})
+
+
+async def schema(request):
+    return JSONResponse({
+        method: {
+            "inputs": list(spec["columns"]),
+            "add_backs": list(spec["add_backs"]),
+            "fixed_multiples": dict(zip(BANDS, spec["multiples"])),
+        }
+        for method, spec in METHODS.items()
+    })
+
+
+async def healthz(request):
+    return JSONResponse({"ok": True})
+
+
+app = Starlette(routes=[
+    Route("/v1/valuations/{method}", valuations, methods=["POST"]),
+    Route("/v1/schema", schema),
+    Route("/healthz", healthz),
+])
+
+
+def serve(host="127.0.0.1", port=8000, workers=1):
+    """Run the API under uvicorn."""
+    import uvicorn
+
+    uvicorn.run("mra.api:app", host=host, port=port, workers=workers, log_level="warning")
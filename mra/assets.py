@@ -0,0 +1,204 @@
+"""Pre-built logo images and stylesheets, served as static files.
+
+``build`` resizes the logo to the widths the pages display it at, plus 2x
+for high-density screens. Each size is written as AVIF (when Pillow was
+built with it), WebP and JPEG, and
+each stylesheet under ``assets/`` is copied alongside. Everything goes to
+the ``static/`` directory Streamlit serves at ``app/static/``
+(``server.enableStaticServing`` in ``.streamlit/config.toml``). File names
+carry a hash of the source and settings, so they never change content and
+can be cached indefinitely; ``mra.deploy`` serves them with such headers.
+A manifest lists the built files, and later processes only read the
+manifest.
+
+``logo`` renders a ``<picture>`` element, so the browser downloads the
+smallest format it supports, once. ``stylesheet`` emits an ``@import`` of
+the built CSS file. Neither reads the image or CSS on rerun; the element
+is the same small string every time, so the browser keeps the DOM node
+and its cached files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from functools import lru_cache
+
+from mra.prewarm import ensure_imported
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGO = os.path.join(ROOT, "images", "MRA logo 9.2015-colorLG.jpg")
+STYLES_DIR = os.path.join(ROOT, "assets")
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_URL = "app/static"
+MANIFEST = "manifest.json"
+
+LOGO_WIDTHS = (500,)
+DENSITIES = (1, 2)
+# Format, MIME type and Pillow save options, best compression first
+FORMATS = (
+    ("avif", "image/avif", {"quality": 60}),
+    ("webp", "image/webp", {"quality": 82, "method": 6}),
+    ("jpg", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+)
+
+_build_lock = threading.Lock()
+
+
+def _formats():
+    """``FORMATS`` less any this Pillow can't write (AVIF needs libavif)."""
+    ensure_imported("PIL.features")
+    from PIL import features
+
+    try:
+        avif = features.check_module("avif")
+    except ValueError:
+        # Pillow older than 11.2 has no AVIF plugin at all
+        avif = False
+    return tuple(f for f in FORMATS if f[0] != "avif" or avif)
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+    return h.hexdigest()[:12]
+
+
+def _write(path, save):
+    # Several workers may build at once; readers must never see a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    save(tmp)
+    os.replace(tmp, path)
+
+
+def _build_logo(source, out_dir):
+    ensure_imported("PIL.Image")
+    from PIL import Image
+
+    with open(source, "rb") as f:
+        data = f.read()
+    built = {}
+    with Image.open(source) as original:
+        # The source is a print CMYK JPEG; browsers want RGB
+        image = original.convert("RGB")
+    for width in LOGO_WIDTHS:
+        variants = built[str(width)] = {}
+        for density in DENSITIES:
+            pixels = min(width * density, image.width)
+            height = round(image.height * pixels / image.width)
+            resized = image.resize((pixels, height), Image.LANCZOS)
+            for ext, mime, options in _formats():
+                name = f"logo-{width}@{density}x.{_digest(data, pixels, options)}.{ext}"
+                path = os.path.join(out_dir, name)
+                if not os.path.exists(path):
+                    _write(path, lambda tmp: resized.save(tmp, format=ext.replace("jpg", "jpeg"), **options))
+                variants.setdefault(ext, {"type": mime, "files": {}})["files"][str(density)] = name
+    return built
+
+
+def _build_styles(styles_dir, out_dir):
+    built = {}
+    for name in sorted(os.listdir(styles_dir)) if os.path.isdir(styles_dir) else ():
+        if not name.endswith(".css"):
+            continue
+        with open(os.path.join(styles_dir, name), "rb") as f:
+            data = f.read()
+        target = f"{name[:-4]}.{_digest(data)}.css"
+        if not os.path.exists(os.path.join(out_dir, target)):
+            _write(os.path.join(out_dir, target),
+                   lambda tmp: shutil.copyfile(os.path.join(styles_dir, name), tmp))
+        built[name] = target
+    return built
+
+
+def build(out_dir=STATIC_DIR, logo=LOGO, styles_dir=STYLES_DIR):
+    """Build every asset into ``out_dir`` and write its manifest; returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"logo": _build_logo(logo, out_dir), "styles": _build_styles(styles_dir, out_dir)}
+    _write(os.path.join(out_dir, MANIFEST), lambda tmp: _dump(manifest, tmp))
+    return manifest
+
+
+def _dump(manifest, path):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _sources_mtime():
+    paths = [LOGO]
+    if os.path.isdir(STYLES_DIR):
+        paths += [os.path.join(STYLES_DIR, name) for name in os.listdir(STYLES_DIR)]
+    return max(os.stat(path).st_mtime for path in paths)
+
+
+@lru_cache(maxsize=1)
+def manifest():
+    """The built assets, building them first if the sources are newer."""
+    path = os.path.join(STATIC_DIR, MANIFEST)
+    with _build_lock:
+        try:
+            if os.stat(path).st_mtime >= _sources_mtime():
+                with open(path) as f:
+                    return json.load(f)
+        except FileNotFoundError:
+            pass
+        return build()
+
+
+def _static_serving():
+    import streamlit as st
+
+    return st.get_option("server.enableStaticServing")
+
+
+@lru_cache(maxsize=None)
+def _logo_html(width):
+    variants = manifest()["logo"][str(width)]
+    sources = []
+    for ext, _, _ in FORMATS:
+        if ext not in variants:
+            continue
+        files = variants[ext]["files"]
+        srcset = ", ".join(f"{STATIC_URL}/{name} {density}x" for density, name in sorted(files.items()))
+        sources.append((variants[ext]["type"], srcset, f"{STATIC_URL}/{files['1']}"))
+    *modern, (_, fallback_srcset, fallback) = sources
+    tags = "".join(f'<source type="{mime}" srcset="{srcset}">' for mime, srcset, _ in modern)
+    return (f'<picture>{tags}<img src="{fallback}" srcset="{fallback_srcset}" width="{width}" '
+            f'alt="MRA logo" style="max-width: 100%; height: auto;"></picture>')
+
+
+@lru_cache(maxsize=None)
+def logo_jpeg(width):
+    """The built 1x JPEG of the logo at ``width`` px, as bytes."""
+    with open(os.path.join(STATIC_DIR, manifest()["logo"][str(width)]["jpg"]["files"]["1"]), "rb") as f:
+        return f.read()
+
+
+def logo(width):
+    """Show the logo at ``width`` px (one of ``LOGO_WIDTHS``)."""
+    import streamlit as st
+
+    if _static_serving():
+        st.markdown(_logo_html(width), unsafe_allow_html=True)
+    else:
+        # Without static serving, still send the resized JPEG rather than the original
+        st.image(logo_jpeg(width), width=width)
+
+
+def stylesheet(name):
+    """Apply ``assets/<name>`` to the page."""
+    import streamlit as st
+
+    target = manifest()["styles"][name]
+    if _static_serving():
+        st.markdown(f'<style>@import url("{STATIC_URL}/{target}");</style>', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{_css(target)}</style>", unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=None)
+def _css(target):
+    with open(os.path.join(STATIC_DIR, target)) as f:
+        return f.read()
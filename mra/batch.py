@@ -0,0 +1,190 @@
+"""Batch valuation of a membership list, one PDF report per row.
+
+Input rows are streamed from CSV in chunks and valued with the same engine
+as the calculator pages. Reports use the calculators' own PDF layouts and
+are rendered across a ``ProcessPoolExecutor``. Output is resumable: a row
+whose PDF already exists in the output directory is skipped.
+
+Expected columns are ``name``, ``email`` and the method's inputs
+(``mra.engine.EBITDA_COLUMNS`` or ``SDE_COLUMNS``). Owner add-back columns
+use the labels shown on the calculator pages (or their former aliases, see
+``mra.addbacks``) and are optional, as are ``region`` and ``concept``,
+which pick the comps segment (see ``mra.comps``) like the calculators'
+pickers do. Amounts are read as on the calculator pages ("$1,200",
+"(500)", "1.2M", see ``mra.pnl``); a row with a cell that is not an amount
+is reported and skipped.
+"""
+
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from mra.addbacks import CUSTOM_LABELS, LABELS, renames
+from mra.comps import member_bands
+from mra.engine import EBITDA_COLUMNS, SDE_COLUMNS, value_frame
+from mra.pnl import parse_amounts
+from mra.reports import ebitda_report_pdf, ebitda_report_rows, report_chart, sde_report_lines, sde_report_pdf
+
+CHUNK_SIZE = 1000
+TEXT_COLUMNS = ("name", "email", "region", "concept")
+AMOUNT_COLUMNS = EBITDA_COLUMNS + SDE_COLUMNS + tuple(LABELS)
+
+
+def report_filename(row_number, name):
+    """Stable per-row file name, so reruns can tell which reports exist."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", str(name)).strip("-").lower()
+    return f"{row_number:06d}-{slug}.pdf" if slug else f"{row_number:06d}.pdf"
+
+
+def render_report(path, method, rows, chart=None):
+    """Render one report to ``path``. Runs in a worker process."""
+    pdf = ebitda_report_pdf(rows, chart) if method == "ebitda" else sde_report_pdf(rows, chart)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+    return path
+
+
+def _progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def check_columns(path, method):
+    """Raise ValueError unless ``path`` has every input column ``method`` needs.
+
+    Only the header is read, so a wrong file fails before any row is valued.
+    """
+    if method not in ("ebitda", "sde"):
+        raise ValueError(f"Unknown valuation method: {method!r}")
+    present = set(pd.read_csv(path, nrows=0).columns)
+    missing = [column for column in (EBITDA_COLUMNS if method == "ebitda" else SDE_COLUMNS)
+               if column not in present]
+    if missing:
+        other = "sde" if method == "ebitda" else "ebitda"
+        hint = ""
+        if all(column in present for column in (SDE_COLUMNS if other == "sde" else EBITDA_COLUMNS)):
+            hint = f"; it has the {other.upper()} columns, so try --method {other}"
+        raise ValueError(f"{path} is missing the {method.upper()} input columns "
+                         f"{', '.join(missing)}{hint}")
+
+
+def read_members(path, chunk_size=CHUNK_SIZE, invalid=None):
+    """Yield the membership CSV in chunks with blank cells filled in and amounts parsed.
+
+    Rows with an amount that can't be read are left out; ``invalid`` gets
+    one message for each, naming the row and its bad cells (on stderr by
+    default).
+    """
+    invalid = invalid or _progress
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        chunk = chunk.rename(columns=renames(chunk.columns))
+        for column in TEXT_COLUMNS:
+            if column not in chunk.columns:
+                chunk[column] = ""
+        chunk[list(TEXT_COLUMNS)] = chunk[list(TEXT_COLUMNS)].astype(str)
+
+        amounts = [column for column in AMOUNT_COLUMNS if column in chunk.columns]
+        parsed = pd.DataFrame({column: parse_amounts(chunk[column].to_numpy()) for column in amounts},
+                              index=chunk.index)
+        bad = parsed.isna()
+        for index in chunk.index[bad.any(axis=1).to_numpy()]:
+            cells = ", ".join(f"{column} {chunk.at[index, column]!r}"
+                              for column in amounts if bad.at[index, column])
+            invalid(f"row {index + 1}: skipped, couldn't read {cells} as an amount")
+        chunk[amounts] = parsed
+        yield chunk[~bad.any(axis=1)]
+
+
+def value_members(chunk, method):
+    """Value a chunk; returns ``(values, bands, valuations)``.
+
+    ``values`` is the engine's frame of derived metrics. Each member's band
+    comes from ``mra.comps.member_bands``, so it matches what the calculator
+    page and the API give the same restaurant; ``bands`` and ``valuations``
+    are ``(rows, 3)`` arrays.
+    """
+    values = value_frame(chunk, method, multiples=())
+    revenue = chunk[(EBITDA_COLUMNS if method == "ebitda" else SDE_COLUMNS)[0]].to_numpy(dtype=float)
+    bands = member_bands(method, revenue, values["margin"].to_numpy(), chunk["region"], chunk["concept"])
+    return values, bands, values["valuation_base"].to_numpy()[:, None] * bands
+
+
+def report_rows(chunk, method):
+    """Value a chunk and yield ``(row_number, name, report_rows, chart)`` per member."""
+    values, bands, valuations = value_members(chunk, method)
+
+    if method == "ebitda":
+        for i, (index, row) in enumerate(values.iterrows()):
+            name, email = chunk.at[index, "name"], chunk.at[index, "email"]
+            yield index + 1, name, ebitda_report_rows(
+                name, email, row["total_expenses"], row["ebitda"], row["margin"],
+                row["owner_benefit"], row["valuation_base"], valuations[i], bands[i]
+            ), report_chart(row["total_expenses"], row["ebitda"], row["margin"])
+    else:
+        custom = [label for label in CUSTOM_LABELS if label in chunk.columns]
+        for i, (index, row) in enumerate(values.iterrows()):
+            name, email = chunk.at[index, "name"], chunk.at[index, "email"]
+            custom_add_backs = [(label, float(chunk.at[index, label])) for label in custom]
+            yield index + 1, name, sde_report_lines(
+                name, email, row["total_expenses"], row["sde"], row["margin"],
+                row["owner_benefit"], row["net_profit_loss"], row["valuation_base"],
+                valuations[i], custom_add_backs=custom_add_backs, multiples=bands[i]
+            ), report_chart(row["total_expenses"], row["sde"], row["margin"])
+
+
+def run_batch(input_path, method, out_dir, workers=None, chunk_size=CHUNK_SIZE, progress=_progress):
+    """Value every row of ``input_path`` and write one PDF per row to ``out_dir``.
+
+    Returns a dict with the number of rows seen, reports rendered and
+    skipped, rows left out for unreadable amounts, elapsed seconds and rows
+    per second.
+    """
+    check_columns(input_path, method)
+    os.makedirs(out_dir, exist_ok=True)
+    existing = set(os.listdir(out_dir))
+    workers = workers or os.cpu_count() or 1
+
+    seen = rendered = skipped = unreadable = 0
+
+    def invalid(message):
+        nonlocal unreadable
+        unreadable += 1
+        progress(message)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in read_members(input_path, chunk_size, invalid):
+            paths, jobs, charts = [], [], []
+            for row_number, name, rows, chart in report_rows(chunk, method):
+                seen += 1
+                filename = report_filename(row_number, name)
+                if filename in existing:
+                    skipped += 1
+                    continue
+                paths.append(os.path.join(out_dir, filename))
+                jobs.append(rows)
+                charts.append(chart)
+
+            if jobs:
+                batch = max(1, len(jobs) // (4 * workers))
+                for _ in pool.map(render_report, paths, [method] * len(jobs), jobs, charts, chunksize=batch):
+                    rendered += 1
+
+            elapsed = time.perf_counter() - start
+            progress(f"{seen} rows: {rendered} rendered, {skipped} skipped "
+                     f"({seen / elapsed:,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": seen,
+        "rendered": rendered,
+        "skipped": skipped,
+        "invalid": unreadable,
+        "seconds": elapsed,
+        "rows_per_second": seen / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,156 @@
+"""On-disk cache shared by every worker process of a deployment.
+
+Rendered donut charts, finished PDFs and the comparable-sales index are
+kept in each process's own memory. When several workers serve the app (see
+``mra.deploy``), the first worker to build one of these also writes it to
+the directory named by ``MRA_SHARED_CACHE_DIR`` so the others can read it
+instead of doing the work again. Without that variable, every lookup misses
+straight through to the function and nothing touches the disk.
+
+Entries are plain files named by a hash of their namespace and key. They are
+written to a temporary name and renamed into place, so readers in other
+processes see a whole entry or none, and no locks are needed. Each hit
+refreshes the file's mtime. Once about a tenth of ``max_bytes`` has been
+written, the least recently used files are removed until the directory is
+back under the limit. Values are bytes; callers pickle anything else. Only
+the deployment's own processes should be able to write the directory.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+DEFAULT_DIR = os.environ.get("MRA_SHARED_CACHE_DIR") or None
+DEFAULT_MAX_BYTES = int(os.environ.get("MRA_SHARED_CACHE_MB", "512")) * 2**20
+_ENTRY_NAME = re.compile(r"[0-9a-f]{64}")
+
+
+class SharedCache:
+    """Bytes values in a directory that several processes read and write."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, namespace, digest[:2], digest)
+
+    def get(self, namespace, key):
+        """Return the stored bytes for ``key``, or None."""
+        path = self._path(namespace, key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, namespace, key, value):
+        path = self._path(namespace, key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self._written += len(value)
+            trim = self._written > self.max_bytes // 10
+            if trim:
+                self._written = 0
+        if trim:
+            self.trim()
+
+    def _entries(self):
+        # Only files laid out by _path, so trim and clear never touch
+        # anything else that lives in the directory
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not (_ENTRY_NAME.fullmatch(name) and os.path.basename(root) == name[:2]):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def trim(self):
+        """Remove the least recently used entries until the cache fits ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in list(self._entries()):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "bytes": sum(size for _, size, _ in self._entries())}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(directory=DEFAULT_DIR):
+    """Return the process-wide cache, or None when no directory is configured."""
+    global _cache
+    if directory is None:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.directory != directory:
+            _cache = SharedCache(directory)
+        return _cache
+
+
+def shared(namespace):
+    """Decorator: look results up in the shared cache before computing them.
+
+    The wrapped function must take hashable arguments with a stable
+    ``repr`` and return bytes. Put ``lru_cache`` outside it so repeat calls
+    within a process never reach the disk.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            cache = get_cache()
+            if cache is None:
+                return func(*args)
+            value = cache.get(namespace, args)
+            if value is None:
+                value = func(*args)
+                cache.set(namespace, args, value)
+            return value
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+"""Donut charts for the EBITDA and SDE margin breakdowns.
+
+Figures are built with ``matplotlib.figure.Figure`` rather than
+``pyplot.subplots`` so they never enter pyplot's global figure registry and
+are freed as soon as the PNG bytes are written. Rendered PNGs are kept in a
+fixed-size LRU cache keyed on the rounded chart inputs, so a rerun with
+unchanged numbers costs a dictionary lookup, and in the deployment's shared
+on-disk cache so other workers can reuse them. matplotlib itself is only
+imported when the first chart is drawn.
+
+PDF reports draw the same donut as vector paths (``donut_vector``) instead
+of embedding the PNG, so they need neither matplotlib nor a raster image.
+"""
+
+from functools import lru_cache
+from io import BytesIO
+
+from mra.cache import shared
+from mra.metrics import span
+from mra.prewarm import ensure_imported
+
+CHART_CACHE_SIZE = 256
+COLORS = ['#2E86AB', '#F5B041']
+
+# Per-calculator styling, mirroring what each page used to draw inline.
+STYLES = {
+    "ebitda": {
+        "labels": ("Total Operating Expense", "EBITDA"),
+        "title": "EBITDA Margin",
+        "figsize": (2.8, 2.8),
+        "label_size": 8,
+        "center_size": 12,
+        "title_size": 12,
+        "title_pad": 10,
+        "legend": True,
+        "tight_layout": True,
+    },
+    "sde": {
+        "labels": ("Total Expenses", "SDE"),
+        "title": "SDE Margin",
+        "figsize": (1, 1),
+        "label_size": 6,
+        "center_size": 8,
+        "title_size": 8,
+        "title_pad": 6,
+        "legend": False,
+        "tight_layout": False,
+    },
+}
+
+
+def _autopct(values):
+    total = sum(values)
+
+    def autopct(pct):
+        return f"${int(round(pct * total / 100.0)):,}"
+    return autopct
+
+
+def draw_donut(kind, total_expenses, earnings, margin):
+    """Build the margin donut for ``kind`` ("ebitda" or "sde") as a Figure."""
+    ensure_imported("matplotlib.figure", "matplotlib.patches")
+    import matplotlib.patches as mpatches
+    from matplotlib.figure import Figure
+
+    style = STYLES[kind]
+    values = [total_expenses, earnings]
+    labels = style["labels"]
+
+    fig = Figure(figsize=style["figsize"])
+    ax = fig.subplots()
+    ax.pie(
+        values,
+        labels=labels,
+        colors=COLORS,
+        autopct=_autopct(values),
+        startangle=90,
+        wedgeprops=dict(width=0.35, edgecolor='white'),
+        textprops=dict(color="black", fontsize=style["label_size"])
+    )
+    ax.text(
+        0, 0, f"{margin:.0f}%",
+        ha='center', va='center',
+        fontsize=style["center_size"],
+        fontweight='bold',
+        color='black'
+    )
+    ax.set_title(style["title"], fontsize=style["title_size"], fontweight='bold', pad=style["title_pad"])
+
+    if style["legend"]:
+        patches = [
+            mpatches.Patch(color=COLORS[i], label=f"{labels[i]}: ${values[i]:,.0f}")
+            for i in range(len(labels))
+        ]
+        ax.legend(
+            handles=patches,
+            loc='lower center',
+            bbox_to_anchor=(0.5, -0.35),
+            ncol=1,
+            frameon=False,
+            fontsize=9
+        )
+
+    ax.axis('equal')
+    if style["tight_layout"]:
+        fig.tight_layout()
+    return fig
+
+
+def donut_vector(content, cx, cy, radius, total_expenses, earnings, margin):
+    """Draw the donut as vector paths onto a ``mra.pdftemplate.Content``.
+
+    Same colors, start angle and ring width as ``draw_donut``, with the
+    margin in the center. Labels and legend are left to the caller's layout.
+    Without a positive total or with negative earnings there is no donut to
+    draw, so an empty grey ring is drawn instead, as the pages show a warning.
+    """
+    inner = radius * 0.65
+    total = total_expenses + earnings
+    if total <= 0 or earnings < 0 or total_expenses < 0:
+        content.sector(cx, cy, radius, inner, 90, 360, fill="#E5E8E8")
+        content.text_center(cx, cy - 4, "n/a", size=12, bold=True)
+        return
+    start = 90
+    for value, color in zip((total_expenses, earnings), COLORS):
+        if value > 0:
+            extent = 360 * value / total
+            content.sector(cx, cy, radius, inner, start, extent, fill=color, stroke="#FFFFFF")
+            start += extent
+    content.text_center(cx, cy - 5, f"{margin:.0f}%", size=14, bold=True)
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+@shared("donut")
+def _render_donut(kind, total_expenses, earnings, margin):
+    fig = draw_donut(kind, total_expenses, earnings, margin)
+    buffer = BytesIO()
+    # Same savefig settings st.pyplot uses, so the image looks unchanged.
+    fig.savefig(buffer, format="png", dpi=200, bbox_inches="tight")
+    fig.clear()
+    return buffer.getvalue()
+
+
+def donut_png(kind, total_expenses, earnings, margin):
+    """Return the rendered donut for the given figures as PNG bytes.
+
+    Inputs are rounded to whole dollars and whole percentage points (the
+    precision the chart prints) before they key the cache.
+    """
+    with span("donut"):
+        return _render_donut(kind, round(total_expenses), round(earnings), round(margin))
+
+
+cache_info = _render_donut.cache_info
+cache_clear = _render_donut.cache_clear
@@ -0,0 +1,290 @@
+"""Comparable restaurant sales, indexed for nearest-neighbour lookups.
+
+The dataset is a CSV of past transactions with columns ``method`` ("ebitda"
+or "sde", the earnings the multiple applies to), ``region``, ``concept``,
+``revenue``, ``margin`` (earnings as % of revenue) and ``multiple``.
+Comps are only used when ``MRA_COMPS_FILE`` points at a real dataset;
+without it every band is the calculator's fixed one. ``SAMPLE_PATH``
+(``mra/data/comps.csv``) is synthetic, centred on the fixed bands, for
+benchmarks and demos only.
+
+Every valuation that picks a band goes through ``multiple_band`` (the
+pages and the API) or ``member_bands`` (batch and portfolio reports), so
+the same restaurant gets the same multiples everywhere. TTM history keeps
+the fixed bands on purpose: see ``mra.ttm``.
+
+Comps are grouped into segments by method, region and concept (plus "any
+region" / "any concept" roll-ups). Each segment keeps its rows sorted by
+log revenue, so a lookup is a binary search followed by a distance
+ranking over a small window of neighbours: tens of microseconds however
+large the dataset. Quantiles of every segment's multiples are precomputed. The
+file is reloaded, and the tables rebuilt, only when its modification time
+changes. With a shared cache configured (``mra.cache``), the built tables
+are pickled there so the other workers of a deployment load them instead of
+re-reading the CSV.
+"""
+
+import csv
+import math
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from mra.cache import get_cache
+from mra.engine import EBITDA_MULTIPLES, SDE_MULTIPLES
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "data", "comps.csv")
+DEFAULT_PATH = os.environ.get("MRA_COMPS_FILE") or None
+NEAREST = 25
+MIN_COMPS = 10
+QUANTILES = (25, 50, 75)
+
+# One doubling of revenue counts as far as 10 points of margin.
+REVENUE_SCALE = math.log(2)
+MARGIN_SCALE = 10.0
+WINDOW = 4
+
+
+def _quantiles(values):
+    # np.percentile's default linear interpolation, without its per-call
+    # overhead, which dominates for the 25 multiples of a lookup
+    ordered = np.sort(values)
+    position = np.array(QUANTILES) / 100.0 * (len(ordered) - 1)
+    below = position.astype(np.intp)
+    above = np.minimum(below + 1, len(ordered) - 1)
+    return ordered[below] + (ordered[above] - ordered[below]) * (position - below)
+
+
+class Segment:
+    """The comps of one method/region/concept, sorted by log revenue."""
+
+    def __init__(self, revenue, margin, multiple):
+        order = np.argsort(revenue)
+        self.revenue = revenue[order]
+        self.log_revenue = np.log(np.maximum(self.revenue, 1.0))
+        self.margin = margin[order]
+        self.multiple = multiple[order]
+        self.quantiles = _quantiles(self.multiple)
+
+    def __len__(self):
+        return len(self.multiple)
+
+    def nearest(self, revenue, margin, n):
+        """Indices of the ``n`` comps closest in revenue and margin."""
+        x = math.log(max(revenue, 1.0))
+        pos = int(np.searchsorted(self.log_revenue, x))
+        lo = max(0, pos - WINDOW * n)
+        hi = min(len(self), pos + WINDOW * n)
+        distance = ((self.log_revenue[lo:hi] - x) / REVENUE_SCALE) ** 2 + \
+            ((self.margin[lo:hi] - margin) / MARGIN_SCALE) ** 2
+        if hi - lo > n:
+            picked = np.argpartition(distance, n)[:n]
+        else:
+            picked = np.arange(hi - lo)
+        return lo + picked
+
+
+def _read(path):
+    columns = {name: [] for name in ("method", "region", "concept", "revenue", "margin", "multiple")}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            for name, values in columns.items():
+                values.append(row[name].strip())
+    numbers = {name: np.array(columns[name], dtype=np.float64) for name in ("revenue", "margin", "multiple")}
+    labels = {name: np.array(columns[name], dtype=object) for name in ("method", "region", "concept")}
+    return labels, numbers
+
+
+class ComparableStore:
+    """Nearest-comp lookups over a comps CSV that may change on disk."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.loads = 0
+        self._mtime = None
+        self._segments = {}
+        self._regions = {}
+        self._concepts = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            if mtime is None:
+                self._clear()
+            else:
+                self._build()
+            self._mtime = mtime
+
+    def _clear(self):
+        self._segments, self._regions, self._concepts = {}, {}, {}
+
+    def _build(self):
+        stat = os.stat(self.path)
+        key = (os.path.abspath(self.path), stat.st_mtime_ns, stat.st_size)
+        cache = get_cache()
+        cached = cache.get("comps_index", key) if cache is not None else None
+        if cached is not None:
+            tables = pickle.loads(cached)
+        else:
+            tables = self._index()
+            if cache is not None:
+                cache.set("comps_index", key, pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL))
+        # Swap the new tables in whole so concurrent readers see old or new, never half
+        self._segments, self._regions, self._concepts = tables
+        self.loads += 1
+
+    def _index(self):
+        labels, numbers = _read(self.path)
+        segments, regions, concepts = {}, {}, {}
+        for method in np.unique(labels["method"]):
+            in_method = labels["method"] == method
+            regions[method] = sorted(set(labels["region"][in_method]))
+            concepts[method] = sorted(set(labels["concept"][in_method]))
+            for region in (None, *regions[method]):
+                for concept in (None, *concepts[method]):
+                    mask = in_method.copy()
+                    if region is not None:
+                        mask &= labels["region"] == region
+                    if concept is not None:
+                        mask &= labels["concept"] == concept
+                    if mask.any():
+                        segments[method, region, concept] = Segment(
+                            numbers["revenue"][mask], numbers["margin"][mask], numbers["multiple"][mask]
+                        )
+        return segments, regions, concepts
+
+    def regions(self, method):
+        self._refresh()
+        return self._regions.get(method, [])
+
+    def concepts(self, method):
+        self._refresh()
+        return self._concepts.get(method, [])
+
+    def segment(self, method, region=None, concept=None, min_comps=MIN_COMPS):
+        """The narrowest segment with at least ``min_comps`` comps, and its key.
+
+        Falls back from region and concept, to region only, to concept
+        only, to every comp for the method. Returns ``(None, None)`` when
+        there are no comps for the method at all.
+        """
+        self._refresh()
+        segments = self._segments
+        for key in ((method, region, concept), (method, region, None),
+                    (method, None, concept), (method, None, None)):
+            segment = segments.get(key)
+            if segment is not None and (len(segment) >= min_comps or key[1:] == (None, None)):
+                return segment, key
+        return None, None
+
+    def quantiles(self, method, region=None, concept=None):
+        """Precomputed P25/P50/P75 multiples of the matching segment, or None."""
+        segment, _ = self.segment(method, region, concept)
+        return None if segment is None else tuple(float(q) for q in segment.quantiles)
+
+    def comparables(self, method, revenue, margin, region=None, concept=None, n=NEAREST):
+        """The ``n`` comps nearest in revenue and margin, with their multiple quantiles.
+
+        Returns a dict with the comps' ``revenue``, ``margin`` and
+        ``multiple`` arrays, the P25/P50/P75 ``quantiles`` of their
+        multiples, and the ``segment`` (region, concept) they were drawn
+        from; None when there are no comps for ``method``.
+        """
+        segment, key = self.segment(method, region, concept, min_comps=min(n, MIN_COMPS))
+        if segment is None:
+            return None
+        picked = segment.nearest(revenue, margin, n)
+        multiples = segment.multiple[picked]
+        return {
+            "revenue": segment.revenue[picked],
+            "margin": segment.margin[picked],
+            "multiple": multiples,
+            "quantiles": tuple(_quantiles(multiples).tolist()),
+            "segment": key[1:],
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_PATH):
+    """Return the process-wide store for ``path``, or None without a dataset."""
+    global _store
+    if path is None:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = ComparableStore(path)
+        return _store
+
+
+def multiple_band(method, revenue, margin, region=None, concept=None, n=NEAREST):
+    """Return the (low, median, high) multiples and the comps behind them.
+
+    The band is the P25/P50/P75 of the nearest comps, rounded to the
+    hundredth. Without sales or without a dataset it is the calculator's
+    fixed band and the comps are None.
+    """
+    fixed = EBITDA_MULTIPLES if method == "ebitda" else SDE_MULTIPLES
+    store = get_store()
+    if revenue <= 0 or store is None:
+        return fixed, None
+    comps = store.comparables(method, revenue, margin, region, concept, n)
+    if comps is None:
+        return fixed, None
+    return tuple(round(q, 2) for q in comps["quantiles"]), comps
+
+
+def member_bands(method, revenue, margin, regions=None, concepts=None):
+    """``multiple_band`` for many restaurants at once, as an ``(n, 3)`` array.
+
+    ``regions`` and ``concepts`` are optional sequences with None (or "")
+    for "any".
+    """
+    fixed = EBITDA_MULTIPLES if method == "ebitda" else SDE_MULTIPLES
+    if get_store() is None:
+        return np.tile(np.asarray(fixed, dtype=np.float64), (len(revenue), 1))
+    regions = [None] * len(revenue) if regions is None else regions
+    concepts = [None] * len(revenue) if concepts is None else concepts
+    return np.array([multiple_band(method, r, m, region or None, concept or None)[0]
+                     for r, m, region, concept in zip(revenue, margin, regions, concepts)],
+                    dtype=np.float64).reshape(len(revenue), len(fixed))
+
+
+def describe(comps):
+    """One sentence on which comps a band came from, for a caption."""
+    region, concept = comps["segment"]
+    where = " / ".join(x for x in (region, concept) if x) or "all regions and concepts"
+    return (f"Band from the {len(comps['multiple'])} comparable sales in {where} closest to yours in "
+            f"revenue and margin (revenue ${comps['revenue'].min():,.0f} to ${comps['revenue'].max():,.0f}): "
+            f"the 25th, 50th and 75th percentile of their multiples, so it can differ from the usual range.")
+
+
+def segment_inputs(method, key):
+    """Render the region and concept pickers; returns ``(region, concept)``.
+
+    Either is None when left at "Any". Without a comps dataset there is
+    nothing to pick, so nothing is rendered.
+    """
+    store = get_store()
+    if store is None:
+        return None, None
+
+    import streamlit as st
+
+    col1, col2 = st.columns(2)
+    region = col1.selectbox("Region", ["Any region", *store.regions(method)], key=f"{key}_region")
+    concept = col2.selectbox("Concept", ["Any concept", *store.concepts(method)], key=f"{key}_concept")
+    return (None if region == "Any region" else region,
+            None if concept == "Any concept" else concept)
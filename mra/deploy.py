@@ -0,0 +1,316 @@
+"""Run a calculator page on several Streamlit workers behind one address.
+
+A single Streamlit process runs every session's script, chart and PDF on
+one core. ``run`` starts ``workers`` copies of ``streamlit run <page>`` on
+local ports and puts a small reverse proxy in front of them on ``port``.
+The workers share an on-disk cache (``mra.cache``), so a chart, PDF or
+comps index built by one is reused by the rest.
+
+A Streamlit session lives entirely in the worker that started it. Its
+websocket, its uploads and its media URLs all have to reach that worker.
+The proxy therefore pins each browser to one worker with a cookie. A
+browser without the cookie goes to the worker with the fewest open
+connections and gets the cookie on the first response. Routing is decided
+once per connection; after that the bytes are copied through untouched, so
+websockets need no special handling. All workers share a cookie secret, so
+a browser re-pinned after a worker restart keeps a valid XSRF token.
+
+Each worker spools outgoing email in its own subdirectory of the outbox
+(``MRA_OUTBOX_DIR``). An ``Outbox`` re-queues every message in its spool
+when it starts, so sharing one would make a starting worker resend messages
+another worker is still delivering. A restarted worker takes over its
+predecessor's directory and delivers whatever it left behind.
+
+The proxy also answers ``/app/static/`` requests itself from the page's
+``static/`` directory (see ``mra.assets``). Files with a content hash in
+their name are sent with a one-year ``immutable`` Cache-Control, which
+Streamlit's own static route does not set, so browsers fetch the logo and
+CSS once. To see every ``/app/static/`` request, the proxy closes each
+plain HTTP connection after its first response (``Connection: close``), so
+the browser's next request arrives on a new connection and is routed
+afresh. Websocket upgrades keep their connection.
+
+Crashed workers are restarted. To put nginx in front instead of the
+built-in proxy, start the workers with ``proxy=False`` and use
+``nginx_config``. The shared cache's entries are removed on start so a new
+release never serves charts or PDFs rendered by the old code; nothing else
+in the cache directory is touched.
+"""
+
+import asyncio
+import logging
+import mimetypes
+import os
+import re
+import secrets
+import signal
+import subprocess
+import sys
+from urllib.parse import unquote, urlsplit
+
+from mra.cache import SharedCache
+from mra.outbox import DEFAULT_SPOOL_DIR
+
+logger = logging.getLogger(__name__)
+
+COOKIE = "mra_worker"
+DEFAULT_CACHE_DIR = os.path.join(".data", "cache")
+_COOKIE_PATTERN = re.compile(rb"^cookie:.*?\b" + COOKIE.encode() + rb"=(\d+)", re.IGNORECASE | re.MULTILINE)
+_BAD_GATEWAY = b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+_NOT_FOUND = b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+STATIC_PREFIX = "/app/static/"
+_CONNECTION_HEADERS = re.compile(rb"^(connection|keep-alive):.*\r\n", re.IGNORECASE | re.MULTILINE)
+_UPGRADE = re.compile(rb"^upgrade:", re.IGNORECASE | re.MULTILINE)
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {".avif": "image/avif", ".webp": "image/webp"}
+
+
+def worker_command(page, port):
+    return [
+        sys.executable, "-m", "streamlit", "run", page,
+        "--server.port", str(port),
+        "--server.address", "127.0.0.1",
+        "--server.headless", "true",
+        "--browser.gatherUsageStats", "false",
+    ]
+
+
+class Workers:
+    """Starts the worker processes and restarts any that exit."""
+
+    def __init__(self, page, ports, cache_dir, outbox_dir=DEFAULT_SPOOL_DIR):
+        self.page = page
+        self.ports = ports
+        self.outbox_dir = os.path.abspath(outbox_dir)
+        self.env = dict(os.environ, MRA_SHARED_CACHE_DIR=os.path.abspath(cache_dir))
+        # Streamlit only takes the cookie secret from config or the environment
+        self.env.setdefault("STREAMLIT_SERVER_COOKIE_SECRET", secrets.token_hex(32))
+        self.processes = [None] * len(ports)
+        self.restarts = 0
+
+    def worker_env(self, i):
+        # Keyed by slot, not pid, so a restarted worker picks up its own spool
+        return dict(self.env, MRA_OUTBOX_DIR=os.path.join(self.outbox_dir, f"worker-{i}"))
+
+    def _spawn(self, i):
+        self.processes[i] = subprocess.Popen(worker_command(self.page, self.ports[i]), env=self.worker_env(i))
+
+    def start(self):
+        for i in range(len(self.ports)):
+            self._spawn(i)
+
+    def check(self):
+        for i, process in enumerate(self.processes):
+            if process.poll() is not None:
+                logger.warning("Worker on port %d exited with %s; restarting",
+                               self.ports[i], process.returncode)
+                self.restarts += 1
+                self._spawn(i)
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+class StickyProxy:
+    """Forwards each connection to the worker its browser is pinned to."""
+
+    def __init__(self, upstreams, static_dir=None):
+        self.upstreams = upstreams
+        self.static_dir = static_dir and os.path.realpath(static_dir)
+        self.active = [0] * len(upstreams)
+        self._next = 0
+
+    def _pick(self):
+        least = min(self.active)
+        # Rotate among the least busy workers so new browsers spread out evenly
+        for offset in range(len(self.active)):
+            i = (self._next + offset) % len(self.active)
+            if self.active[i] == least:
+                self._next = i + 1
+                return i
+
+    def _pinned(self, head):
+        match = _COOKIE_PATTERN.search(head)
+        if match:
+            i = int(match.group(1))
+            if i < len(self.upstreams):
+                return i
+        return None
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        if self.static_dir and head.startswith(b"GET " + STATIC_PREFIX.encode()):
+            await self._static(head, writer)
+            return
+        worker = self._pinned(head)
+        pin = worker is None
+        if pin:
+            worker = self._pick()
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(*self.upstreams[worker])
+        except OSError:
+            writer.write(_BAD_GATEWAY)
+            writer.close()
+            return
+
+        self.active[worker] += 1
+        # A kept-alive connection would carry later /app/static/ requests
+        # straight to the worker, past the check above
+        close = bool(self.static_dir) and not _UPGRADE.search(head)
+        upstream_writer.write(_close_after(head) if close else head)
+        tasks = [
+            asyncio.ensure_future(_pipe(reader, upstream_writer)),
+            asyncio.ensure_future(_pipe(upstream_reader, writer, worker if pin else None, close)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.active[worker] -= 1
+            upstream_writer.close()
+            writer.close()
+
+    async def _static(self, head, writer):
+        target = head.split(b" ", 2)[1].decode("latin-1")
+        relative = unquote(urlsplit(target).path)[len(STATIC_PREFIX):]
+        path = os.path.realpath(os.path.join(self.static_dir, relative))
+        if not path.startswith(self.static_dir + os.sep) or not os.path.isfile(path):
+            writer.write(_NOT_FOUND)
+        else:
+            with open(path, "rb") as f:
+                body = f.read()
+            extension = os.path.splitext(path)[1]
+            content_type = CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] \
+                or "application/octet-stream"
+            cache = IMMUTABLE if _HASHED_NAME.search(path) else "no-cache"
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Cache-Control: {cache}\r\nX-Content-Type-Options: nosniff\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+def _close_after(head):
+    """``head`` with its connection headers replaced by ``Connection: close``."""
+    return _CONNECTION_HEADERS.sub(b"", head)[:-2] + b"Connection: close\r\n\r\n"
+
+
+async def _pipe(reader, writer, pin=None, close=False):
+    try:
+        if pin is not None or close:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if close:
+                head = _close_after(head)
+            if pin is not None:
+                cookie = f"Set-Cookie: {COOKIE}={pin}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+                head = head[:-2] + cookie + b"\r\n"
+            writer.write(head)
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+
+
+def nginx_config(ports, listen=8501, static_dir="static"):
+    """An nginx server block equivalent to the built-in proxy.
+
+    nginx pins browsers by client address (``ip_hash``) rather than by
+    cookie, which is fine unless many users share one address.
+    """
+    servers = "\n".join(f"    server 127.0.0.1:{port};" for port in ports)
+    static_dir = os.path.abspath(static_dir)
+    return f"""upstream mra_workers {{
+    ip_hash;
+{servers}
+}}
+
+map $http_upgrade $connection_upgrade {{
+    default upgrade;
+    ''      close;
+}}
+
+server {{
+    listen {listen};
+    client_max_body_size 200m;
+
+    location {STATIC_PREFIX} {{
+        alias {static_dir}/;
+        location ~ "\\.[0-9a-f]{{12}}\\.\\w+$" {{
+            add_header Cache-Control "{IMMUTABLE}";
+        }}
+    }}
+
+    location / {{
+        proxy_pass http://mra_workers;
+        proxy_http_version 1.1;
+        proxy_set_header Host $host;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $connection_upgrade;
+        proxy_read_timeout 86400;
+    }}
+}}
+"""
+
+
+async def _supervise(workers):
+    while True:
+        await asyncio.sleep(1.0)
+        workers.check()
+
+
+async def _serve(proxy, workers, host, port):
+    server = await asyncio.start_server(proxy.handle, host, port)
+    async with server:
+        await _supervise(workers)
+
+
+def _exit(signum, frame):
+    sys.exit(0)
+
+
+def run(page, workers=None, host="127.0.0.1", port=8501, cache_dir=DEFAULT_CACHE_DIR, proxy=True):
+    """Serve ``page`` from ``workers`` processes (default: CPU count) until interrupted."""
+    workers = workers or os.cpu_count() or 1
+    ports = [port + 1 + i for i in range(workers)]
+    SharedCache(cache_dir).clear()
+    # Build the logo and CSS once here rather than racing to in every worker
+    from mra.assets import manifest
+    manifest()
+    pool = Workers(page, ports, cache_dir)
+    # Stop the workers on SIGTERM too, not only on Ctrl-C
+    signal.signal(signal.SIGTERM, _exit)
+    pool.start()
+    try:
+        if proxy:
+            static_dir = os.path.join(os.path.dirname(os.path.abspath(page)), "static")
+            asyncio.run(_serve(StickyProxy([("127.0.0.1", p) for p in ports], static_dir),
+                               pool, host, port))
+        else:
+            asyncio.run(_supervise(pool))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
@@ -0,0 +1,143 @@
+"""Headless, vectorized valuation math for the EBITDA and SDE calculators.
+
+Every function accepts scalars, NumPy arrays or pandas Series and works
+element-wise, so one call values a single restaurant or a whole membership
+list. Nothing here imports Streamlit.
+"""
+
+import numpy as np
+
+from mra.addbacks import LABELS, renames
+from mra.prewarm import ensure_imported
+
+# --- MULTIPLES ---
+EBITDA_MULTIPLES = (1.25, 1.5, 2.0)
+SDE_MULTIPLES = (1.5, 2.0, 2.5)
+
+# --- OWNER ADD-BACKS ---
+# Both methods take the same add-backs, declared in mra.addbacks
+EBITDA_ADD_BACKS = LABELS
+SDE_ADD_BACKS = LABELS
+
+# --- INPUT COLUMNS ---
+EBITDA_COLUMNS = ("net_sales", "cogs", "employee_cost", "other_operating_cost")
+SDE_COLUMNS = ("income", "purchases", "labor", "operating_expenses")
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _owner_benefit(owner_benefit):
+    # A 2-D array is one column per add-back; collapse it to a total per row.
+    owner_benefit = _as_float(owner_benefit)
+    if owner_benefit.ndim == 2:
+        return owner_benefit.sum(axis=1)
+    return owner_benefit
+
+
+def _apply_multiples(base, multiples):
+    return base[..., np.newaxis] * _as_float(multiples)
+
+
+def ebitda_valuation(net_sales, cogs, employee_cost, other_operating_cost,
+                     owner_benefit=0.0, multiples=EBITDA_MULTIPLES):
+    """Value restaurants by EBITDA plus owner benefit.
+
+    Rows without positive net sales report zero expenses, EBITDA and margin,
+    matching the calculator page. Returns a dict of arrays; ``valuations``
+    has one trailing column per entry in ``multiples``.
+    """
+    net_sales = _as_float(net_sales)
+    has_sales = net_sales > 0
+    expenses = _as_float(cogs) + _as_float(employee_cost) + _as_float(other_operating_cost)
+
+    total_expenses = np.where(has_sales, expenses, 0.0)
+    ebitda = np.where(has_sales, net_sales - expenses, 0.0)
+    margin = np.divide(ebitda * 100.0, net_sales, out=np.zeros_like(ebitda), where=has_sales)
+
+    owner_benefit = _owner_benefit(owner_benefit) + np.zeros_like(ebitda)
+    valuation_base = ebitda + owner_benefit
+
+    return {
+        "total_expenses": total_expenses,
+        "ebitda": ebitda,
+        "margin": margin,
+        "owner_benefit": owner_benefit,
+        "valuation_base": valuation_base,
+        "valuations": _apply_multiples(valuation_base, multiples),
+    }
+
+
+def sde_valuation(income, purchases, labor, operating_expenses,
+                  owner_benefit=0.0, multiples=SDE_MULTIPLES):
+    """Value restaurants by Seller's Discretionary Earnings plus add-backs.
+
+    Returns a dict of arrays; ``valuations`` has one trailing column per
+    entry in ``multiples``. The margin is zero wherever income is zero.
+    """
+    income = _as_float(income)
+    total_expenses = _as_float(purchases) + _as_float(labor) + _as_float(operating_expenses)
+    total_expenses = total_expenses + np.zeros_like(income)
+
+    sde = income - total_expenses
+    margin = np.divide(sde * 100.0, income, out=np.zeros_like(sde), where=income != 0)
+
+    owner_benefit = _owner_benefit(owner_benefit) + np.zeros_like(sde)
+    total_income_valuation = sde + owner_benefit
+
+    return {
+        "total_expenses": total_expenses,
+        "sde": sde,
+        "margin": margin,
+        "owner_benefit": owner_benefit,
+        "net_profit_loss": sde,
+        "valuation_base": total_income_valuation,
+        "valuations": _apply_multiples(total_income_valuation, multiples),
+    }
+
+
+def multiple_label(multiple):
+    """Format a multiple the way the calculators print it: 1.25x, 1.5x, 2.0x."""
+    label = f"{multiple:g}"
+    return f"{label}x" if "." in label else f"{label}.0x"
+
+
+def value_frame(frame, method="ebitda", multiples=None):
+    """Value every row of a DataFrame in one batched call.
+
+    ``frame`` needs the input columns for ``method`` (``EBITDA_COLUMNS`` or
+    ``SDE_COLUMNS``). Any owner add-back columns it carries are summed into
+    the owner benefit (under their labels or former aliases); missing ones
+    count as zero. Returns a new DataFrame
+    with one column per derived metric and one ``valuation_<m>x`` column per
+    multiple, on the same index as ``frame``.
+    """
+    ensure_imported("pandas")
+    import pandas as pd
+
+    if method == "ebitda":
+        columns, add_backs, compute = EBITDA_COLUMNS, EBITDA_ADD_BACKS, ebitda_valuation
+        multiples = EBITDA_MULTIPLES if multiples is None else multiples
+    elif method == "sde":
+        columns, add_backs, compute = SDE_COLUMNS, SDE_ADD_BACKS, sde_valuation
+        multiples = SDE_MULTIPLES if multiples is None else multiples
+    else:
+        raise ValueError(f"Unknown valuation method: {method!r}")
+
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Missing input columns for {method}: {', '.join(missing)}")
+
+    frame = frame.rename(columns=renames(frame.columns))
+    present = [label for label in add_backs if label in frame.columns]
+    owner_benefit = frame[present].to_numpy(dtype=np.float64) if present else np.zeros((len(frame), 0))
+
+    result = compute(*(frame[column].to_numpy(dtype=np.float64) for column in columns),
+                     owner_benefit=owner_benefit, multiples=multiples)
+
+    valuations = result.pop("valuations")
+    out = pd.DataFrame(result, index=frame.index)
+    for i, multiple in enumerate(multiples):
+        out[f"valuation_{multiple_label(multiple)}"] = valuations[:, i]
+    return out
@@ -0,0 +1,308 @@
+"""Per-stage timing for the calculator pages.
+
+Stages (input parsing, valuation, the donut chart, PDF builds, Sheets
+appends, email sends) are wrapped in ``span(stage)``. Each span is recorded
+into a per-process histogram. The histograms can be exposed in Prometheus
+text format over HTTP or written to a file. A page can also log one JSON
+line per rerun listing the time spent in each stage.
+
+Everything is switched by environment variables read once at import. The
+exporters start with the first recorded span or rerun, so the API server
+and the batch CLI export as the pages do:
+
+``MRA_METRICS=1``
+    turn instrumentation on. When it is off, ``span`` returns a shared
+    no-op context manager and costs one function call.
+``MRA_METRICS_PORT=9464``
+    serve ``/metrics`` on that local port.
+``MRA_METRICS_FILE=path``
+    rewrite that file with the metrics every few seconds from a background
+    thread, and once more at exit.
+``MRA_METRICS_LOG=1``
+    log a JSON line per rerun on the ``mra.metrics`` logger, at INFO. The
+    logger is set to INFO, and writes to stderr unless logging is already
+    configured.
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("MRA_METRICS", "") not in ("", "0")
+PORT = int(os.environ.get("MRA_METRICS_PORT", "0") or 0)
+FILE = os.environ.get("MRA_METRICS_FILE", "")
+LOG_RERUNS = os.environ.get("MRA_METRICS_LOG", "") not in ("", "0")
+FILE_INTERVAL = 5.0
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_current = threading.local()
+
+
+def histogram(stage):
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, Histogram())
+    return hist
+
+
+def observe(stage, seconds):
+    """Record a duration measured elsewhere."""
+    if not ENABLED:
+        return
+    if not _exporters_started:
+        _ensure_exporters()
+    histogram(stage).observe(seconds)
+    stages = getattr(_current, "stages", None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+class _span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+
+
+def span(stage):
+    """Time the ``with`` block as ``stage``; a no-op unless metrics are enabled."""
+    if not ENABLED:
+        return _NOOP
+    return _span(stage)
+
+
+def reset():
+    """Drop every recorded histogram."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# --- per-rerun structured log ---
+
+def begin_rerun(page):
+    """Mark the start of a page run; call ``end_rerun`` when it finishes."""
+    if not ENABLED:
+        return
+    _ensure_exporters()
+    _current.page = page
+    _current.stages = {}
+    _current.start = time.perf_counter()
+
+
+def end_rerun():
+    if not ENABLED or getattr(_current, "stages", None) is None:
+        return
+    total = time.perf_counter() - _current.start
+    histogram(f"{_current.page}_rerun").observe(total)
+    if LOG_RERUNS:
+        logger.info(json.dumps({
+            "event": "rerun",
+            "page": _current.page,
+            "total_ms": round(1000 * total, 3),
+            "stages_ms": {k: round(1000 * v, 3) for k, v in _current.stages.items()},
+        }))
+    _current.stages = None
+
+
+def rerun_timed(page):
+    """Time a fragment as its own rerun, or as a stage of the enclosing one.
+
+    A fragment runs inside the full script run on first render and on its
+    own when only its widgets change.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_current, "stages", None) is not None:
+                with _span(page):
+                    return func(*args, **kwargs)
+            begin_rerun(page)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end_rerun()
+        return wrapper
+    return decorator
+
+
+# --- export ---
+
+def render_prometheus():
+    """Return every histogram in Prometheus text exposition format."""
+    lines = [
+        "# HELP mra_stage_seconds Time spent in each calculator stage.",
+        "# TYPE mra_stage_seconds histogram",
+    ]
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    for stage, hist in items:
+        counts, total, count = hist.snapshot()
+        cumulative = 0
+        for bound, n in zip(hist.buckets, counts):
+            cumulative += n
+            lines.append(f'mra_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'mra_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'mra_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'mra_stage_seconds_count{{stage="{stage}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def _write_file_quietly():
+    try:
+        write_file(FILE)
+    except OSError:
+        logger.warning("Could not write metrics file %s", FILE, exc_info=True)
+
+
+def _file_writer():
+    while True:
+        time.sleep(FILE_INTERVAL)
+        _write_file_quietly()
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve ``/metrics`` on a daemon thread and return the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="mra-metrics", daemon=True).start()
+    return server
+
+
+def _enable_rerun_log():
+    # The rerun lines are INFO, below logging's default WARNING level
+    logger.setLevel(logging.INFO)
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+
+def _ensure_exporters():
+    global _exporters_started
+    if _exporters_started:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if LOG_RERUNS:
+            _enable_rerun_log()
+        if PORT:
+            try:
+                serve(PORT)
+            except OSError:
+                # Another worker on this host already serves the port
+                logger.warning("Metrics port %d unavailable", PORT, exc_info=True)
+        if FILE:
+            threading.Thread(target=_file_writer, name="mra-metrics-file", daemon=True).start()
+            atexit.register(_write_file_quietly)
+
+
+# --- CPU timing used by the page fragments ---
+
+@contextmanager
+def cpu_timer(store, name):
+    """Record the CPU seconds this thread spends in the block as ``store[name]``.
+
+    Thread time, not process time: other sessions' script threads and the
+    prewarm thread run in the same process.
+    """
+    start = time.thread_time()
+    try:
+        yield
+    finally:
+        store[name] = time.thread_time() - start
+
+
+def cpu_timed(get_store, name):
+    """Decorator form of ``cpu_timer``; ``get_store`` returns the dict to record into.
+
+    Like ``rerun_timed``, it returns ``func`` unchanged unless metrics are
+    enabled, so ``get_store`` is never called.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with cpu_timer(get_store(), name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,180 @@
+"""Monte Carlo valuation ranges for the EBITDA and SDE calculators.
+
+Every input (sales, each cost line, each owner add-back and the multiple)
+is given a distribution. Samples are drawn in fixed-size chunks, each from
+its own child of one ``SeedSequence``, and pushed through the same
+vectorized engine as the point estimate. Results depend only on the seed
+and chunk size, so a run is reproducible whether it uses one process or
+many.
+
+Distributions are plain tuples built with ``normal``, ``triangular``,
+``uniform`` and ``fixed``, so simulation arguments are hashable and recent
+results can be cached.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from mra.engine import ebitda_valuation, sde_valuation
+from mra.prewarm import ensure_imported
+
+DEFAULT_SAMPLES = 1_000_000
+CHUNK_SIZE = 250_000
+SIMULATION_CACHE_SIZE = 8
+
+
+def normal(mean, sd):
+    return ("normal", float(mean), float(sd))
+
+
+def triangular(low, mode, high):
+    return ("triangular", float(low), float(mode), float(high))
+
+
+def uniform(low, high):
+    return ("uniform", float(low), float(high))
+
+
+def fixed(value):
+    return ("fixed", float(value))
+
+
+def _sample(rng, dist, size):
+    kind = dist[0]
+    if kind == "fixed":
+        return np.full(size, dist[1])
+    if kind == "normal":
+        return rng.normal(dist[1], dist[2], size) if dist[2] > 0 else np.full(size, dist[1])
+    if kind == "triangular":
+        low, mode, high = dist[1:]
+        return rng.triangular(low, mode, high, size) if high > low else np.full(size, mode)
+    if kind == "uniform":
+        return rng.uniform(dist[1], dist[2], size)
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+
+def _combine_add_backs(add_backs):
+    # Normal and fixed add-backs are summed exactly into one normal, so a
+    # page with 16 add-backs costs one draw per sample instead of 16.
+    mean = var = 0.0
+    others = []
+    for dist in add_backs:
+        if dist[0] == "fixed":
+            mean += dist[1]
+        elif dist[0] == "normal":
+            mean += dist[1]
+            var += dist[2] ** 2
+        else:
+            others.append(dist)
+    return (normal(mean, var ** 0.5), *others)
+
+
+def _simulate_chunk(method, inputs, add_backs, multiple, seed, size):
+    rng = np.random.default_rng(seed)
+    values = [_sample(rng, dist, size) for dist in inputs]
+    owner_benefit = sum(_sample(rng, dist, size) for dist in add_backs)
+    compute = ebitda_valuation if method == "ebitda" else sde_valuation
+    result = compute(*values, owner_benefit=owner_benefit, multiples=())
+    return result["valuation_base"] * _sample(rng, multiple, size)
+
+
+def _chunks(samples, chunk_size):
+    sizes = [chunk_size] * (samples // chunk_size)
+    if samples % chunk_size:
+        sizes.append(samples % chunk_size)
+    return sizes
+
+
+@lru_cache(maxsize=SIMULATION_CACHE_SIZE)
+def simulate(method, inputs, add_backs, multiple, samples=DEFAULT_SAMPLES, seed=0,
+             chunk_size=CHUNK_SIZE, processes=1):
+    """Sample the valuation distribution.
+
+    ``inputs`` holds one distribution per engine input, in engine order
+    (``net_sales, cogs, employee_cost, other_operating_cost`` for EBITDA;
+    ``income, purchases, labor, operating_expenses`` for SDE).
+    ``add_backs`` holds one distribution per owner add-back and
+    ``multiple`` the distribution of the multiple. Returns a read-only
+    array of ``samples`` valuations. ``processes > 1`` spreads the chunks
+    over a process pool with identical results.
+    """
+    if method not in ("ebitda", "sde"):
+        raise ValueError(f"Unknown valuation method: {method!r}")
+    add_backs = _combine_add_backs(add_backs)
+    sizes = _chunks(samples, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(method, inputs, add_backs, multiple, s, n) for s, n in zip(seeds, sizes)]
+
+    if processes > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        parts = [_simulate_chunk(*a) for a in args]
+
+    out = np.concatenate(parts) if parts else np.empty(0)
+    out.flags.writeable = False
+    return out
+
+
+def summarize(samples, percentiles=(10, 50, 90)):
+    """Return ``{"P10": ..., "P50": ..., "P90": ..., "mean": ...}``."""
+    values = np.percentile(samples, percentiles)
+    summary = {f"P{p}": float(v) for p, v in zip(percentiles, values)}
+    summary["mean"] = float(samples.mean())
+    return summary
+
+
+def histogram_figure(samples, summary, bins=80):
+    """Histogram of the valuation samples with P10/P50/P90 marked."""
+    ensure_imported("matplotlib.figure", "matplotlib.ticker")
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import FuncFormatter
+
+    counts, edges = np.histogram(samples, bins=bins)
+    fig = Figure(figsize=(6, 3))
+    ax = fig.subplots()
+    ax.bar(edges[:-1], counts / counts.sum(), width=np.diff(edges), align="edge", color='#2E86AB')
+    for label, color in (("P10", '#F5B041'), ("P50", 'black'), ("P90", '#F5B041')):
+        ax.axvline(summary[label], color=color, linestyle="--", linewidth=1)
+        ax.text(summary[label], ax.get_ylim()[1] * 0.95, label, fontsize=7, ha="center")
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda v, _: f"${v / 1e6:,.1f}M"))
+    ax.set_ylabel("Probability", fontsize=8)
+    ax.tick_params(labelsize=7)
+    fig.tight_layout()
+    return fig
+
+
+def monte_carlo_section(method, inputs, add_backs, multiples, key):
+    """Render the Monte Carlo controls, P10/P50/P90 and histogram.
+
+    ``inputs`` and ``add_backs`` are the page's point values, in engine
+    order; each becomes a normal distribution whose spread the user sets.
+    ``multiples`` is the page's (low, median, high) band, used as a
+    triangular distribution.
+    """
+    import streamlit as st
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sales_sd = st.slider("Sales uncertainty (± % std. dev.)", 0, 30, 10, key=f"{key}_sales")
+    with col2:
+        cost_sd = st.slider("Cost uncertainty (± % std. dev.)", 0, 30, 5, key=f"{key}_costs")
+    with col3:
+        add_back_sd = st.slider("Add-back uncertainty (± % std. dev.)", 0, 50, 15, key=f"{key}_add_backs")
+
+    sales, *costs = inputs
+    dists = (normal(sales, abs(sales) * sales_sd / 100),
+             *(normal(c, abs(c) * cost_sd / 100) for c in costs))
+    add_back_dists = tuple(normal(a, abs(a) * add_back_sd / 100) for a in add_backs)
+    samples = simulate(method, dists, add_back_dists, triangular(*multiples), seed=0)
+    summary = summarize(samples)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("P10 valuation", f"${summary['P10']:,.0f}")
+    col2.metric("P50 valuation", f"${summary['P50']:,.0f}")
+    col3.metric("P90 valuation", f"${summary['P90']:,.0f}")
+    st.pyplot(histogram_figure(samples, summary))
+    st.caption(f"{len(samples):,} samples, fixed seed; there is an 80% chance the valuation "
+               f"falls between ${summary['P10']:,.0f} and ${summary['P90']:,.0f}.")
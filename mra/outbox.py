@@ -0,0 +1,268 @@
+"""Asynchronous email outbox for the valuation reports.
+
+``Outbox.send`` writes the message to a spool directory and returns right
+away. A bounded thread pool delivers it over one shared transport. A
+failed attempt is retried with exponential backoff: the message goes on a
+timer heap drained by one scheduler thread, so pool workers only ever run
+send attempts and never sleep through a backoff. A message's spool file is only
+removed once delivery succeeds, so messages still pending when the process
+stops are picked up again by the next ``Outbox`` on the same directory.
+Only one process may use a spool directory at a time, since a starting
+outbox re-queues everything in it; ``mra.deploy`` gives each worker its own.
+Messages that exhaust their retries are moved to ``<spool>/failed``.
+
+Transports have one method, ``send(message)``. ``SendGridTransport`` wraps
+the SendGrid API. ``FakeTransport`` is a local stand-in with configurable
+latency and failure rate for measuring throughput without the network.
+"""
+
+import base64
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mra.metrics import span
+from mra.prewarm import ensure_imported
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.environ.get("MRA_OUTBOX_DIR", os.path.join(".spool", "outbox"))
+
+
+class SendGridTransport:
+    """Delivers messages through one reused SendGrid API client."""
+
+    def __init__(self, api_key, sender):
+        self.api_key = api_key
+        self.sender = sender
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                ensure_imported("sendgrid")
+                import sendgrid
+
+                self._client = sendgrid.SendGridAPIClient(api_key=self.api_key)
+            return self._client
+
+    def send(self, message):
+        ensure_imported("sendgrid.helpers.mail")
+        from sendgrid.helpers.mail import Attachment, Disposition, FileContent, FileName, FileType, Mail
+
+        mail = Mail(
+            from_email=self.sender,
+            to_emails=message["to"],
+            subject=message["subject"],
+            html_content=message["html"]
+        )
+        if message.get("attachment"):
+            mail.attachment = Attachment(
+                FileContent(message["attachment"]),
+                FileName(message["filename"]),
+                FileType(message["mime"]),
+                Disposition("attachment")
+            )
+        response = self.client.send(mail)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid returned HTTP {response.status_code}")
+
+
+class FakeTransport:
+    """Local stand-in for SendGrid that records what it was asked to send."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                raise ConnectionError("simulated delivery failure")
+            self.sent.append(message["id"])
+
+
+class Outbox:
+    """Spools outgoing email and delivers it from a bounded worker pool."""
+
+    def __init__(self, transport, spool_dir=DEFAULT_SPOOL_DIR, workers=4,
+                 max_attempts=5, base_delay=1.0, max_delay=60.0):
+        self.transport = transport
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._closed = False
+
+        # (due, sequence, message_id, queued_at) of messages waiting to retry
+        self._timers = []
+        self._sequence = itertools.count()
+        self._due = threading.Condition()
+        self._scheduler = threading.Thread(target=self._run_scheduler, name="outbox-retry", daemon=True)
+        self._scheduler.start()
+
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=10000)
+
+        for message_id in self._spooled_ids():
+            self._pending += 1
+            self._pool.submit(self._deliver, message_id, time.perf_counter())
+
+    def send(self, to_email, subject, html, attachment=None,
+             filename="report.pdf", mime="application/pdf"):
+        """Spool a message for delivery and return its id without waiting."""
+        message = {
+            "id": uuid.uuid4().hex,
+            "to": to_email,
+            "subject": subject,
+            "html": html,
+            "attachment": base64.b64encode(attachment).decode() if attachment else None,
+            "filename": filename,
+            "mime": mime,
+            "attempts": 0,
+        }
+        self._write(message)
+        with self._lock:
+            self._pending += 1
+        self._pool.submit(self._deliver, message["id"], time.perf_counter())
+        return message["id"]
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def quantile(q):
+            return latencies[int(q * (len(latencies) - 1))] if latencies else 0.0
+
+        return {
+            "pending": self.pending,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "p50_seconds": quantile(0.50),
+            "p99_seconds": quantile(0.99),
+        }
+
+    def close(self, wait=True):
+        """Stop accepting work; with ``wait`` block until every message is delivered or failed.
+
+        Without ``wait``, messages still waiting to retry stay spooled for
+        the next ``Outbox`` on this directory.
+        """
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: self._pending == 0)
+        with self._due:
+            self._closed = True
+            self._due.notify()
+        self._scheduler.join()
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _path(self, message_id):
+        return os.path.join(self.spool_dir, f"{message_id}.json")
+
+    def _spooled_ids(self):
+        # Oldest first, so a restart delivers in roughly the original order
+        entries = [e for e in os.scandir(self.spool_dir) if e.is_file() and e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        return [e.name[:-len(".json")] for e in entries]
+
+    def _write(self, message):
+        # Write-then-rename so a crash never leaves a half-written spool file
+        path = self._path(message["id"])
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(message, f)
+        os.replace(tmp, path)
+
+    def _deliver(self, message_id, queued_at):
+        done = True
+        try:
+            done = self._attempt(message_id, queued_at)
+        except Exception:
+            logger.exception("Delivering email %s failed", message_id)
+        finally:
+            if done:
+                with self._lock:
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    def _attempt(self, message_id, queued_at):
+        """One send attempt; returns False if the message was scheduled to retry."""
+        path = self._path(message_id)
+        try:
+            with open(path) as f:
+                message = json.load(f)
+        except FileNotFoundError:
+            return True
+
+        message["attempts"] += 1
+        try:
+            with span("email_send"):
+                self.transport.send(message)
+        except Exception as e:
+            if message["attempts"] >= self.max_attempts:
+                logger.error("Giving up on email %s after %d attempts: %s",
+                             message_id, message["attempts"], e)
+                self._write(message)
+                os.replace(path, os.path.join(self.failed_dir, f"{message_id}.json"))
+                with self._lock:
+                    self.failed += 1
+                return True
+            with self._lock:
+                self.retries += 1
+            self._write(message)
+            delay = min(self.max_delay, self.base_delay * 2 ** (message["attempts"] - 1))
+            self._retry_later(message_id, queued_at, delay * random.uniform(0.5, 1.0))
+            return False
+
+        os.remove(path)
+        with self._lock:
+            self.delivered += 1
+            self.latencies.append(time.perf_counter() - queued_at)
+        return True
+
+    # --- retry timers ---
+
+    def _retry_later(self, message_id, queued_at, delay):
+        with self._due:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._sequence), message_id, queued_at))
+            self._due.notify()
+
+    def _run_scheduler(self):
+        while True:
+            with self._due:
+                while not self._closed and (not self._timers or self._timers[0][0] > time.monotonic()):
+                    self._due.wait(self._timers[0][0] - time.monotonic() if self._timers else None)
+                if self._closed:
+                    return
+                _, _, message_id, queued_at = heapq.heappop(self._timers)
+            self._pool.submit(self._deliver, message_id, queued_at)
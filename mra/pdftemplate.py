@@ -0,0 +1,220 @@
+"""Single-page PDFs built from a precompiled template plus per-document values.
+
+A report page is mostly static: header, logo, section frames, labels and
+fonts never change between reports. ``PageTemplate`` serializes all of that
+once per process: the font objects, the logo (the built JPEG from
+``mra.assets``, embedded as-is), the static drawing as a compressed form
+XObject, and the page that places it. Rendering a report then only writes
+the page's own content stream (the dynamic values and chart), followed by the
+cross-reference table, so a report costs a few hundred bytes of operators
+and one small ``zlib.compress``.
+
+``Content`` accumulates drawing operators for either part, in the same
+style as ``mra.portfolio``'s pages. Text uses the standard Helvetica fonts
+with WinAnsi encoding, so nothing is embedded; reportlab is only imported
+for their metrics, to right-align and fit text.
+"""
+
+import math
+import zlib
+from functools import lru_cache
+
+from mra.prewarm import ensure_imported
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+
+# Object numbers are fixed: everything but the content stream is static.
+CATALOG, PAGES, FONT_REGULAR, FONT_BOLD, LOGO, STATIC, PAGE, CONTENT = range(1, 9)
+FONTS = {False: ("F1", "Helvetica"), True: ("F2", "Helvetica-Bold")}
+
+
+def _encode(text):
+    # Characters outside WinAnsi print (and measure) as "?"
+    return str(text).encode("cp1252", "replace")
+
+
+def _escape(text):
+    return _encode(str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)"))
+
+
+@lru_cache(maxsize=16)
+def _color(hex_color):
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+@lru_cache(maxsize=None)
+def _widths(bold):
+    ensure_imported("reportlab.pdfbase.pdfmetrics")
+    from reportlab.pdfbase.pdfmetrics import getFont
+
+    # Glyph widths in thousandths of the font size, indexed by WinAnsi code
+    return tuple(getFont(FONTS[bold][1]).widths)
+
+
+def text_width(text, size, bold=False):
+    """Width of ``text`` in points, in the regular or bold Helvetica."""
+    widths = _widths(bold)
+    return sum(widths[code] for code in _encode(text)) * size / 1000
+
+
+def fit(text, width, size, bold=False):
+    """``text``, shortened with an ellipsis if needed to fit ``width`` points."""
+    text = str(text)
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + "…", size, bold) > width:
+        text = text[:-1]
+    return text.rstrip() + "…"
+
+
+def _arc(cx, cy, radius, start, end):
+    """Bezier segments (at most 90 degrees each) from angle ``start`` to ``end``."""
+    ops = []
+    steps = max(1, math.ceil(abs(end - start) / 90))
+    step = math.radians(end - start) / steps
+    k = 4 / 3 * math.tan(step / 4)
+    angle = math.radians(start)
+    for _ in range(steps):
+        cos0, sin0 = math.cos(angle), math.sin(angle)
+        angle += step
+        cos1, sin1 = math.cos(angle), math.sin(angle)
+        ops.append(b"%.2f %.2f %.2f %.2f %.2f %.2f c" % (
+            cx + radius * (cos0 - k * sin0), cy + radius * (sin0 + k * cos0),
+            cx + radius * (cos1 + k * sin1), cy + radius * (sin1 - k * cos1),
+            cx + radius * cos1, cy + radius * sin1))
+    return ops
+
+
+class Content:
+    """Accumulates drawing operators for a template or one page's values."""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, size=10, bold=False, color=None):
+        if color:
+            self.ops.append(b"%.3f %.3f %.3f rg" % _color(color))
+        font = FONTS[bold][0].encode()
+        self.ops.append(b"BT /%s %.1f Tf %.2f %.2f Td (%s) Tj ET" % (font, size, x, y, _escape(text)))
+        if color:
+            self.ops.append(b"0 g")
+
+    def text_right(self, x, y, text, size=10, bold=False, color=None):
+        self.text(x - text_width(text, size, bold), y, text, size, bold, color)
+
+    def text_center(self, x, y, text, size=10, bold=False, color=None):
+        self.text(x - text_width(text, size, bold) / 2, y, text, size, bold, color)
+
+    def rect(self, x, y, width, height, fill=None, stroke=None, line_width=0.8):
+        self.ops.append(self._paint(b"%.2f %.2f %.2f %.2f re" % (x, y, width, height), fill, stroke, line_width))
+
+    def line(self, x1, y1, x2, y2, color="#000000", line_width=0.8):
+        self.ops.append(self._paint(b"%.2f %.2f m %.2f %.2f l" % (x1, y1, x2, y2), None, color, line_width))
+
+    def sector(self, cx, cy, radius, inner, start, extent, fill=None, stroke=None, line_width=1):
+        """A ring sector from ``start`` degrees, ``extent`` degrees counterclockwise."""
+        end = start + extent
+        a, b = math.radians(start), math.radians(end)
+        path = [b"%.2f %.2f m" % (cx + radius * math.cos(a), cy + radius * math.sin(a))]
+        path += _arc(cx, cy, radius, start, end)
+        path.append(b"%.2f %.2f l" % (cx + inner * math.cos(b), cy + inner * math.sin(b)))
+        path += _arc(cx, cy, inner, end, start)
+        path.append(b"h")
+        self.ops.append(self._paint(b" ".join(path), fill, stroke, line_width))
+
+    def image(self, name, x, y, width, height):
+        self.ops.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q" % (width, height, x, y, name.encode()))
+
+    @staticmethod
+    def _paint(path, fill, stroke, line_width):
+        ops = [b"q"]
+        if fill:
+            ops.append(b"%.3f %.3f %.3f rg" % _color(fill))
+        if stroke:
+            ops.append(b"%.3f %.3f %.3f RG %.2f w" % (_color(stroke) + (line_width,)))
+        ops.append(path)
+        ops.append(b"B" if fill and stroke else b"f" if fill else b"S")
+        ops.append(b"Q")
+        return b" ".join(ops)
+
+    def data(self):
+        return b"\n".join(self.ops)
+
+
+def _object(number, body):
+    return b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+
+def _stream(dictionary, data):
+    return b"<< %s /Length %d >>\nstream\n" % (dictionary, len(data)) + data + b"\nendstream"
+
+
+class PageTemplate:
+    """A page whose static part is serialized once; ``render`` adds the rest.
+
+    ``static`` is a ``Content`` drawn once. ``logo`` is optional JPEG bytes,
+    available to the static drawing as the image ``Logo``.
+    """
+
+    def __init__(self, static, logo=None):
+        objects = [
+            (CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES),
+            (PAGES, b"<< /Type /Pages /Count 1 /Kids [%d 0 R] >>" % PAGE),
+            (FONT_REGULAR, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                           b"/Encoding /WinAnsiEncoding >>"),
+            (FONT_BOLD, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold "
+                        b"/Encoding /WinAnsiEncoding >>"),
+        ]
+        fonts = b"/Font << /F1 %d 0 R /F2 %d 0 R >>" % (FONT_REGULAR, FONT_BOLD)
+        xobjects = b""
+        if logo is not None:
+            width, height = jpeg_size(logo)
+            objects.append((LOGO, _stream(b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                                          b"/ColorSpace /DeviceRGB /BitsPerComponent 8 "
+                                          b"/Filter /DCTDecode" % (width, height), logo)))
+            xobjects = b" /XObject << /Logo %d 0 R >>" % LOGO
+        objects.append((STATIC, _stream(b"/Type /XObject /Subtype /Form /BBox [0 0 %d %d] "
+                                         b"/Resources << %s%s >> /Filter /FlateDecode"
+                                         % (PAGE_WIDTH, PAGE_HEIGHT, fonts, xobjects),
+                                         zlib.compress(static.data()))))
+        objects.append((PAGE, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                              b"/Resources << %s /XObject << /Static %d 0 R >> >> >>"
+                        % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, CONTENT, fonts, STATIC)))
+
+        head = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+        offsets = {}
+        position = len(head[0])
+        for number, body in objects:
+            offsets[number] = position
+            head.append(_object(number, body))
+            position += len(head[-1])
+        self._head = b"".join(head)
+        # xref entries for objects 1..PAGE; unused numbers are free entries
+        self._xref = b"".join(b"%010d 00000 n \n" % offsets[n] if n in offsets else b"0000000000 65535 f \n"
+                              for n in range(CATALOG, CONTENT))
+
+    def render(self, content):
+        """The complete PDF: the template with ``content`` drawn over it."""
+        data = zlib.compress(b"/Static Do\n" + content.data())
+        stream = _object(CONTENT, _stream(b"/Filter /FlateDecode", data))
+        xref = len(self._head) + len(stream)
+        return b"".join((
+            self._head, stream,
+            b"xref\n0 %d\n0000000000 65535 f \n" % (CONTENT + 1), self._xref,
+            b"%010d 00000 n \n" % len(self._head),
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (CONTENT + 1, CATALOG, xref),
+        ))
+
+
+def jpeg_size(data):
+    """``(width, height)`` in pixels of an RGB JPEG."""
+    from io import BytesIO
+
+    ensure_imported("PIL.Image")
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        if image.mode != "RGB":
+            raise ValueError(f"Template logo must be an RGB JPEG, not {image.mode}")
+        return image.size
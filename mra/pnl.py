@@ -0,0 +1,401 @@
+"""Import of Profit & Loss exports from QuickBooks, Excel or CSV.
+
+A P&L export is a list of accounts, one per row, followed by one amount
+column per location (or a single total). QuickBooks adds title rows above
+the column headers, section headers ("Income", "Cost of Goods Sold",
+"Expenses", ...) and "Total ..." subtotal rows, which are recognized and
+skipped so nothing is counted twice.
+
+Rows are read in chunks. Each chunk's amounts are parsed as whole columns
+and each account is mapped onto the calculators' inputs (sales, cost of
+goods, labor, operating expenses) and, where the account is an add-back by
+definition (depreciation, interest, owner pay, ...), onto an owner add-back
+as well. Only the running totals are kept between chunks, so memory stays
+flat however many rows or locations the export has. pandas is only
+imported when a file is read, so the calculator pages start as fast as before.
+"""
+
+import csv
+import io
+import itertools
+import math
+import numbers
+import os
+import re
+import zipfile
+
+import numpy as np
+
+from mra.addbacks import ACCOUNTS
+from mra.engine import EBITDA_ADD_BACKS, EBITDA_COLUMNS, SDE_ADD_BACKS, SDE_COLUMNS
+from mra.prewarm import ensure_imported
+
+CHUNK_SIZE = 1000
+
+# Optional parentheses or minus sign, currency symbol, digits with thousands
+# separators, optional k/M/B suffix: "$1,200", "(500)", "-$75.50", "1.2M".
+AMOUNT_PATTERN = re.compile(
+    r"^\s*(?P<open>\()?\s*(?P<sign>-)?\s*[$€£]?\s*(?P<sign2>-)?\s*"
+    r"(?P<number>\d[\d,]*(?:\.\d*)?|\.\d+)\s*(?P<suffix>[kKmMbB])?\s*(?P<close>\))?\s*$"
+)
+SUFFIXES = {"k": 1e3, "m": 1e6, "b": 1e9}
+
+CATEGORIES = ("sales", "cogs", "labor", "operating")
+
+SECTIONS = {
+    "income": re.compile(r"^(?:income|revenue|revenues|sales|ordinary income/expense)$", re.I),
+    "cogs": re.compile(r"^(?:cost of goods sold|cost of sales|cogs)$", re.I),
+    "expenses": re.compile(r"^(?:expenses?|operating expenses)$", re.I),
+    "other_income": re.compile(r"^other income$", re.I),
+    "other_expenses": re.compile(r"^other expenses?$", re.I),
+}
+SECTION_CATEGORIES = {
+    "income": "sales",
+    "cogs": "cogs",
+    "other_expenses": "operating",
+}
+
+# Subtotals and derived lines that would double-count.
+SKIP_ROWS = re.compile(
+    r"^(?:total\b.*|gross profit|net (?:operating |other )?income|net ordinary income|net profit)$", re.I
+)
+
+SALES_ACCOUNTS = re.compile(r"sales|revenue|income", re.I)
+COGS_ACCOUNTS = re.compile(r"cost of (?:goods|sales)|\bcogs\b|purchases|food cost|beverage cost", re.I)
+LABOR_ACCOUNTS = re.compile(
+    r"payroll|wage|salar|benefit|workers'? comp|401\s?k|employee|staff|\bfica\b|\bfuta\b|\bsuta\b", re.I
+)
+
+# Accounts that are owner add-backs by definition (see mra.addbacks)
+ADD_BACK_ACCOUNTS = tuple((label, re.compile(pattern, re.I)) for label, pattern in ACCOUNTS)
+
+
+def _method_columns(method):
+    if method == "ebitda":
+        return EBITDA_COLUMNS, EBITDA_ADD_BACKS
+    if method == "sde":
+        return SDE_COLUMNS, SDE_ADD_BACKS
+    raise ValueError(f"Unknown valuation method: {method!r}")
+
+
+# --- CURRENCY PARSING ---
+
+def _is_number(cell):
+    return isinstance(cell, numbers.Real) and not isinstance(cell, (bool, np.bool_))
+
+
+def parse_amount(text):
+    """Parse one amount as the calculators accept it.
+
+    Blank input (including a missing NaN cell) is 0.0 and text that is not
+    an amount is ``None``. Numeric cells (as Excel gives them) pass through.
+    A single sign is allowed: "--5" and "(-5)" are not amounts.
+    """
+    if _is_number(text):
+        value = float(text)
+        if math.isnan(value):
+            return 0.0
+        return value if math.isfinite(value) else None
+    if text is None or not str(text).strip():
+        return 0.0
+    match = AMOUNT_PATTERN.match(str(text))
+    if match is None or bool(match["open"]) != bool(match["close"]):
+        return None
+    if bool(match["open"]) + bool(match["sign"]) + bool(match["sign2"]) > 1:
+        return None
+    value = float(match["number"].replace(",", ""))
+    if match["suffix"]:
+        value *= SUFFIXES[match["suffix"].lower()]
+    if match["open"] or match["sign"] or match["sign2"]:
+        value = -value
+    return value
+
+
+NUMBER_TYPES = (int, float, np.int64, np.int32, np.float64, np.float32)
+
+
+def _parse_cells(values):
+    # Numeric cells pass through. Text cells have symbols, signs and
+    # separators stripped with whole-column string operations, then
+    # to_numeric does the digits. Cells that AMOUNT_PATTERN rejects are NaN,
+    # so every cell parses as parse_amount would parse it. Returns the
+    # amounts and a blank mask.
+    ensure_imported("pandas")
+    import pandas as pd
+
+    cells = pd.Series(values, dtype=object)
+    if pd.api.types.infer_dtype(cells, skipna=True) in ("string", "empty"):
+        number = pd.Series(False, index=cells.index)  # CSV cells: skip the per-cell type check
+    else:
+        number = cells.map(type).isin(NUMBER_TYPES)
+    text = cells.where(~number, "").astype("string").str.strip().fillna("")
+    valid = text.str.match(AMOUNT_PATTERN)
+    opened, closed = text.str.startswith("("), text.str.endswith(")")
+    minus = text.str.count("-")
+    valid &= opened.astype(int) + minus <= 1
+    negative = opened | (minus > 0)
+    digits = text.str.replace(r"[()$€£,\s-]", "", regex=True)
+    # The suffix is read after the parentheses are gone: "(1.2k)" ends in "k"
+    scale = digits.str[-1:].str.lower().map(SUFFIXES).astype("float64").fillna(1.0)
+    digits = digits.where(scale == 1.0, digits.str[:-1])
+
+    amounts = pd.to_numeric(digits, errors="coerce").astype("float64") * scale
+    amounts = amounts.where(~negative, -amounts)
+    amounts = amounts.where(valid & (opened == closed), np.nan)
+    amounts = amounts.where(text != "", 0.0)
+
+    # A NaN number is a blank cell; an infinite one is not an amount
+    numeric = pd.to_numeric(cells.where(number), errors="coerce").astype("float64")
+    blank = (text == "") & ~(number & numeric.notna())
+    amounts = amounts.where(~number, numeric.fillna(0.0).where(~np.isinf(numeric), np.nan))
+    return amounts.to_numpy(dtype=np.float64, na_value=np.nan), blank.to_numpy(dtype=bool)
+
+
+def parse_amounts(values):
+    """Vectorized ``parse_amount`` over a column of cells.
+
+    Returns a float array with 0.0 for blank cells and NaN for cells that
+    are not amounts. Numeric cells (as Excel gives them) pass through.
+    """
+    return _parse_cells(values)[0]
+
+
+# --- READERS ---
+
+def _csv_rows(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+    else:
+        yield from csv.reader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+
+
+def _excel_rows(source):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError as e:
+        raise RuntimeError("Reading Excel files needs the openpyxl package") from e
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        # A renamed CSV, a corrupt download, or a zip that isn't a workbook
+        raise ValueError(f"not a valid Excel workbook ({e})") from e
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(source, filename=None):
+    """Yield the raw rows of a CSV or Excel export as tuples or lists."""
+    name = filename or str(source)
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        return _excel_rows(source)
+    return _csv_rows(source)
+
+
+def _is_blank(cell):
+    return cell is None or (isinstance(cell, str) and not cell.strip())
+
+
+def _find_header(rows):
+    """Consume title rows; return the location names and the first data rows."""
+    pending = []
+    for row in rows:
+        cells = list(row[1:])
+        filled = [c for c in cells if not _is_blank(c)]
+        if not filled:
+            pending.append(row)
+            continue
+        if any(parse_amount(c) is not None for c in filled if isinstance(c, str)) or \
+                any(isinstance(c, (int, float)) for c in filled):
+            # A data row before any header: name the amount columns ourselves
+            locations = ["Amount"] + [f"Amount {i}" for i in range(2, len(cells) + 1)]
+            return locations, pending + [row]
+        last = max(i for i, c in enumerate(cells) if not _is_blank(c))
+        locations = [str(c).strip() if not _is_blank(c) else f"Column {i + 2}"
+                     for i, c in enumerate(cells[:last + 1])]
+        return locations, []
+    return [], pending
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- MAPPING ---
+
+def map_accounts(accounts, sections):
+    """Map account names to a category and an optional add-back label.
+
+    ``sections`` gives the QuickBooks section each account sits under
+    (NaN when the export has none). Returns two Series aligned with
+    ``accounts``; the category is None for rows that are not counted.
+    """
+    ensure_imported("pandas")
+    import pandas as pd
+
+    category = sections.map(SECTION_CATEGORIES)
+    in_expenses = sections == "expenses"
+    unsectioned = sections.isna()
+
+    is_labor = accounts.str.contains(LABOR_ACCOUNTS)
+    category = category.mask(in_expenses, np.where(is_labor, "labor", "operating"))
+    guess = np.select(
+        [accounts.str.contains(COGS_ACCOUNTS), is_labor, accounts.str.contains(SALES_ACCOUNTS)],
+        ["cogs", "labor", "sales"],
+        "operating",
+    )
+    category = category.mask(unsectioned, guess)
+
+    add_back = pd.Series(None, index=accounts.index, dtype=object)
+    is_expense = category.isin(("cogs", "labor", "operating"))
+    for label, pattern in ADD_BACK_ACCOUNTS:
+        match = is_expense & add_back.isna() & accounts.str.contains(pattern)
+        add_back = add_back.mask(match, label)
+    return category.where(category.notna(), None), add_back
+
+
+# --- IMPORT ---
+
+def _merge_mapping(mapping):
+    return mapping.groupby(["account", "category", "add_back"], dropna=False, sort=False,
+                           as_index=False)["invalid"].sum()
+
+
+def import_pnl(source, method, filename=None, chunk_size=CHUNK_SIZE):
+    """Read a P&L export and total it per location.
+
+    ``source`` is a path or a binary file object; ``filename`` picks the
+    format when ``source`` has no name of its own. Returns ``(totals,
+    accounts)``: ``totals`` has one row per location with the method's input
+    columns and one column per mapped add-back label, and ``accounts``
+    lists every account with the category and add-back it was mapped to,
+    plus ``invalid``, the number of amount cells that could not be read.
+    """
+    ensure_imported("pandas")
+    import pandas as pd
+
+    columns, add_back_labels = _method_columns(method)
+    rows = iter(read_rows(source, filename))
+    locations, first_rows = _find_header(rows)
+    width = len(locations)
+
+    totals = {c: np.zeros(width) for c in CATEGORIES}
+    add_backs = {}
+    mapping = None
+    section = np.nan
+
+    for chunk in _chunks(itertools.chain(first_rows, rows), chunk_size):
+        frame = pd.DataFrame([list(r[:width + 1]) + [None] * (width + 1 - len(r)) for r in chunk])
+        accounts = frame[0].astype("string").fillna("").str.strip()
+        cells = frame.iloc[:, 1:width + 1]
+        values, blank_cells = _parse_cells(cells.to_numpy().ravel())
+        values = values.reshape(len(frame), width)
+        blank = blank_cells.reshape(len(frame), width).all(axis=1)
+
+        header = pd.Series(np.nan, index=frame.index, dtype=object)
+        for name, pattern in SECTIONS.items():
+            header = header.mask(blank & accounts.str.match(pattern), name)
+        sections = header.ffill().fillna(section)
+        section = sections.iloc[-1]
+
+        counted = ~blank & (accounts != "") & ~accounts.str.match(SKIP_ROWS)
+        counted &= ~sections.isin(("other_income",))
+        category, add_back = map_accounts(accounts[counted], sections[counted])
+
+        used = values[counted.to_numpy()]
+        invalid = np.isnan(used).sum(axis=1)
+        used = np.nan_to_num(used)
+        for name in CATEGORIES:
+            totals[name] += used[(category == name).to_numpy()].sum(axis=0)
+        for label in add_back.dropna().unique():
+            if label in add_back_labels:
+                add_backs[label] = add_backs.get(label, 0) + used[(add_back == label).to_numpy()].sum(axis=0)
+
+        # One row per distinct account, so this stays small as chunks go by
+        chunk_mapping = pd.DataFrame({
+            "account": accounts[counted].to_numpy(),
+            "category": category.to_numpy(),
+            "add_back": add_back.to_numpy(),
+            "invalid": invalid,
+        })
+        mapping = _merge_mapping(pd.concat([mapping, chunk_mapping], ignore_index=True))
+
+    result = pd.DataFrame(
+        {column: totals[name] for column, name in zip(columns, CATEGORIES)}, index=locations
+    )
+    for label in add_back_labels:
+        if label in add_backs:
+            result[label] = add_backs[label]
+    result.index.name = "location"
+
+    accounts = mapping if mapping is not None else _merge_mapping(
+        pd.DataFrame(columns=["account", "category", "add_back", "invalid"]))
+    accounts["category"] = accounts["category"].map(dict(zip(CATEGORIES, columns)))
+    return result, accounts
+
+
+def format_amount(value):
+    """Format an amount the way a user would type it: 1,234 or 1,234.56."""
+    text = f"{value:,.2f}"
+    return text[:-3] if text.endswith(".00") else text
+
+
+def import_section(method, input_keys, add_back_keys, key):
+    """Render the P&L upload and prefill the page's inputs from it.
+
+    ``input_keys`` are the widget keys of the method's four inputs in engine
+    order and ``add_back_keys`` maps add-back labels to widget keys. Inputs
+    are overwritten once per file and location, so later edits stick. Must
+    run before those widgets are drawn.
+    """
+    import streamlit as st
+
+    upload = st.file_uploader("Import a P&L export (QuickBooks, Excel or CSV)",
+                              type=["csv", "xlsx", "xlsm"], key=f"{key}_file")
+    if upload is None:
+        return
+
+    cached = st.session_state.get(f"{key}_result")
+    if cached is None or cached[0] != upload.file_id:
+        try:
+            totals, accounts = import_pnl(upload, method, filename=upload.name)
+        except (csv.Error, UnicodeDecodeError, RuntimeError, ValueError) as e:
+            st.error(f"Couldn't read {upload.name}: {e}")
+            return
+        cached = (upload.file_id, totals, accounts)
+        st.session_state[f"{key}_result"] = cached
+    _, totals, accounts = cached
+
+    if totals.empty:
+        st.warning(f"No amount columns found in {upload.name}.")
+        return
+    locations = list(totals.index)
+    location = locations[0]
+    if len(locations) > 1:
+        default = locations.index("Total") if "Total" in locations else 0
+        location = st.selectbox("Location", locations, index=default, key=f"{key}_location")
+
+    if st.session_state.get(f"{key}_applied") != (upload.file_id, location):
+        st.session_state[f"{key}_applied"] = (upload.file_id, location)
+        row = totals.loc[location]
+        columns, _ = _method_columns(method)
+        for column, widget in zip(columns, input_keys):
+            st.session_state[widget] = format_amount(row[column])
+        for label, widget in add_back_keys.items():
+            st.session_state[widget] = format_amount(row[label]) if label in row else ""
+
+    invalid = int(accounts["invalid"].sum())
+    if invalid:
+        st.warning(f"{invalid} amount(s) in {upload.name} couldn't be read and were counted as $0.")
+    with st.expander("How accounts were mapped"):
+        st.dataframe(accounts[["account", "category", "add_back"]], hide_index=True)
@@ -0,0 +1,233 @@
+"""Multi-page portfolio report for any number of valuations, in constant memory.
+
+reportlab's canvas keeps every finished page in memory until ``save()``, so
+a portfolio of thousands of restaurants would grow without bound. This
+module writes the PDF objects straight to the output file instead: each page
+is compressed and written as soon as it is full, and only its byte offset is
+kept for the cross-reference table.
+
+The report opens with a summary table (one line per restaurant) followed by
+one section per restaurant laid out like the single-page report. Summary
+and section pages are both streamed as they fill; the page tree written at
+the end lists the summary pages first, so they read first in any viewer.
+"""
+
+import zlib
+from array import array
+
+from reportlab.lib.pagesizes import letter
+
+from mra.engine import EBITDA_MULTIPLES, SDE_MULTIPLES
+from mra.reports import BANDS, ebitda_report_rows, sde_report_lines
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+TOP, BOTTOM, LEFT = PAGE_HEIGHT - 50, 50, 50
+
+# Object numbers reserved up front; pages and their content follow.
+CATALOG, PAGES, FONT_REGULAR, FONT_BOLD = 1, 2, 3, 4
+FIRST_FREE_OBJECT = 5
+
+SUMMARY_COLUMNS = (LEFT, 190, 265, 305, 380, 455, 530)
+
+
+def _escape(text):
+    text = str(text).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("cp1252", "replace")
+
+
+class _Page:
+    """Accumulates drawing operators for one page."""
+
+    def __init__(self):
+        self.ops = []
+        self.y = TOP
+
+    def text(self, x, y, text, size=11, bold=False):
+        font = b"F2" if bold else b"F1"
+        self.ops.append(b"BT /%s %d Tf %.2f %.2f Td (%s) Tj ET" % (font, size, x, y, _escape(text)))
+
+    def rule(self, y):
+        self.ops.append(b"0.6 w %.2f %.2f m %.2f %.2f l S" % (LEFT, y, PAGE_WIDTH - LEFT, y))
+
+    def content(self):
+        return zlib.compress(b"\n".join(self.ops))
+
+
+class PortfolioWriter:
+    """Streams a portfolio report to a binary file object or path."""
+
+    def __init__(self, out, method="ebitda", title=None):
+        if method not in ("ebitda", "sde"):
+            raise ValueError(f"Unknown valuation method: {method!r}")
+        self.method = method
+        self.title = title or f"MRA {method.upper()} Portfolio Valuation Report"
+        self.multiples = EBITDA_MULTIPLES if method == "ebitda" else SDE_MULTIPLES
+
+        self._own_file = isinstance(out, (str, bytes)) or hasattr(out, "__fspath__")
+        self._file = open(out, "wb") if self._own_file else out
+        self._offsets = array("q", [0] * (FIRST_FREE_OBJECT - 1))
+        self._next_object = FIRST_FREE_OBJECT
+        self._summary_pages = array("q")
+        self._section_pages = array("q")
+        self._closed = False
+
+        self._position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._summary = self._new_summary_page(first=True)
+        self._section = _Page()
+
+        self.count = 0
+        self._totals = [0.0] * (2 + len(self.multiples))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- low-level object output ---
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _reserve(self):
+        number = self._next_object
+        self._next_object += 1
+        self._offsets.append(0)
+        return number
+
+    def _write_object(self, number, body):
+        self._offsets[number - 1] = self._position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _flush_page(self, page, kids):
+        data = page.content()
+        content = self._reserve()
+        self._write_object(content, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data)
+                           + data + b"\nendstream")
+        number = self._reserve()
+        self._write_object(number, b"<< /Type /Page /Parent %d 0 R /Contents %d 0 R >>" % (PAGES, content))
+        kids.append(number)
+
+    # --- summary table ---
+
+    def _new_summary_page(self, first=False):
+        page = _Page()
+        if first:
+            page.text(LEFT, page.y, self.title, size=16, bold=True)
+            page.y -= 30
+        headers = ("Restaurant", self.method.upper(), "Margin", "Base") + BANDS
+        for x, header in zip(SUMMARY_COLUMNS, headers):
+            page.text(x, page.y, header, size=9, bold=True)
+        page.rule(page.y - 4)
+        page.y -= 16
+        return page
+
+    def _summary_line(self, cells, bold=False):
+        if self._summary.y < BOTTOM:
+            self._flush_page(self._summary, self._summary_pages)
+            self._summary = self._new_summary_page()
+        for x, cell in zip(SUMMARY_COLUMNS, cells):
+            self._summary.text(x, self._summary.y, cell, size=9, bold=bold)
+        self._summary.y -= 13
+
+    # --- per-restaurant sections ---
+
+    def _section_lines(self, name, email, values, valuations, multiples):
+        if self.method == "ebitda":
+            rows = ebitda_report_rows(
+                name, email, values["total_expenses"], values["ebitda"], values["margin"],
+                values["owner_benefit"], values["valuation_base"], valuations, multiples)
+            return [f"{metric}: {value}" for metric, value in rows[2:]]
+        lines = sde_report_lines(
+            name, email, values["total_expenses"], values["sde"], values["margin"],
+            values["owner_benefit"], values["net_profit_loss"], values["valuation_base"],
+            valuations, multiples=multiples)
+        return list(lines[2:])
+
+    def add(self, name, email, values, valuations, multiples=None):
+        """Add one restaurant.
+
+        ``values`` maps the engine's metric names (``total_expenses``,
+        ``ebitda``/``sde``, ``margin``, ...) to numbers for this restaurant;
+        ``valuations`` holds one value per band, at ``multiples`` (this
+        restaurant's band, the fixed one by default).
+        """
+        multiples = self.multiples if multiples is None else multiples
+        earnings = values[self.method]
+        self._summary_line([str(name)[:26], f"${earnings:,.0f}", f"{values['margin']:.0f}%",
+                            f"${values['valuation_base']:,.0f}"] + [f"${v:,.0f}" for v in valuations])
+        self._totals[0] += earnings
+        self._totals[1] += values["valuation_base"]
+        for i, value in enumerate(valuations):
+            self._totals[2 + i] += value
+
+        lines = self._section_lines(name, email, values, valuations, multiples)
+        needed = 24 + 16 * len(lines) + 20
+        if self._section.y - needed < BOTTOM:
+            self._flush_page(self._section, self._section_pages)
+            self._section = _Page()
+        page = self._section
+        page.text(LEFT, page.y, name or "(unnamed)", size=13, bold=True)
+        if email:
+            page.text(330, page.y, email, size=10)
+        page.rule(page.y - 6)
+        page.y -= 24
+        for line in lines:
+            page.text(LEFT + 20, page.y, line)
+            page.y -= 16
+        page.y -= 20
+        self.count += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        self._summary_line([f"Total ({self.count})", f"${self._totals[0]:,.0f}", "",
+                            f"${self._totals[1]:,.0f}"] + [f"${v:,.0f}" for v in self._totals[2:]],
+                           bold=True)
+        self._flush_page(self._summary, self._summary_pages)
+        if self._section.ops:
+            self._flush_page(self._section, self._section_pages)
+
+        self._write_object(FONT_REGULAR, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                         b"/Encoding /WinAnsiEncoding >>")
+        self._write_object(FONT_BOLD, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold "
+                                      b"/Encoding /WinAnsiEncoding >>")
+
+        kids = b" ".join(b"%d 0 R" % n for n in (*self._summary_pages, *self._section_pages))
+        count = len(self._summary_pages) + len(self._section_pages)
+        self._write_object(PAGES, b"<< /Type /Pages /Count %d /MediaBox [0 0 %d %d] "
+                                  b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Kids [%s] >>"
+                           % (count, PAGE_WIDTH, PAGE_HEIGHT, FONT_REGULAR, FONT_BOLD, kids))
+        self._write_object(CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES)
+
+        xref = self._position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self._offsets) + 1))
+        for offset in self._offsets:
+            self._write(b"%010d 00000 n \n" % offset)
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (len(self._offsets) + 1, CATALOG, xref))
+        if self._own_file:
+            self._file.close()
+
+
+def write_portfolio(input_path, out_path, method="ebitda", chunk_size=1000, invalid=None):
+    """Value a membership CSV and stream every row into one portfolio PDF.
+
+    Rows with unreadable amounts are left out and reported to ``invalid``
+    as in ``mra.batch.read_members``. Returns the number of restaurants
+    written.
+    """
+    from mra.batch import check_columns, read_members, value_members
+
+    check_columns(input_path, method)
+    with PortfolioWriter(out_path, method) as writer:
+        for chunk in read_members(input_path, chunk_size, invalid):
+            values, bands, valuations = value_members(chunk, method)
+            for i, row in enumerate(values.to_dict("records")):
+                index = values.index[i]
+                writer.add(chunk.at[index, "name"], chunk.at[index, "email"], row, valuations[i], bands[i])
+        return writer.count
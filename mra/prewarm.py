@@ -0,0 +1,64 @@
+"""Background import of heavy dependencies after the first paint.
+
+The pages import matplotlib, reportlab, pandas, sendgrid and the Google API
+client lazily, at first use, so a cold container paints without waiting for
+them. ``prewarm`` then imports them on a daemon thread, once per process, so
+the first chart, download, upload or email click doesn't pay the import cost
+either.
+
+Every lazy import of these libraries goes through ``ensure_imported`` first.
+It shares one lock with the prewarm thread, so a click that arrives while the
+prewarm is still importing waits for it instead of importing the same package
+concurrently. A concurrent import can be handed a partially initialized module
+by Python's import deadlock avoidance.
+"""
+
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CHART_MODULES = ("matplotlib.figure", "matplotlib.patches", "matplotlib.ticker")
+REPORT_MODULES = ("reportlab.pdfbase.pdfmetrics", "PIL.Image")
+IMPORT_MODULES = ("pandas",)
+DELIVERY_MODULES = (
+    "sendgrid",
+    "sendgrid.helpers.mail",
+    "google.oauth2.service_account",
+    "googleapiclient.discovery",
+)
+
+_started = set()
+_lock = threading.Lock()
+_imported = set()
+_import_lock = threading.RLock()
+
+
+def ensure_imported(*modules):
+    """Import ``modules``, serialized with the prewarm thread and other callers."""
+    if _imported.issuperset(modules):
+        return
+    with _import_lock:
+        for name in modules:
+            if name not in _imported:
+                importlib.import_module(name)
+                _imported.add(name)
+
+
+def _import_all(modules):
+    # One module per lock hold, so a foreground import waits for at most one
+    for name in modules:
+        try:
+            ensure_imported(name)
+        except Exception:
+            logger.warning("Prewarm import of %s failed", name, exc_info=True)
+
+
+def prewarm(modules):
+    """Import ``modules`` on a background thread unless already requested."""
+    with _lock:
+        pending = tuple(name for name in modules if name not in _started)
+        _started.update(pending)
+    if pending:
+        threading.Thread(target=_import_all, args=(pending,), name="mra-prewarm", daemon=True).start()
@@ -0,0 +1,212 @@
+"""PDF valuation reports for the EBITDA and SDE calculators.
+
+Reports are only built when a download or email actually asks for one.
+Finished PDFs are memoized in a size-bounded LRU cache keyed by the report's
+data rows, so downloading the same numbers twice reuses the bytes, and in the
+deployment's shared on-disk cache for the other workers.
+
+Each report is one branded page: logo, section frames and labels come from
+a template built once per process per layout (see ``mra.pdftemplate``), and
+each report only fills in its values and a vector margin donut.
+"""
+
+from functools import lru_cache
+
+from mra.addbacks import CUSTOM_LABELS
+from mra.assets import LOGO_WIDTHS
+from mra.cache import shared
+from mra.charts import COLORS, STYLES, donut_vector
+from mra.engine import EBITDA_MULTIPLES, SDE_MULTIPLES, multiple_label
+from mra.metrics import span
+
+REPORT_CACHE_SIZE = 64
+BANDS = ("Low", "Median", "High")
+
+
+def ebitda_report_rows(name, email, total_expenses, ebitda, margin, owner_benefit,
+                       valuation_base, valuations, multiples=EBITDA_MULTIPLES):
+    """Return the ``(metric, value)`` rows of the EBITDA report as a tuple."""
+    rows = [
+        ("Name", name),
+        ("Email", email),
+        ("Total Operating Expenses", f"${total_expenses:,.0f}"),
+        ("EBITDA", f"${ebitda:,.0f}"),
+        ("EBITDA Margin", f"{margin:.0f}%"),
+        ("Total Owner Benefit", f"${owner_benefit:,.0f}"),
+        ("Valuation Base (EBITDA + Owner Benefit)", f"${valuation_base:,.0f}"),
+    ]
+    for band, multiple, value in zip(BANDS, multiples, valuations):
+        rows.append((f"{band} Multiple ({multiple_label(multiple)})", f"${value:,.0f}"))
+    return tuple(rows)
+
+
+def sde_report_lines(name, email, total_expenses, sde, margin, owner_benefit,
+                     net_profit_loss, total_income_valuation, valuations,
+                     custom_add_backs=(), multiples=SDE_MULTIPLES):
+    """Return the text lines of the SDE report as a tuple.
+
+    ``custom_add_backs`` is a sequence of ``(label, value)`` pairs for the
+    user-labelled add-backs, listed at the end of the report.
+    """
+    lines = [
+        f"Name: {name}",
+        f"Email: {email}",
+        f"Total Expenses: ${total_expenses:,.0f}",
+        f"SDE: ${sde:,.0f}",
+        f"Earnings Margin: {margin:.0f}%",
+        f"Total Owner Benefit: ${owner_benefit:,.0f}",
+        f"Net Profit/Loss: ${net_profit_loss:,.0f}",
+        f"Total Income Valuation: ${total_income_valuation:,.0f}",
+    ]
+    for band, multiple, value in zip(BANDS, multiples, valuations):
+        lines.append(f"{band} Valuation ({multiple_label(multiple)}): ${value:,.0f}")
+    lines.extend(f"{label}: ${value:,.0f}" for label, value in custom_add_backs)
+    return tuple(lines)
+
+
+def report_chart(total_expenses, earnings, margin):
+    """The margin donut's inputs for a report, rounded as the on-screen chart rounds them."""
+    return round(total_expenses), round(earnings), round(margin)
+
+
+# --- Layout ---
+# In points on a US letter page. Sections stack down the left column; the
+# margin donut has a panel of its own on the right.
+
+LEFT, RIGHT, TOP = 50, 562, 665
+COLUMN_RIGHT, CHART_LEFT = 380, 400
+BAR, ROW, PAD, GAP = 20, 18, 8, 14
+LOGO_WIDTH = 150
+CHART_RADIUS, CHART_HEIGHT = 58, 250
+FRAME, TINT, MUTED = "#C9D6DF", "#EAF2F8", "#5D6D7E"
+
+LAYOUTS = {
+    "ebitda": {
+        "title": "MRA EBITDA Valuation Report",
+        "sections": (("Prepared For", 2), ("Earnings", 3), ("Owner Benefit", 2), ("Valuation", 3)),
+    },
+    "sde": {
+        "title": "MRA SDE Valuation Report",
+        "sections": (("Prepared For", 2), ("Earnings", 3), ("Owner Benefit", 3), ("Valuation", 3),
+                     ("Custom Add-Backs", len(CUSTOM_LABELS))),
+    },
+}
+
+
+def _sections(kind):
+    """``(title, top, rows)`` of each section frame, top to bottom."""
+    top = TOP
+    for title, rows in LAYOUTS[kind]["sections"]:
+        yield title, top, rows
+        top -= BAR + rows * ROW + PAD + GAP
+
+
+def _chart_center():
+    return (CHART_LEFT + RIGHT) / 2, TOP - BAR - 20 - CHART_RADIUS
+
+
+def _legend_y(i):
+    return TOP - BAR - 2 * CHART_RADIUS - 50 - 30 * i
+
+
+@lru_cache(maxsize=None)
+def _template(kind):
+    """Everything on the page that doesn't depend on the report's values."""
+    from mra.assets import logo_jpeg
+    from mra.pdftemplate import Content, PageTemplate, jpeg_size
+
+    style = STYLES[kind]
+    static = Content()
+
+    # Header: logo, title, accent rules
+    logo = logo_jpeg(LOGO_WIDTHS[0])
+    width, height = jpeg_size(logo)
+    static.image("Logo", LEFT, TOP + 35, LOGO_WIDTH, LOGO_WIDTH * height / width)
+    static.text_right(RIGHT, TOP + 67, LAYOUTS[kind]["title"], size=18, bold=True, color=COLORS[0])
+    static.text_right(RIGHT, TOP + 50, "Massachusetts Restaurant Association", size=10, color=MUTED)
+    static.line(LEFT, TOP + 22, RIGHT, TOP + 22, color=COLORS[0], line_width=2)
+    static.line(LEFT, TOP + 18, RIGHT, TOP + 18, color=COLORS[1], line_width=1)
+
+    # Section frames
+    for title, top, rows in _sections(kind):
+        height = BAR + rows * ROW + PAD
+        static.rect(LEFT, top - height, COLUMN_RIGHT - LEFT, height, stroke=FRAME)
+        static.rect(LEFT, top - BAR, COLUMN_RIGHT - LEFT, BAR, fill=TINT, stroke=FRAME)
+        static.text(LEFT + 10, top - 14, title, size=11, bold=True, color=COLORS[0])
+
+    # Chart panel and legend labels
+    static.rect(CHART_LEFT, TOP - CHART_HEIGHT, RIGHT - CHART_LEFT, CHART_HEIGHT, stroke=FRAME)
+    static.rect(CHART_LEFT, TOP - BAR, RIGHT - CHART_LEFT, BAR, fill=TINT, stroke=FRAME)
+    static.text(CHART_LEFT + 10, TOP - 14, style["title"], size=11, bold=True, color=COLORS[0])
+    for i, (label, color) in enumerate(zip(style["labels"], COLORS)):
+        static.rect(CHART_LEFT + 12, _legend_y(i) - 1, 8, 8, fill=color)
+        static.text(CHART_LEFT + 26, _legend_y(i), label, size=8, color=MUTED)
+
+    # Footer
+    static.line(LEFT, 72, RIGHT, 72, color=FRAME)
+    static.text(LEFT, 58, "Questions about this methodology? Contact Kerry Miller at "
+                          "kmiller@themassrest.org.", size=8, color=MUTED)
+    return PageTemplate(static, logo)
+
+
+def _pairs(lines):
+    """SDE report lines as ``(label, value)`` pairs, split at the last ": "."""
+    for line in lines:
+        label, sep, value = line.rpartition(": ")
+        yield (label, value) if sep else (line, "")
+
+
+def _render(kind, rows, chart):
+    from mra.pdftemplate import Content, fit, text_width
+
+    with span("pdf"):
+        template = _template(kind)
+        content = Content()
+
+        rows = list(rows)
+        sections = list(_sections(kind))
+        for n, (_, top, count) in enumerate(sections):
+            # Rows past the layout's count continue in the last section
+            section, rows = (rows[:count], rows[count:]) if n < len(sections) - 1 else (rows, [])
+            for i, (label, value) in enumerate(section):
+                y = top - BAR - 14 - i * ROW
+                value = fit(value, 200, 10, bold=True)
+                value_width = text_width(value, 10, bold=True)
+                content.text(LEFT + 10, y, fit(label, COLUMN_RIGHT - LEFT - 30 - value_width, 10))
+                content.text(COLUMN_RIGHT - 10 - value_width, y, value, bold=True)
+
+        total_expenses, earnings, margin = chart or (0, 0, 0)
+        cx, cy = _chart_center()
+        donut_vector(content, cx, cy, CHART_RADIUS, total_expenses, earnings, margin)
+        for i, value in enumerate((total_expenses, earnings)):
+            content.text(CHART_LEFT + 26, _legend_y(i) - 12, f"${value:,.0f}" if chart else "-",
+                         size=9, bold=True)
+        return template.render(content)
+
+
+# Namespaces carry a version so the shared disk cache never serves a
+# report built from an earlier layout.
+@lru_cache(maxsize=REPORT_CACHE_SIZE)
+@shared("ebitda_report.2")
+def ebitda_report_pdf(rows, chart=None):
+    """Build the EBITDA report from a tuple of ``(metric, value)`` pairs.
+
+    ``chart`` is the ``report_chart`` tuple for the margin donut; without
+    it the donut panel is left empty.
+    """
+    return _render("ebitda", rows, chart)
+
+
+@lru_cache(maxsize=REPORT_CACHE_SIZE)
+@shared("sde_report.2")
+def sde_report_pdf(lines, chart=None):
+    """Build the SDE report from a tuple of preformatted text lines.
+
+    ``chart`` is the ``report_chart`` tuple for the margin donut.
+    """
+    return _render("sde", tuple(_pairs(lines)), chart)
+
+
+def cache_clear():
+    ebitda_report_pdf.cache_clear()
+    sde_report_pdf.cache_clear()
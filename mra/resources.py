@@ -0,0 +1,60 @@
+"""Process-wide resources shared by both calculator pages.
+
+``app.py`` serves the EBITDA and SDE pages from one Streamlit process. The
+clients and background threads below are created on first use, from
+``st.secrets``, and then shared by every session of either page. Charts,
+PDFs, the comparable-sales index and the built assets are already cached
+at module level (``mra.charts``, ``mra.reports``, ``mra.comps``,
+``mra.assets``), so both pages share those too.
+"""
+
+import threading
+
+from mra.submissions import get_store
+
+_lock = threading.Lock()
+_exporter = None
+_outbox = None
+
+
+def _secret(name):
+    import streamlit as st
+
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        return None
+
+
+def submission_store():
+    """The submission store, with its Sheets exporter started once per process.
+
+    Without ``GCP_SHEET_ID`` in the secrets, submissions are only kept
+    locally.
+    """
+    global _exporter
+    store = get_store()
+    with _lock:
+        if _exporter is None:
+            sheet_id = _secret("GCP_SHEET_ID")
+            if sheet_id:
+                from mra.sheets import GoogleSheetsBackend, SheetsExporter, get_sheets_service
+
+                service_account = _secret("gcp_service_account")
+                _exporter = SheetsExporter(
+                    store, lambda: GoogleSheetsBackend(get_sheets_service(service_account)), sheet_id
+                )
+            else:
+                _exporter = False
+    return store
+
+
+def outbox():
+    """The email outbox: one SendGrid client and delivery pool per process."""
+    global _outbox
+    with _lock:
+        if _outbox is None:
+            from mra.outbox import Outbox, SendGridTransport
+
+            _outbox = Outbox(SendGridTransport(_secret("SENDGRID_API_KEY"), _secret("SENDGRID_SENDER")))
+        return _outbox
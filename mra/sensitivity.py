@@ -0,0 +1,103 @@
+"""Sensitivity of a valuation to the multiple and to cost ratios.
+
+The whole grid is computed with one NumPy outer product, so a 200 x 200
+grid of multiples against cost shifts takes well under a millisecond and
+can sit behind sliders.
+"""
+
+import math
+
+import numpy as np
+
+from mra.prewarm import ensure_imported
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+MULTIPLE_BOUNDS = (0.5, 5.0)
+MULTIPLE_STEP = 0.05
+
+
+def sensitivity_grid(net_sales, earnings, owner_benefit, multiples, cost_shifts):
+    """Return valuations over a grid of multiples and cost shifts.
+
+    ``cost_shifts`` are percentage points of net sales added to a cost line
+    (COGS, labor, ...); a shift of +2 lowers earnings by 2% of sales.
+    ``result[i, j]`` is the valuation at ``multiples[i]`` and
+    ``cost_shifts[j]``.
+    """
+    shifts = np.asarray(cost_shifts, dtype=np.float64)
+    base = earnings + owner_benefit - shifts * (net_sales / 100.0)
+    return np.multiply.outer(np.asarray(multiples, dtype=np.float64), base)
+
+
+def percentile_table(grid, percentiles=PERCENTILES):
+    """Summarize a valuation grid as a one-column DataFrame of percentiles."""
+    ensure_imported("pandas")
+    import pandas as pd
+
+    values = np.percentile(grid, percentiles)
+    return pd.DataFrame({"Valuation": values}, index=[f"P{p}" for p in percentiles])
+
+
+def heatmap_figure(grid, multiples, cost_ratios, cost_label):
+    """Draw the grid as a heatmap on a standalone (non-pyplot) Figure.
+
+    ``cost_ratios`` label the columns with the cost line as a percentage of
+    sales after each shift.
+    """
+    ensure_imported("matplotlib.figure", "matplotlib.ticker")
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import FuncFormatter
+
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    image = ax.imshow(
+        grid,
+        origin="lower",
+        aspect="auto",
+        cmap="viridis",
+        extent=(cost_ratios[0], cost_ratios[-1], multiples[0], multiples[-1]),
+    )
+    ax.set_xlabel(f"{cost_label} (% of sales)", fontsize=9)
+    ax.set_ylabel("Multiple (x)", fontsize=9)
+    ax.tick_params(labelsize=8)
+    colorbar = fig.colorbar(image, ax=ax, format=FuncFormatter(lambda v, _: f"${v:,.0f}"))
+    colorbar.ax.tick_params(labelsize=8)
+    fig.tight_layout()
+    return fig
+
+
+def sensitivity_section(net_sales, earnings, owner_benefit, multiple_range, cost_lines, key):
+    """Render the sensitivity-analysis controls, heatmap and percentiles.
+
+    ``multiple_range`` is the default (low, high) pair of the page's
+    multiples; ``cost_lines`` maps the label of each cost line a user can
+    shift to its current dollar amount. The slider's bounds widen, in whole
+    steps, to include a comps band outside ``MULTIPLE_BOUNDS``.
+    """
+    import streamlit as st
+
+    low, high = (float(m) for m in multiple_range)
+    # A range kept from an earlier band must stay inside the bounds too
+    chosen = st.session_state.get(f"{key}_multiples", (low, high))
+    lowest = min(MULTIPLE_BOUNDS[0], math.floor(min(low, chosen[0]) / MULTIPLE_STEP) * MULTIPLE_STEP)
+    highest = max(MULTIPLE_BOUNDS[1], math.ceil(max(high, chosen[1]) / MULTIPLE_STEP) * MULTIPLE_STEP)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        low, high = st.slider("Multiple range (x)", round(lowest, 2), round(highest, 2), (low, high),
+                              MULTIPLE_STEP, key=f"{key}_multiples")
+        cost_label = st.selectbox("Cost line to shift", list(cost_lines), key=f"{key}_cost")
+    with col2:
+        shift = st.slider("Cost shift range (% of sales)", -20.0, 20.0, (-5.0, 5.0), 0.5, key=f"{key}_shift")
+        steps = st.slider("Grid resolution (steps per axis)", 10, 200, 200, 10, key=f"{key}_steps")
+
+    multiples = np.linspace(low, high, steps)
+    cost_shifts = np.linspace(shift[0], shift[1], steps)
+    grid = sensitivity_grid(net_sales, earnings, owner_benefit, multiples, cost_shifts)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        cost_ratios = cost_shifts + cost_lines[cost_label] * 100.0 / net_sales
+        st.pyplot(heatmap_figure(grid, multiples, cost_ratios, cost_label))
+    with col2:
+        st.dataframe(percentile_table(grid).style.format("${:,.0f}"))
@@ -0,0 +1,158 @@
+"""Google Sheets access with a process-wide client and background appends.
+
+The discovery client is built once per process and reused. Rows are not
+sent when the user clicks. ``SheetsExporter`` copies new submissions from
+the local ``SubmissionStore`` to the sheet every ``interval`` seconds in
+bulk ``values().append`` calls, and once more when the interpreter exits.
+
+The exporter talks to a small backend object with one method,
+``append(spreadsheet_id, range_name, rows)``. ``GoogleSheetsBackend`` wraps
+the real API. ``FakeSheetsBackend`` keeps rows in memory so the export can be
+exercised and measured without a network.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+import time
+
+from mra.metrics import observe
+from mra.prewarm import ensure_imported
+
+logger = logging.getLogger(__name__)
+
+SCOPE = ["https://www.googleapis.com/auth/spreadsheets"]
+# Name and email stay in A:B so the existing users sheet keeps its layout
+SUBMISSIONS_RANGE = "MRA Valuation Tool Users!A:I"
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_sheets_service(service_account_info):
+    """Return the process-wide Sheets service, building it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            ensure_imported("google.oauth2.service_account", "googleapiclient.discovery")
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+
+            creds = Credentials.from_service_account_info(dict(service_account_info), scopes=SCOPE)
+            _service = build('sheets', 'v4', credentials=creds, cache_discovery=False)
+        return _service
+
+
+class GoogleSheetsBackend:
+    """Appends rows through the Sheets v4 API."""
+
+    def __init__(self, service):
+        self.sheet = service.spreadsheets()
+
+    def append(self, spreadsheet_id, range_name, rows):
+        self.sheet.values().append(
+            spreadsheetId=spreadsheet_id,
+            range=range_name,
+            valueInputOption="RAW",
+            body={"values": rows}
+        ).execute()
+
+
+class FakeSheetsBackend:
+    """In-memory stand-in for the Sheets API with optional simulated latency."""
+
+    def __init__(self, latency=0.0, fail_times=0):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.calls = 0
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def append(self, spreadsheet_id, range_name, rows):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("simulated Sheets failure")
+            self.rows.extend(rows)
+
+
+def submission_row(submission):
+    """The sheet row for one stored submission."""
+    created = datetime.datetime.fromtimestamp(submission["created"], datetime.timezone.utc)
+    return [
+        submission["name"], submission["email"], created.strftime("%Y-%m-%d %H:%M:%S"),
+        submission["method"], submission["region"] or "", submission["concept"] or "",
+        round(submission["valuation_base"], 2), round(submission["median"], 2), submission["id"],
+    ]
+
+
+class SheetsExporter:
+    """Copies new submissions from a ``SubmissionStore`` to a sheet on a timer.
+
+    ``make_backend`` is called on the worker thread the first time rows are
+    sent, so a missing or broken Sheets configuration never gets in the way
+    of saving submissions; the export is retried every ``interval``.
+    """
+
+    TARGET = "google_sheets"
+
+    def __init__(self, store, make_backend, spreadsheet_id, range_name=SUBMISSIONS_RANGE,
+                 interval=60.0, batch_size=500):
+        self.store = store
+        self.make_backend = make_backend
+        self.spreadsheet_id = spreadsheet_id
+        self.range_name = range_name
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._backend = None
+        self._stop = threading.Event()
+        self._export_lock = threading.Lock()
+
+        self.rows_written = 0
+        self.exports = 0
+        self.failures = 0
+
+        self._thread = threading.Thread(target=self._run, name="sheets-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _send(self, submissions):
+        if self._backend is None:
+            self._backend = self.make_backend()
+        start = time.perf_counter()
+        self._backend.append(self.spreadsheet_id, self.range_name,
+                             [submission_row(s) for s in submissions])
+        observe("sheets_append", time.perf_counter() - start)
+        self.rows_written += len(submissions)
+
+    def export(self):
+        """Send everything not yet exported from the calling thread; returns the row count."""
+        with self._export_lock:
+            try:
+                sent = self.store.export(self.TARGET, self._send, self.batch_size)
+            except Exception:
+                self.failures += 1
+                logger.exception("Sheets export failed; will retry")
+                return 0
+            self.exports += 1
+            return sent
+
+    def stats(self):
+        return {"rows_written": self.rows_written, "exports": self.exports, "failures": self.failures}
+
+    def close(self, timeout=10.0):
+        """Stop the timer and export whatever is left."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self.export()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
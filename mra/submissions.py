@@ -0,0 +1,247 @@
+"""Local SQLite store of every valuation sent from the calculator pages.
+
+Each submission keeps who sent it, the P&L inputs and add-backs as entered,
+and the results (earnings, valuation base, multiples and valuations). The
+headline figures are plain columns so reports can aggregate them in SQL.
+The database runs in WAL mode with ``synchronous=NORMAL``, so a save is one
+short local transaction. Readers never block the writer. WAL checkpoints,
+the only step that syncs to disk, run on a background thread instead of
+inside whichever save happens to fill the log. All sessions in a process
+share one write connection behind a lock, since SQLite only admits one
+writer at a time anyway. The sqlite3 module caches the compiled
+statements per connection.
+
+Google Sheets is no longer written when a user clicks. ``export`` hands
+batches of not-yet-exported rows to a callback (see
+``mra.sheets.SheetsExporter``). The per-target cursor only advances once the
+callback returns. A short lease in the same database keeps two processes
+from exporting the same rows at once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_PATH = os.environ.get("MRA_SUBMISSIONS_DB", os.path.join(".data", "submissions.db"))
+EXPORT_LEASE = 300.0
+CHECKPOINT_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    method TEXT NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    region TEXT,
+    concept TEXT,
+    sales REAL NOT NULL,
+    earnings REAL NOT NULL,
+    margin REAL NOT NULL,
+    owner_benefit REAL NOT NULL,
+    valuation_base REAL NOT NULL,
+    low REAL NOT NULL,
+    median REAL NOT NULL,
+    high REAL NOT NULL,
+    inputs TEXT NOT NULL,
+    add_backs TEXT NOT NULL,
+    results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_email ON submissions (email, created);
+CREATE INDEX IF NOT EXISTS submissions_created ON submissions (created);
+CREATE TABLE IF NOT EXISTS exports (
+    target TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+INSERT = """
+INSERT INTO submissions (created, method, name, email, region, concept, sales, earnings, margin,
+                         owner_benefit, valuation_base, low, median, high, inputs, add_backs, results)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+PERIODS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m", "year": "%Y"}
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _plain(value):
+    # Engine results are numpy scalars and arrays
+    return value.tolist() if hasattr(value, "tolist") else value
+
+
+class SubmissionStore:
+    """Saves submissions to, and queries them from, one SQLite file."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = _connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA wal_autocheckpoint=0")
+        self._db.executescript(SCHEMA)
+        self._owner = uuid.uuid4().hex
+
+        self._stop = threading.Event()
+        self._checkpointer = threading.Thread(target=self._checkpoint, name="submissions-checkpoint",
+                                              daemon=True)
+        self._checkpointer.start()
+
+    def _checkpoint(self):
+        connection = _connect(self.path)
+        try:
+            while not self._stop.wait(CHECKPOINT_INTERVAL):
+                # PASSIVE copies what it can without waiting on readers or the writer
+                connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        finally:
+            connection.close()
+
+    def record(self, method, name, email, sales, inputs, add_backs, result, multiples,
+               region=None, concept=None):
+        """Save one submission; returns its id.
+
+        ``sales`` is the method's sales figure (net sales or F&B income).
+        ``inputs`` and ``add_backs`` map labels to amounts, ``result`` is the
+        engine's result for this valuation and ``multiples`` the band it used.
+        """
+        results = {key: _plain(value) for key, value in result.items()}
+        results["multiples"] = list(multiples)
+        low, median, high = (float(v) for v in results["valuations"])
+        row = (
+            time.time(), method, name, email, region, concept,
+            float(sales), float(results[method]), float(results["margin"]),
+            float(results["owner_benefit"]), float(results["valuation_base"]), low, median, high,
+            json.dumps(inputs), json.dumps(add_backs), json.dumps(results),
+        )
+        with self._lock:
+            return self._db.execute(INSERT, row).lastrowid
+
+    def close(self):
+        self._stop.set()
+        self._checkpointer.join()
+        with self._lock:
+            self._db.close()
+
+    # --- QUERIES ---
+    # Each query runs on its own connection so a long report never holds the write lock.
+
+    def _query(self, sql, params=()):
+        connection = _connect(self.path)
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def count(self):
+        return self._query("SELECT COUNT(*) AS n FROM submissions")[0]["n"]
+
+    def by_email(self, email, limit=100):
+        """The latest submissions from ``email``, newest first."""
+        return self._query(
+            "SELECT * FROM submissions WHERE email = ? ORDER BY created DESC LIMIT ?", (email, limit)
+        )
+
+    def summary(self, start=None, end=None, period="month"):
+        """Submission counts and average figures per period and method.
+
+        ``start`` and ``end`` are Unix timestamps; ``period`` is one of
+        day, week, month or year.
+        """
+        return self._query(
+            f"""
+            SELECT strftime('{PERIODS[period]}', created, 'unixepoch') AS period, method,
+                   COUNT(*) AS submissions, COUNT(DISTINCT email) AS people,
+                   AVG(sales) AS avg_sales, AVG(margin) AS avg_margin,
+                   AVG(valuation_base) AS avg_valuation_base, AVG(median) AS avg_median_valuation
+            FROM submissions
+            WHERE created >= ? AND created < ?
+            GROUP BY period, method
+            ORDER BY period, method
+            """,
+            (start if start is not None else 0.0, end if end is not None else float("inf")),
+        )
+
+    # --- EXPORT ---
+
+    def _claim(self, target, lease):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT OR IGNORE INTO exports (target) VALUES (?)", (target,))
+                last_id, owner, until = self._db.execute(
+                    "SELECT last_id, lease_owner, lease_until FROM exports WHERE target = ?", (target,)
+                ).fetchone()
+                if owner not in (None, self._owner) and until > now:
+                    self._db.execute("ROLLBACK")
+                    return None
+                self._db.execute("UPDATE exports SET lease_owner = ?, lease_until = ? WHERE target = ?",
+                                 (self._owner, now + lease, target))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return last_id
+
+    def _release(self, target, last_id):
+        with self._lock:
+            self._db.execute(
+                "UPDATE exports SET last_id = ?, lease_owner = NULL, lease_until = 0 "
+                "WHERE target = ? AND lease_owner = ?",
+                (last_id, target, self._owner),
+            )
+
+    def export(self, target, send, batch_size=500, lease=EXPORT_LEASE):
+        """Pass submissions not yet exported to ``target`` to ``send`` in batches.
+
+        ``send`` gets a list of row dicts, oldest first. The cursor only moves
+        past a batch once ``send`` returns, so a failed batch is retried next
+        time. Returns the number of rows sent, or 0 when another process
+        holds the export lease.
+        """
+        last_id = self._claim(target, lease)
+        if last_id is None:
+            return 0
+        sent = 0
+        try:
+            while True:
+                rows = self._query(
+                    "SELECT * FROM submissions WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                )
+                if not rows:
+                    break
+                send(rows)
+                last_id = rows[-1]["id"]
+                sent += len(rows)
+                if len(rows) < batch_size:
+                    break
+        finally:
+            self._release(target, last_id)
+        return sent
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_PATH):
+    """Return the process-wide store for ``path``."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = SubmissionStore(path)
+        return _store
@@ -0,0 +1,384 @@
+"""Trailing-twelve-month (TTM) valuations from monthly P&L history.
+
+Input is one row per location and month: ``location``, ``month`` (anything
+pandas reads as a date; only the year and month are used), the method's
+inputs (``mra.engine.EBITDA_COLUMNS`` or ``SDE_COLUMNS``) and, optionally,
+owner add-back columns labeled as on the calculator pages.
+
+``RollingTTM`` keeps the monthly figures and the twelve-month window sums
+ending at every month in NumPy arrays of shape (locations, months,
+columns), and the engine's results for every window. Windows over months
+that are new to it are computed with one cumulative sum. A month that is
+corrected, or filled in after later months, is applied as a difference to
+the twelve windows that contain it, and only those windows are valued
+again. Appending a month to every location therefore touches one window
+per location. A window is complete once all twelve of its months are
+present; incomplete windows report NaN.
+
+Valuations use the calculators' fixed bands, not ``mra.comps``: a comps
+band follows each window's revenue and margin, so a change in the comps
+would show up as a change in value that the P&L never had. With constant
+multiples the trend is the earnings trend.
+"""
+
+import numpy as np
+
+from mra.addbacks import renames
+from mra.engine import (EBITDA_ADD_BACKS, EBITDA_COLUMNS, EBITDA_MULTIPLES, SDE_ADD_BACKS, SDE_COLUMNS,
+                        SDE_MULTIPLES, ebitda_valuation, multiple_label, sde_valuation)
+from mra.prewarm import ensure_imported
+
+WINDOW = 12
+TOTAL = "Total"
+DEFAULT_LOCATION = "Restaurant"
+
+_METHODS = {
+    "ebitda": (EBITDA_COLUMNS, EBITDA_ADD_BACKS, ebitda_valuation, EBITDA_MULTIPLES, "ebitda"),
+    "sde": (SDE_COLUMNS, SDE_ADD_BACKS, sde_valuation, SDE_MULTIPLES, "sde"),
+}
+
+
+def _method(method):
+    try:
+        return _METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown valuation method: {method!r}") from None
+
+
+def _grow(array, shape):
+    # Room for at least ``shape``, doubling so repeated appends stay amortized O(1)
+    if all(have >= need for have, need in zip(array.shape, shape)):
+        return array
+    bigger = tuple(max(have, need if need <= have else max(need, 2 * have))
+                   for have, need in zip(array.shape, shape))
+    grown = np.zeros(bigger + array.shape[len(shape):], dtype=array.dtype)
+    grown[tuple(slice(0, n) for n in array.shape[:len(shape)])] = array
+    return grown
+
+
+def _shift(array, offset):
+    # Move every month ``offset`` columns later, for months before the first one
+    shifted = np.zeros((array.shape[0], array.shape[1] + offset) + array.shape[2:], dtype=array.dtype)
+    shifted[:, offset:] = array
+    return shifted
+
+
+class RollingTTM:
+    """Monthly figures and trailing-twelve-month valuations for a group of locations."""
+
+    def __init__(self, method, multiples=None):
+        self.method = method
+        inputs, add_backs, self._compute, default_multiples, self.earnings = _method(method)
+        self.inputs = inputs
+        self.add_backs = add_backs
+        self.columns = inputs + add_backs
+        self.multiples = tuple(default_multiples if multiples is None else multiples)
+        self.locations = []
+        self._rows = {}
+        self.start = None  # pandas monthly Period ordinal of the first month
+        self.months = 0
+        self.revalued = 0  # windows valued by the last update
+        self._values = np.zeros((0, 0, len(self.columns)))
+        self._present = np.zeros((0, 0), dtype=bool)
+        self._sums = np.zeros((0, 0, len(self.columns)))
+        self._counts = np.zeros((0, 0), dtype=np.int16)
+        self._results = {}
+
+    # --- UPDATES ---
+
+    def _locate(self, locations, months):
+        # Row and column of every cell, growing or shifting the arrays to fit.
+        # Returns the rows, columns and the ranges of columns with no windows yet.
+        for name in dict.fromkeys(locations):
+            if name not in self._rows:
+                self._rows[name] = len(self.locations)
+                self.locations.append(name)
+        rows = np.fromiter((self._rows[name] for name in locations), dtype=np.intp, count=len(locations))
+
+        first, last = int(months.min()), int(months.max())
+        if self.start is None:
+            self.start = first
+        offset = max(self.start - first, 0)
+        if offset:
+            for name in ("_values", "_present", "_sums", "_counts"):
+                setattr(self, name, _shift(getattr(self, name)[:, :self.months], offset))
+            self._results = {k: _shift(v[:, :self.months], offset) for k, v in self._results.items()}
+            self.start = first
+        old_months = self.months + offset
+        self.months = max(old_months, last - self.start + 1)
+
+        shape = (len(self.locations), self.months)
+        for name in ("_values", "_present", "_sums", "_counts"):
+            setattr(self, name, _grow(getattr(self, name), shape))
+        for name, value in self._results.items():
+            self._results[name] = _grow(value, shape)
+        fresh = [(lo, hi) for lo, hi in ((0, offset), (old_months, self.months)) if lo < hi]
+        return rows, months - self.start, fresh
+
+    def _window_sums(self, lo, hi):
+        # Sums and month counts of the windows ending at columns lo..hi-1
+        first = max(lo - WINDOW + 1, 0)
+        locations = len(self.locations)
+        values = np.zeros((locations, hi - first + 1, len(self.columns)))
+        np.cumsum(self._values[:locations, first:hi], axis=1, out=values[:, 1:])
+        present = np.zeros((locations, hi - first + 1), dtype=np.int32)
+        np.cumsum(self._present[:locations, first:hi], axis=1, out=present[:, 1:])
+        ends = np.arange(lo, hi) - first + 1
+        starts = np.maximum(ends - WINDOW, 0)
+        return values[:, ends] - values[:, starts], present[:, ends] - present[:, starts]
+
+    def update(self, monthly):
+        """Add or replace months from a frame shaped like ``read_monthly``'s.
+
+        Rows for a location and month already held replace its figures.
+        Returns the number of windows valued again.
+        """
+        monthly = monthly.drop_duplicates(["location", "month"], keep="last")
+        if monthly.empty:
+            self.revalued = 0
+            return 0
+        rows, cols, fresh = self._locate(
+            monthly["location"].tolist(), monthly["month"].to_numpy(dtype=np.int64))
+        values = np.zeros((len(monthly), len(self.columns)))
+        for i, column in enumerate(self.columns):
+            if column in monthly.columns:
+                values[:, i] = monthly[column].to_numpy(dtype=np.float64)
+
+        was_present = self._present[rows, cols]
+        delta = values - np.where(was_present[:, None], self._values[rows, cols], 0.0)
+        self._values[rows, cols] = values
+        self._present[rows, cols] = True
+
+        dirty = np.zeros((len(self.locations), self.months), dtype=bool)
+        if len(rows) * WINDOW >= dirty.size:
+            # The changes reach most windows anyway; one pass over everything is cheaper
+            fresh = [(0, self.months)]
+        else:
+            # Every window that existed before takes the difference of each
+            # changed month in it; new columns are summed below
+            is_fresh = np.zeros(self.months + WINDOW, dtype=bool)
+            for lo, hi in fresh:
+                is_fresh[lo:hi] = True
+            window_rows = np.repeat(rows, WINDOW)
+            window_cols = (cols[:, None] + np.arange(WINDOW)).ravel()
+            keep = (window_cols < self.months) & ~is_fresh[window_cols]
+            window_rows, window_cols = window_rows[keep], window_cols[keep]
+            np.add.at(self._sums, (window_rows, window_cols), np.repeat(delta, WINDOW, axis=0)[keep])
+            np.add.at(self._counts, (window_rows, window_cols), np.repeat(~was_present, WINDOW)[keep])
+            dirty[window_rows, window_cols] = True
+        for lo, hi in fresh:
+            sums, counts = self._window_sums(lo, hi)
+            self._sums[:len(self.locations), lo:hi] = sums
+            self._counts[:len(self.locations), lo:hi] = counts
+            dirty[:, lo:hi] = True
+
+        self._revalue(dirty)
+        return self.revalued
+
+    def _revalue(self, dirty):
+        rows, cols = np.nonzero(dirty)
+        self.revalued = len(rows)
+        if not len(rows):
+            return
+        sums = self._sums[rows, cols]
+        result = self._compute(*sums[:, :len(self.inputs)].T, owner_benefit=sums[:, len(self.inputs):],
+                               multiples=self.multiples)
+        for name in (self.earnings, "margin", "owner_benefit", "valuation_base", "valuations"):
+            if name not in self._results:
+                self._results[name] = np.zeros(self._sums.shape[:2] + result[name].shape[1:])
+            self._results[name][rows, cols] = result[name]
+
+    # --- RESULTS ---
+
+    @property
+    def windows(self):
+        return len(self.locations) * self.months
+
+    def month_index(self):
+        """The months held, as a pandas DatetimeIndex of month starts."""
+        ensure_imported("pandas")
+        import pandas as pd
+
+        ordinals = np.arange(self.start or 0, (self.start or 0) + self.months)
+        return pd.PeriodIndex.from_ordinals(ordinals, freq="M").to_timestamp()
+
+    def _total(self):
+        # The group: every location whose window is complete that month
+        locations = len(self.locations)
+        complete = self._counts[:locations, :self.months] == WINDOW
+        sums = np.einsum("lt,ltc->tc", complete, self._sums[:locations, :self.months])
+        result = self._compute(*sums[:, :len(self.inputs)].T, owner_benefit=sums[:, len(self.inputs):],
+                               multiples=self.multiples)
+        return sums, complete.any(axis=0), result
+
+    def frame(self, locations=None):
+        """TTM figures for every month, one row per location and month.
+
+        ``locations`` defaults to all of them, plus ``TOTAL`` for a group of
+        more than one. ``TOTAL`` sums the locations whose window is complete
+        that month. Columns are ``location``, ``month``, ``complete``, the
+        method's inputs summed over the window, ``owner_benefit``, the
+        earnings (``ebitda`` or ``sde``), ``margin``, ``valuation_base`` and
+        one ``valuation_<m>x`` per multiple; incomplete windows are NaN.
+        """
+        ensure_imported("pandas")
+        import pandas as pd
+
+        if locations is None:
+            locations = ([TOTAL] if len(self.locations) > 1 else []) + self.locations
+        names, parts = [], []
+        for name in locations:
+            if name == TOTAL:
+                sums, complete, result = self._total()
+            elif name in self._rows:
+                row = self._rows[name]
+                sums = self._sums[row, :self.months]
+                complete = self._counts[row, :self.months] == WINDOW
+                result = {k: v[row, :self.months] for k, v in self._results.items()}
+            else:
+                continue
+            names.append(name)
+            columns = {"complete": complete}
+            columns.update(zip(self.inputs, sums[:, :len(self.inputs)].T))
+            for key in ("owner_benefit", self.earnings, "margin", "valuation_base"):
+                columns[key] = result[key]
+            for i, multiple in enumerate(self.multiples):
+                columns[f"valuation_{multiple_label(multiple)}"] = result["valuations"][:, i]
+            part = pd.DataFrame(columns)
+            part.iloc[~complete, 1:] = np.nan
+            parts.append(part)
+
+        months = self.month_index()
+        out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        out.insert(0, "location", np.repeat(names, self.months))
+        out.insert(1, "month", np.tile(months, len(names)))
+        return out
+
+
+def read_monthly(source, method, filename=None):
+    """Read monthly P&L history from a CSV or Excel file.
+
+    Headers are matched ignoring case. Rows without a location (or files
+    without the column) belong to ``DEFAULT_LOCATION``; rows for a location
+    named ``TOTAL`` are dropped, since the group total is computed. Returns
+    the frame ``RollingTTM.update`` takes and the number of amounts that
+    couldn't be read and were counted as $0.
+    """
+    ensure_imported("pandas")
+    import pandas as pd
+
+    from mra.pnl import parse_amounts
+
+    inputs, add_backs, *_ = _method(method)
+    name = filename or str(source)
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Reading Excel files needs the openpyxl package") from e
+        raw = pd.read_excel(source, dtype=object)
+    else:
+        raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    raw = raw.rename(columns=renames(raw.columns))
+    headers = {str(column).strip().lower(): column for column in raw.columns}
+
+    missing = [column for column in ("month",) + inputs if column.lower() not in headers]
+    if missing:
+        raise ValueError(f"missing column(s) {', '.join(missing)}")
+    text = raw[headers["month"]].astype("string").str.strip()
+    months = pd.to_datetime(text, errors="coerce", format="mixed")
+    if months.isna().any():
+        raise ValueError(f"{int(months.isna().sum())} row(s) have a month that isn't a date")
+
+    if "location" in headers:
+        locations = raw[headers["location"]].astype("string").str.strip().fillna("")
+        locations = locations.where(locations != "", DEFAULT_LOCATION)
+    else:
+        locations = pd.Series(DEFAULT_LOCATION, index=raw.index)
+    monthly = pd.DataFrame({"location": locations.astype(object).to_numpy(),
+                            "month": months.dt.to_period("M").array.asi8})
+
+    invalid = 0
+    for column in inputs + add_backs:
+        if column.lower() in headers:
+            amounts = parse_amounts(raw[headers[column.lower()]].to_numpy())
+            invalid += int(np.isnan(amounts).sum())
+            monthly[column] = np.nan_to_num(amounts)
+    return monthly[monthly["location"] != TOTAL].reset_index(drop=True), invalid
+
+
+# --- UI ---
+
+def ttm_section(method, key):
+    """Render the monthly-history upload and the TTM trend chart.
+
+    The history and any later uploads of added or corrected months are kept
+    in one ``RollingTTM`` per session, so an upload of new months only
+    values the windows they touch.
+    """
+    import streamlit as st
+
+    inputs, *_ = _method(method)
+    upload = st.file_uploader("Monthly P&L history, one row per location and month (CSV or Excel)",
+                              type=["csv", "xlsx", "xlsm"], key=f"{key}_file")
+    if upload is None:
+        st.caption(f"Columns: location, month, {', '.join(inputs)}, and any owner add-backs "
+                   f"under the labels used above.")
+        return
+
+    state = st.session_state.get(f"{key}_state")
+    if state is None or state["file_id"] != upload.file_id:
+        try:
+            monthly, invalid = read_monthly(upload, method, filename=upload.name)
+        except (UnicodeDecodeError, RuntimeError, ValueError) as e:
+            st.error(f"Couldn't read {upload.name}: {e}")
+            return
+        ttm = RollingTTM(method)
+        ttm.update(monthly)
+        state = {"file_id": upload.file_id, "ttm": ttm, "applied": set(), "invalid": invalid}
+        st.session_state[f"{key}_state"] = state
+    ttm = state["ttm"]
+
+    more = st.file_uploader("Add or correct months", type=["csv", "xlsx", "xlsm"], key=f"{key}_more")
+    if more is not None and more.file_id not in state["applied"]:
+        try:
+            monthly, invalid = read_monthly(more, method, filename=more.name)
+        except (UnicodeDecodeError, RuntimeError, ValueError) as e:
+            st.error(f"Couldn't read {more.name}: {e}")
+        else:
+            ttm.update(monthly)
+            state["applied"].add(more.file_id)
+            state["invalid"] += invalid
+    if state["invalid"]:
+        st.warning(f"{state['invalid']} amount(s) couldn't be read and were counted as $0.")
+    if not ttm.locations:
+        st.warning(f"No months found in {upload.name}.")
+        return
+
+    median = ttm.multiples[len(ttm.multiples) // 2]
+    metrics = {
+        f"Valuation ({multiple_label(median)})": f"valuation_{multiple_label(median)}",
+        "Valuation base": "valuation_base",
+        f"TTM {ttm.earnings.upper()}": ttm.earnings,
+        "Margin (%)": "margin",
+        f"TTM {inputs[0].replace('_', ' ')}": inputs[0],
+    }
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        metric = st.selectbox("Show", list(metrics), key=f"{key}_metric")
+    options = ([TOTAL] if len(ttm.locations) > 1 else []) + ttm.locations
+    with col2:
+        shown = st.multiselect("Locations", options, default=options[:1], key=f"{key}_locations")
+    if not shown:
+        st.info("Pick at least one location to chart.")
+        return
+
+    table = ttm.frame(shown)
+    st.line_chart(table.pivot(index="month", columns="location", values=metrics[metric])[shown])
+    latest = table[table["complete"]].groupby("location", sort=False).last()
+    if not latest.empty:
+        st.dataframe(latest.drop(columns="complete"), column_config={"month": st.column_config.DateColumn(
+            "Latest TTM", format="MMM YYYY")})
+    st.caption(f"{len(ttm.locations)} location(s), {ttm.months} months; the last upload recalculated "
+               f"{ttm.revalued:,} of {ttm.windows:,} TTM windows. Valued at the standard "
+               f"{', '.join(multiple_label(m) for m in ttm.multiples)} multiples.")
@@ -1,73 +1,53 @@
-import os
 import streamlit as st
-import sendgrid
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import base64
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import matplotlib.pyplot as plt
+from functools import partial
+
+from mra.addbacks import CUSTOM_LABELS, add_back_inputs, widget_keys
+from mra.charts import donut_png
+from mra.comps import describe, multiple_band, segment_inputs
+from mra.engine import multiple_label, sde_valuation
+from mra.metrics import begin_rerun, cpu_timed, end_rerun, rerun_timed, span
+from mra.montecarlo import monte_carlo_section
+from mra.pnl import import_section, parse_amount
+from mra.prewarm import CHART_MODULES, DELIVERY_MODULES, IMPORT_MODULES, REPORT_MODULES, prewarm
+from mra.reports import report_chart, sde_report_lines, sde_report_pdf
+from mra.resources import outbox, submission_store
+from mra.sensitivity import sensitivity_section
+from mra.ttm import ttm_section
 
 # --- PAGE SETUP ---
-st.set_page_config(layout="wide")
-
-# --- EMAIL SETUP ---
-SENDGRID_API_KEY = st.secrets["SENDGRID_API_KEY"]
-SENDGRID_SENDER = st.secrets["SENDGRID_SENDER"]
-
-# --- GOOGLE SHEETS SETUP ---
-GCP_SHEET_ID = st.secrets["GCP_SHEET_ID"]
-SCOPE = ["https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=SCOPE)
-service = build('sheets', 'v4', credentials=creds)
-sheet = service.spreadsheets()
+# Page config and logo are set once for both pages, in app.py. The outbox and
+# the submission store (with its Sheets exporter) are shared by both pages,
+# one per process; see mra/resources.py.
+begin_rerun("sde")
 
 # --- FUNCTIONS ---
-def send_email(to_email, pdf_buffer):
-    sg = sendgrid.SendGridAPIClient(api_key=SENDGRID_API_KEY)
-    message = Mail(
-        from_email=SENDGRID_SENDER,
-        to_emails=to_email,
-        subject="Your MRA Seller's Discretionary Earnings (SDE) Valuation Report",
-        html_content="Attached is your Seller Discretionary Earnings (SDE) valuation report."
-    )
-    encoded_pdf = base64.b64encode(pdf_buffer.getvalue()).decode()
-    attachment = Attachment(
-        FileContent(encoded_pdf),
-        FileName("sde_valuation_report.pdf"),
-        FileType("application/pdf"),
-        Disposition("attachment")
-    )
-    message.attachment = attachment
+def send_email(to_email, pdf_bytes):
     try:
-        sg.send(message)
-        st.success("✅ Email sent successfully!")
+        outbox().send(
+            to_email,
+            subject="Your MRA Seller's Discretionary Earnings (SDE) Valuation Report",
+            html="Attached is your Seller Discretionary Earnings (SDE) valuation report.",
+            attachment=pdf_bytes,
+            filename="sde_valuation_report.pdf"
+        )
+        st.success("✅ Your report is on its way to your inbox!")
     except Exception as e:
         st.error(f"❌ Email sending failed: {str(e)}")
 
-def save_to_google_sheets(name, email):
-    values = [[name, email]]
-    body = {"values": values}
+def save_submission(name, email, sales, inputs, add_backs, result, multiples, region, concept):
     try:
-        sheet.values().append(
-            spreadsheetId=GCP_SHEET_ID,
-            range="MRA Valuation Tool Users!A:B",
-            valueInputOption="RAW",
-            body=body
-        ).execute()
+        submission_store().record("sde", name, email, sales, inputs, add_backs, result, multiples,
+                                      region=region, concept=concept)
         st.success("✅ Thanks for using our tool!")
     except Exception as e:
         st.error(f"❌: {e}")
 
 # --- UI LAYOUT ---
-st.image("images/MRA logo 9.2015-colorLG.jpg", width=400)
 st.title("MRA Seller’s Discretionary Earnings Valuation Calculator")
 st.markdown("""
 *This is merely a broadbrush modeling tool to assist you in an understanding of what your restaurant business worth may be. 
 For definitive financial understanding of the valuation of your business, the assessment should be done by a Financial Professional certified and specializing in business valuations. 
-The financial information you provide in this modeling tool is not captured and is for your eyes only.*
+The financial information you provide in this modeling tool is only saved, together with your results, when you send the report to your email, and is not shared.*
 """)
 
 col1, col2 = st.columns(2)
@@ -79,154 +59,170 @@ with col2:
 st.header("Determining Seller Discretionary Earnings")
 st.markdown("Financial Information")
 
+# Accepts "$1,200", "(500)" and "1.2M"; cents are kept
 def number_input_comma(label, **kwargs):
-    val = st.text_input(label, **kwargs)
-    try:
-        return int(val.replace(',', ''))
-    except:
-        return 0
-
-income = number_input_comma("Food & Beverage Income ($)", placeholder="Enter value")
-purchases = number_input_comma("F&B Purchases ($)", placeholder="Enter value")
-labor = number_input_comma("Salaries, Wages, Taxes & Benefits ($)", placeholder="Enter value")
-operating_expenses = number_input_comma("Operating Expenses ($)", placeholder="Enter value")
+    val = st.text_input(label, key=label, **kwargs)
+    with span("parse_inputs"):
+        value = parse_amount(val)
+    if value is None:
+        st.warning(f"⚠️ Couldn't read \"{val}\" as an amount; counting it as $0.")
+        return 0.0
+    return value
+
+SDE_INPUTS = ("Food & Beverage Income ($)", "F&B Purchases ($)",
+              "Salaries, Wages, Taxes & Benefits ($)", "Operating Expenses ($)")
+import_section("sde", SDE_INPUTS, widget_keys("sde_add_back"), key="sde_import")
+income, purchases, labor, operating_expenses = (
+    number_input_comma(label, placeholder="Enter value") for label in SDE_INPUTS
+)
+
+# Region and concept pick the comparable sales the multiples come from
+region, concept = segment_inputs("sde", key="sde_comps")
 
 # --- SDE Calculation ---
-total_expenses = purchases + labor + operating_expenses
-sde = income - total_expenses
-sde_margin = (sde / income) * 100 if income else 0
+with span("valuation"):
+    pnl = sde_valuation(income, purchases, labor, operating_expenses)
+total_expenses = float(pnl["total_expenses"])
+sde = float(pnl["sde"])
+sde_margin = float(pnl["margin"])
 
 if income:
-    st.write(f"### Total Expenses: **${total_expenses:,}**")
-    st.write(f"### Seller’s Discretionary Earnings (SDE): **${sde:,}**")
+    st.write(f"### Total Expenses: **${total_expenses:,.0f}**")
+    st.write(f"### Seller’s Discretionary Earnings (SDE): **${sde:,.0f}**")
     st.write(f"### Earnings Margin: **{sde_margin:.0f}%**")
 
 # --- Donut Chart ---
 if income and sde >= 0:
-    values = [total_expenses, sde]
-    labels = ["Total Expenses", "SDE"]
-    colors = ['#2E86AB', '#F5B041']
-
-    fig, ax = plt.subplots(figsize=(1, 1))
-    ax.pie(
-        values,
-        labels=labels,
-        colors=colors,
-        autopct=lambda p: f"${int(round(p * sum(values) / 100.0)):,}",
-        startangle=90,
-        wedgeprops=dict(width=0.35, edgecolor='white'),
-        textprops=dict(color="black", fontsize=6)
-    )
-    ax.text(0, 0, f"{round(sde_margin)}%", ha='center', va='center', fontsize=8, fontweight='bold')
-    ax.set_title("SDE Margin", fontsize=8, fontweight='bold')
-    st.pyplot(fig)
-
-st.header("Determining the Income Valuation through Owner Add Backs")
-st.markdown("Adjustments to Seller Discretionary Earnings")
-
-owners_comp = number_input_comma("Owner's Compensation", placeholder="Enter value")
-health_insurance = number_input_comma("Health Insurance", placeholder="Enter value")
-auto_expense = number_input_comma("Auto Expense", placeholder="Enter value")
-cell_expense = number_input_comma("Cell Phone Expense", placeholder="Enter value")
-other_personal = number_input_comma("Other Personal Expense", placeholder="Enter value")
-extraordinary_expense = number_input_comma("Extraordinary Nonrecurring Expense", placeholder="Enter value")
-receipts_owner_purchases = number_input_comma("Receipts for Owner Purchases", placeholder="Enter value")
-depreciation_amortization = number_input_comma("Depreciation and Amortization", placeholder="Enter value")
-interest_loans = number_input_comma("Interest on Loan Payments", placeholder="Enter value")
-travel_entertainment = number_input_comma("Travel and Entertainment", placeholder="Enter value")
-donations = number_input_comma("Donations", placeholder="Enter value")
-family_salaries = number_input_comma("Family Salaries", placeholder="Enter value")
-occupancy_adjustment = number_input_comma("Occupancy Cost Adjustments", placeholder="Enter value")
-
-# --- Custom Add-Backs with User-Defined Labels ---
-custom_label_1 = st.text_input("Custom Add-back 1 Label", value="Other")
-custom_value_1 = number_input_comma(custom_label_1, placeholder="Enter value")
-
-custom_label_2 = st.text_input("Custom Add-back 2 Label", value="Other (Additional)")
-custom_value_2 = number_input_comma(custom_label_2, placeholder="Enter value")
-
-custom_label_3 = st.text_input("Custom Add-back 3 Label", value="Other (Extra)")
-custom_value_3 = number_input_comma(custom_label_3, placeholder="Enter value")
-
-# --- Final Calculations ---
-total_owner_benefit = sum([
-    owners_comp, health_insurance, auto_expense, cell_expense, other_personal,
-    extraordinary_expense, receipts_owner_purchases, depreciation_amortization,
-    interest_loans, travel_entertainment, donations, family_salaries,
-    occupancy_adjustment, custom_value_1, custom_value_2, custom_value_3
-])
-
-net_profit_loss = income - total_expenses
-total_income_valuation = net_profit_loss + total_owner_benefit
-valuation_1_5x = total_income_valuation * 1.5
-valuation_2_0x = total_income_valuation * 2.0
-valuation_2_5x = total_income_valuation * 2.5
-
-st.markdown(f"**Total Owner Benefit:** ${total_owner_benefit:,}")
-st.markdown(f"**Net Profit/Loss:** ${net_profit_loss:,}")
-st.markdown(f"**Total Income Valuation:** ${total_income_valuation:,}")
-
-st.header("Valuation Multiples")
-st.markdown("""
-**The Low, Median and High Valuation Multiple**  
-Once SDE is calculated, a multiplier is used to arrive at a business valuation, with the multiplier varying based on industry, growth outlook, an example would be if a liquor license is considered an asset of the business, also seasonality and competition.
-""")
-
-st.write(f"#### Low Multiple Valuation (1.5x): **${valuation_1_5x:,.0f}**")
-st.write(f"#### Median Multiple Valuation (2.0x): **${valuation_2_0x:,.0f}**")
-st.write(f"#### High Multiple Valuation (2.5x): **${valuation_2_5x:,.0f}**")
-
-st.markdown("""
-A copy of this report will be emailed to you.  
-We hope this Restaurant Business Modeling tool has been a good exercise for you in understanding how valuations work and a model of a range in which your business may land in.  
-If you have questions as to this methodology or would like advice or assistance in the valuation of your restaurant business, please reach out to Kerry Miller at [kmiller@themassrest.org](mailto:kmiller@themassrest.org).  
-Based on your questions or needs, he will connect you with the correct subject matter expert.
-""")
-
-# --- PDF Export ---
-pdf_buffer = BytesIO()
-pdf = canvas.Canvas(pdf_buffer, pagesize=letter)
-pdf.setFont("Helvetica-Bold", 16)
-pdf.drawString(100, 750, "MRA SDE Valuation Report")
-y = 720
-pdf.setFont("Helvetica", 12)
-
-for line in [
-    f"Name: {name}",
-    f"Email: {email}",
-    f"Total Expenses: ${total_expenses:,}",
-    f"SDE: ${sde:,}",
-    f"Earnings Margin: {sde_margin:.0f}%",
-    f"Total Owner Benefit: ${total_owner_benefit:,}",
-    f"Net Profit/Loss: ${net_profit_loss:,}",
-    f"Total Income Valuation: ${total_income_valuation:,}",
-    f"Low Valuation (1.5x): ${valuation_1_5x:,.0f}",
-    f"Median Valuation (2.0x): ${valuation_2_0x:,.0f}",
-    f"High Valuation (2.5x): ${valuation_2_5x:,.0f}",
-    f"{custom_label_1}: ${custom_value_1:,}",
-    f"{custom_label_2}: ${custom_value_2:,}",
-    f"{custom_label_3}: ${custom_value_3:,}",
-]:
-    pdf.drawString(80, y, line)
-    y -= 20
-
-pdf.save()
-pdf_buffer.seek(0)
-
-# --- Buttons ---
-if name and email:
-    st.download_button(
-        label="Download Results as PDF",
-        data=pdf_buffer,
-        file_name="sde_results.pdf",
-        mime="application/pdf"
+    st.image(donut_png("sde", total_expenses, sde, sde_margin), width="stretch")
+
+# Everything below depends only on the P&L figures above plus the add-back
+# inputs, so it runs as a fragment: editing an add-back reruns this section
+# (owner benefit, multiples, export) without redrawing the P&L and chart.
+# The analysis expanders only run while open, as nested fragments driven by
+# their own sliders.
+@st.fragment
+@cpu_timed(lambda: st.session_state.setdefault("cpu_seconds", {}), "valuation_section")
+@rerun_timed("sde_valuation_section")
+def valuation_section(income, purchases, labor, operating_expenses,
+                      total_expenses, sde, sde_margin, region, concept, name, email):
+    st.header("Determining the Income Valuation through Owner Add Backs")
+    st.markdown("Adjustments to Seller Discretionary Earnings")
+
+    # One input per add-back in mra.addbacks; the custom ones can be renamed
+    add_backs, names = add_back_inputs("sde_add_back")
+
+    # --- Final Calculations ---
+    with span("valuation"):
+        multiples, comps = multiple_band("sde", income, sde_margin, region, concept)
+        result = sde_valuation(
+            income, purchases, labor, operating_expenses,
+            owner_benefit=sum(add_backs.values()),
+            multiples=multiples,
+        )
+    total_owner_benefit = float(result["owner_benefit"])
+    net_profit_loss = float(result["net_profit_loss"])
+    total_income_valuation = float(result["valuation_base"])
+    low_valuation, median_valuation, high_valuation = (float(v) for v in result["valuations"])
+    low_label, median_label, high_label = (multiple_label(m) for m in multiples)
+
+    st.markdown(f"**Total Owner Benefit:** ${total_owner_benefit:,.0f}")
+    st.markdown(f"**Net Profit/Loss:** ${net_profit_loss:,.0f}")
+    st.markdown(f"**Total Income Valuation:** ${total_income_valuation:,.0f}")
+
+    st.header("Valuation Multiples")
+    st.markdown("""
+    **The Low, Median and High Valuation Multiple**  
+    Once SDE is calculated, a multiplier is used to arrive at a business valuation, with the multiplier varying based on industry, growth outlook, an example would be if a liquor license is considered an asset of the business, also seasonality and competition.
+    """)
+
+    st.write(f"#### Low Multiple Valuation ({low_label}): **${low_valuation:,.0f}**")
+    st.write(f"#### Median Multiple Valuation ({median_label}): **${median_valuation:,.0f}**")
+    st.write(f"#### High Multiple Valuation ({high_label}): **${high_valuation:,.0f}**")
+    if comps is not None:
+        st.caption(describe(comps))
+
+    # --- Sensitivity Analysis ---
+    if income > 0 and total_income_valuation > 0:
+        sensitivity = st.expander(
+            "Sensitivity Analysis: valuation across multiples and cost ratios",
+            key="sde_sensitivity_open", on_change="rerun"
+        )
+        if sensitivity.open:
+            with sensitivity:
+                st.fragment(sensitivity_section)(
+                    income, sde, total_owner_benefit,
+                    (multiples[0], multiples[-1]),
+                    {"F&B Purchases": purchases, "Salaries, Wages, Taxes & Benefits": labor,
+                     "Operating Expenses": operating_expenses},
+                    key="sde_sensitivity"
+                )
+        monte_carlo = st.expander(
+            "Monte Carlo: valuation range with probabilities",
+            key="sde_monte_carlo_open", on_change="rerun"
+        )
+        if monte_carlo.open:
+            with monte_carlo:
+                st.fragment(monte_carlo_section)(
+                    "sde",
+                    (income, purchases, labor, operating_expenses),
+                    tuple(add_backs.values()),
+                    multiples,
+                    key="sde_monte_carlo"
+                )
+
+    st.markdown("""
+    A copy of this report will be emailed to you.  
+    We hope this Restaurant Business Modeling tool has been a good exercise for you in understanding how valuations work and a model of a range in which your business may land in.  
+    If you have questions as to this methodology or would like advice or assistance in the valuation of your restaurant business, please reach out to Kerry Miller at [kmiller@themassrest.org](mailto:kmiller@themassrest.org).  
+    Based on your questions or needs, he will connect you with the correct subject matter expert.
+    """)
+
+    # --- PDF Export ---
+    # Only the report lines and donut inputs are assembled here; the PDF itself
+    # is built (and cached) when a download or email asks for it.
+    report_lines = sde_report_lines(
+        name, email, total_expenses, sde, sde_margin, total_owner_benefit,
+        net_profit_loss, total_income_valuation,
+        (low_valuation, median_valuation, high_valuation),
+        custom_add_backs=[(names[label], add_backs[label]) for label in CUSTOM_LABELS],
+        multiples=multiples
     )
-else:
-    st.warning("⚠️ Please fill out both Name and Email to download your results.")
+    chart = report_chart(total_expenses, sde, sde_margin)
 
-if st.button("Send Results to Your Email"):
+    # --- Buttons ---
     if name and email:
-        send_email(email, pdf_buffer)
-        save_to_google_sheets(name, email)
+        st.download_button(
+            label="Download Results as PDF",
+            data=partial(sde_report_pdf, report_lines, chart),
+            file_name="sde_results.pdf",
+            mime="application/pdf"
+        )
     else:
-        st.error("❌ Please fill out both Name and Email before sending.")
+        st.warning("⚠️ Please fill out both Name and Email to download your results.")
+
+    if st.button("Send Results to Your Email"):
+        if name and email:
+            send_email(email, sde_report_pdf(report_lines, chart))
+            save_submission(
+                name, email, income,
+                dict(zip(SDE_INPUTS, (income, purchases, labor, operating_expenses))),
+                {names[label]: value for label, value in add_backs.items()},
+                result, multiples, region, concept
+            )
+        else:
+            st.error("❌ Please fill out both Name and Email before sending.")
+
+
+valuation_section(income, purchases, labor, operating_expenses,
+                  total_expenses, sde, sde_margin, region, concept, name, email)
+
+# Monthly history is a separate input, so the TTM trend has its own fragment
+ttm = st.expander("Trailing twelve months: valuation trend from monthly history",
+                  key="sde_ttm_open", on_change="rerun")
+if ttm.open:
+    with ttm:
+        st.fragment(ttm_section)("sde", key="sde_ttm")
+end_rerun()
+
+# The page has painted; load the libraries the chart and buttons need in the background
+prewarm(CHART_MODULES + REPORT_MODULES + IMPORT_MODULES + DELIVERY_MODULES)